@@ -0,0 +1,142 @@
+"""
+Memory held by MultiSourceLookup candidates per in-flight reference.
+
+Builds synthetic Crossref/OpenAlex/Semantic Scholar/PubMed/arXiv/IEEE records shaped
+like real API responses and keeps, for each reference, the candidate list in three
+layouts: a dict carrying the full source record under "raw" (the original layout),
+a dict of normalized fields only, and the Candidate slots record used now.
+
+    python benchmarks/candidate_memory.py --refs 500
+"""
+import argparse, gc, tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+from refassist.nodes.multisource_lookup import _normalize_candidate
+
+RESULTS_PER_SOURCE = 5
+
+def _authors(i: int, n: int) -> List[Tuple[str, str]]:
+    return [(f"Given{i}x{k}", f"Family{i}x{k}") for k in range(n)]
+
+def _crossref(i: int, j: int) -> Dict[str, Any]:
+    doi = f"10.1109/TEST.{i}.{j}"
+    return {
+        "DOI": doi, "URL": f"https://doi.org/{doi}", "type": "journal-article",
+        "title": [f"Deep residual learning for image recognition {i}-{j}"],
+        "container-title": ["IEEE Transactions on Pattern Analysis and Machine Intelligence"],
+        "short-container-title": ["IEEE Trans. Pattern Anal. Mach. Intell."],
+        "volume": "40", "issue": "6", "page": "1452-1464", "publisher": "IEEE",
+        "issued": {"date-parts": [[2018, 6, 1]]},
+        "author": [{"given": g, "family": f, "sequence": "additional",
+                    "affiliation": [{"name": f"Department of Computer Science, University {i}"}]}
+                   for g, f in _authors(i, 6)],
+        "reference": [{"key": f"ref{k}", "DOI": f"10.1000/ref.{i}.{j}.{k}",
+                       "unstructured": f"A. Author{k}, \"Some cited work {k}\", Journal {k}, 20{k % 20:02d}."}
+                      for k in range(40)],
+        "link": [{"URL": f"https://ieeexplore.ieee.org/stamp/stamp.jsp?arnumber={i}{j}",
+                  "content-type": "unspecified", "intended-application": "similarity-checking"}],
+        "license": [{"URL": "https://ieeexplore.ieee.org/Xplorehelp/downloads/license-information/IEEE.html",
+                     "content-version": "vor", "delay-in-days": 0}],
+        "ISSN": ["0162-8828", "2160-9292"], "subject": ["Software", "Artificial Intelligence"],
+        "reference-count": 40, "is-referenced-by-count": 1000 + j,
+    }
+
+def _openalex(i: int, j: int) -> Dict[str, Any]:
+    words = [f"word{k}" for k in range(150)]
+    return {
+        "id": f"https://openalex.org/W{i:06d}{j}", "doi": f"https://doi.org/10.1109/TEST.{i}.{j}",
+        "display_name": f"Deep residual learning for image recognition {i}-{j}",
+        "title": f"Deep residual learning for image recognition {i}-{j}",
+        "publication_year": 2018, "from_publication_date": "2018-06-01",
+        "host_venue": {"display_name": "IEEE Transactions on Pattern Analysis and Machine Intelligence",
+                       "abbrev": "IEEE Trans. Pattern Anal. Mach. Intell.", "issn_l": "0162-8828"},
+        "biblio": {"volume": "40", "issue": "6", "first_page": "1452", "last_page": "1464"},
+        "authorships": [{"author": {"id": f"https://openalex.org/A{i}{k}", "display_name": f"{g} {f}"},
+                         "institutions": [{"id": f"https://openalex.org/I{k}", "display_name": f"University {i}"}]}
+                        for k, (g, f) in enumerate(_authors(i, 6))],
+        "referenced_works": [f"https://openalex.org/W{i}{j}{k:04d}" for k in range(60)],
+        "concepts": [{"id": f"https://openalex.org/C{k}", "display_name": f"Concept {k}", "score": 0.5}
+                     for k in range(10)],
+        "abstract_inverted_index": {f"{w}{i}": [k] for k, w in enumerate(words)},
+    }
+
+def _semanticscholar(i: int, j: int) -> Dict[str, Any]:
+    return {
+        "paperId": f"{i:020x}{j:020x}", "title": f"Deep residual learning for image recognition {i}-{j}",
+        "venue": "IEEE Transactions on Pattern Analysis and Machine Intelligence", "year": 2018,
+        "externalIds": {"DOI": f"10.1109/TEST.{i}.{j}", "CorpusId": i * 10 + j},
+        "authors": [{"authorId": f"{i}{k}", "name": f"{g} {f}"} for k, (g, f) in enumerate(_authors(i, 6))],
+        "publicationTypes": ["JournalArticle"],
+    }
+
+def _pubmed(i: int, j: int) -> Dict[str, Any]:
+    return {
+        "uid": f"{30000000 + i * 10 + j}", "title": f"Deep residual learning for image recognition {i}-{j}.",
+        "sorttitle": f"deep residual learning for image recognition {i} {j}",
+        "fulljournalname": "IEEE transactions on pattern analysis and machine intelligence",
+        "source": "IEEE Trans Pattern Anal Mach Intell", "volume": "40", "issue": "6", "pages": "1452-1464",
+        "pubdate": "2018 Jun", "elocationid": f"doi: 10.1109/TEST.{i}.{j}",
+        "authors": [{"name": f"{f} {g[0]}", "authtype": "Author"} for g, f in _authors(i, 6)],
+        "articleids": [{"idtype": "pubmed", "value": f"{30000000 + i}"},
+                       {"idtype": "doi", "value": f"10.1109/TEST.{i}.{j}"}],
+        "history": [{"pubstatus": s, "date": "2018/06/01 00:00"} for s in ("received", "accepted", "entrez")],
+    }
+
+def _arxiv(i: int, j: int) -> Dict[str, Any]:
+    return {
+        "title": f"Deep residual learning for image recognition {i}-{j}",
+        "authors": [f"{g} {f}" for g, f in _authors(i, 6)], "year": "2015",
+        "doi": "", "summary": " ".join(f"abstract{i}w{k}" for k in range(180)),
+    }
+
+def _ieeexplore(i: int, j: int) -> Dict[str, Any]:
+    return {
+        "title": f"Deep residual learning for image recognition {i}-{j}", "doi": f"10.1109/TEST.{i}.{j}",
+        "html_url": f"https://ieeexplore.ieee.org/document/{i}{j}/",
+        "pdf_url": f"https://ieeexplore.ieee.org/stamp/stamp.jsp?arnumber={i}{j}",
+        "abstract": " ".join(f"abstract{i}w{k}" for k in range(180)),
+        "publication_title": "IEEE Transactions on Pattern Analysis and Machine Intelligence",
+        "volume": "40", "issue": "6", "start_page": "1452", "end_page": "1464", "publication_year": 2018,
+        "index_terms": {"ieee_terms": {"terms": [f"term{k}" for k in range(15)]}},
+    }
+
+SOURCES: List[Tuple[str, Callable[[int, int], Dict[str, Any]]]] = [
+    ("crossref", _crossref), ("openalex", _openalex), ("semanticscholar", _semanticscholar),
+    ("pubmed", _pubmed), ("arxiv", _arxiv), ("ieeexplore", _ieeexplore),
+]
+
+def with_raw(name: str, rec: Dict[str, Any]) -> Dict[str, Any]:
+    return {**_normalize_candidate(name, rec).to_dict(), "raw": rec}
+
+def fields_only(name: str, rec: Dict[str, Any]) -> Dict[str, Any]:
+    return _normalize_candidate(name, rec).to_dict()
+
+LAYOUTS = [
+    ("dict + raw record", with_raw),
+    ("dict, normalized only", fields_only),
+    ("Candidate (__slots__)", _normalize_candidate),
+]
+
+def measure(n_refs: int, build: Callable[[str, Dict[str, Any]], Any]) -> float:
+    """Bytes still allocated per reference once every reference holds its candidate list."""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    held = [[build(name, make(i, j)) for name, make in SOURCES for j in range(RESULTS_PER_SOURCE)]
+            for i in range(n_refs)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del held
+    return used / n_refs
+
+def main():
+    p = argparse.ArgumentParser(description="Candidate memory per in-flight reference")
+    p.add_argument("--refs", type=int, default=500, help="References held in flight (default: 500)")
+    args = p.parse_args()
+    print(f"{args.refs} references x {len(SOURCES) * RESULTS_PER_SOURCE} candidates")
+    for label, build in LAYOUTS:
+        per_ref = measure(args.refs, build)
+        print(f"  {label:<24} {per_ref / 1024:8.1f} KiB/ref  {per_ref * args.refs / 2**20:8.1f} MiB total")
+
+if __name__ == "__main__":
+    main()
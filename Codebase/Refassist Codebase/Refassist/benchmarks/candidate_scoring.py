@@ -0,0 +1,88 @@
+"""
+SelectBest scoring: per-pair token_similarity (previous path) vs CandidateScorer.
+
+The previous path clustered candidates by comparing each one with every cluster head and
+then scored every candidate against the extracted reference, re-normalizing both strings
+with regexes on each comparison. CandidateScorer normalizes every record once and takes
+all title similarities from one rapidfuzz cdist matrix.
+
+    python benchmarks/candidate_scoring.py --sizes 30,100,500
+"""
+import argparse, random, statistics, time
+from typing import Any, Callable, Dict, List
+from refassist.tools.scoring import CandidateScorer
+from refassist.tools.utils import authors_to_list, normalize_text, token_similarity
+
+CLUSTER_THRESH = 0.92
+SOURCES = ["crossref", "openalex", "semanticscholar", "pubmed", "arxiv", "ieeexplore"]
+WORDS = ("deep residual learning image recognition neural networks attention transformer graph "
+         "convolutional segmentation detection robust adaptive optimization sparse signal").split()
+
+def _candidates(n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """n candidates over n/5 distinct papers, each returned with small title variations."""
+    papers = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 12))) for _ in range(max(1, n // 5))]
+    out = []
+    for k in range(n):
+        title = rng.choice(papers)
+        if rng.random() < 0.3:
+            title = title.title() + ": extended version"
+        out.append({"source": SOURCES[k % len(SOURCES)], "title": title,
+                    "authors": [f"A. Author{rng.randint(0, 20)}", f"B. Author{rng.randint(0, 20)}"],
+                    "year": str(rng.randint(2010, 2020)), "doi": f"10.1109/X.{rng.randint(0, n)}",
+                    "journal_name": "IEEE Transactions on Pattern Analysis and Machine Intelligence"})
+    return out
+
+def _pairwise_score(ex: Dict[str, Any], c: Dict[str, Any]) -> float:
+    # Title/author/venue terms of the previous score_candidate (each call re-normalizes)
+    score = 0.9 * token_similarity(ex.get("title") or "", c.get("title") or "")
+    ex_auth = {a.split()[-1].lower() for a in authors_to_list(ex.get("authors")) if a.split()}
+    ca_auth = {a.split()[-1].lower() for a in authors_to_list(c.get("authors")) if a.split()}
+    if ex_auth and ca_auth:
+        score += 0.25 * len(ex_auth & ca_auth) / len(ex_auth | ca_auth)
+    ex_v, ca_v = normalize_text(ex.get("journal_name")), normalize_text(c.get("journal_name"))
+    if ex_v and ca_v:
+        score += 0.08 * token_similarity(ex_v, ca_v)
+    return score
+
+def pairwise(ex: Dict[str, Any], cands: List[Dict[str, Any]]) -> Any:
+    clusters: List[List[Dict[str, Any]]] = []
+    for c in cands:
+        for cl in clusters:
+            if token_similarity(normalize_text(c["title"]), normalize_text(cl[0]["title"])) >= CLUSTER_THRESH:
+                cl.append(c); break
+        else:
+            clusters.append([c])
+    best = max(cands, key=lambda c: _pairwise_score(ex, c))
+    by_title = max(cands, key=lambda c: token_similarity(normalize_text(ex["title"]), normalize_text(c["title"])))
+    return len(clusters), best, by_title
+
+def matrix(ex: Dict[str, Any], cands: List[Dict[str, Any]]) -> Any:
+    scorer = CandidateScorer(ex, cands)
+    clusters = scorer.clusters(CLUSTER_THRESH)
+    idx = range(len(cands))
+    return len(clusters), cands[max(idx, key=scorer.score)], cands[max(idx, key=scorer.title_similarity)]
+
+def bench(fn: Callable, ex: Dict[str, Any], cands: List[Dict[str, Any]], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(ex, cands)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+def main():
+    p = argparse.ArgumentParser(description="Candidate scoring microbenchmark")
+    p.add_argument("--sizes", default="30,100,500", help="Comma-separated candidate counts")
+    p.add_argument("--repeat", type=int, default=15)
+    args = p.parse_args()
+    rng = random.Random(7)
+    print(f"{'candidates':>10} {'pairwise ms':>12} {'matrix ms':>10} {'speedup':>8}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        cands = _candidates(n, rng)
+        ex = dict(cands[0], source="extracted")
+        assert pairwise(ex, cands)[0] == matrix(ex, cands)[0]
+        old, new = bench(pairwise, ex, cands, args.repeat), bench(matrix, ex, cands, args.repeat)
+        print(f"{n:>10} {old:>12.2f} {new:>10.2f} {old / new:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
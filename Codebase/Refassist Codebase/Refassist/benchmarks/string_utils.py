@@ -0,0 +1,98 @@
+"""
+Hot string helpers: the previous tools/utils.py versions vs the memoized ones.
+
+Each reference gets its own 30 candidates (fresh strings, so the memo only helps within a
+reference, as in a real batch). The helpers run over every field once per pass; the
+pipeline normalizes the same values in lookup, scoring, consensus, verification,
+corrections and the report, so the default is 6 passes.
+
+    python benchmarks/string_utils.py --refs 500 --passes 6
+"""
+import argparse, re, time
+from typing import Any, Callable, Dict, List
+from refassist.tools import utils
+from refassist.nodes.select_best import _norm_author
+from refassist.nodes.verify_agents import normalize_author_name
+
+# ---------- Previous implementations (uncompiled patterns, no memo) ----------
+def old_normalize_text(x: Any) -> str:
+    if x is None: return ""
+    return re.sub(r"\s+", " ", str(x).strip())
+
+def old_norm_for_compare(x: Any) -> str:
+    s = old_normalize_text(x).lower()
+    s = re.sub(r"[^\w\s]", " ", s)
+    return re.sub(r"\s+", " ", s).strip()
+
+def old_authors_to_list(a: Any) -> List[str]:
+    if not a: return []
+    if isinstance(a, list): return [old_normalize_text(x) for x in a if old_normalize_text(x)]
+    parts = re.split(r",\s*|\s+&\s+| and ", str(a))
+    return [old_normalize_text(p) for p in parts if old_normalize_text(p)]
+
+def old_norm_author(author: str) -> str:
+    parts = author.strip().split()
+    if not parts: return ""
+    if parts[-1].lower() in {"al.", "et", "et."}: return ""
+    initials = [p[0].upper() + "." for p in parts[:-1] if p and p[0].isalpha()]
+    surname = parts[-1] if parts[-1] and parts[-1][0].isalpha() else ""
+    return (" ".join(initials + [surname])).strip().lower()
+
+def old_normalize_author_name(author: str) -> str:
+    parts = author.strip().split()
+    if not parts: return ""
+    if parts[-1].lower() in ["al.", "et", "et."]: return ""
+    initials = [p for p in parts[:-1] if p[0].isalpha() and (len(p) == 1 or p.endswith("."))]
+    surname = parts[-1] if parts[-1][0].isalpha() else ""
+    return " ".join(initials + [surname]).lower().strip()
+
+OLD = (old_normalize_text, old_norm_for_compare, old_authors_to_list, old_norm_author, old_normalize_author_name)
+NEW = (utils.normalize_text, utils.norm_for_compare, utils.authors_to_list, _norm_author, normalize_author_name)
+
+def _records(ref: int) -> List[Dict[str, Any]]:
+    return [{
+        "title": f"  Deep  Residual Learning for Image Recognition: ref {ref} ({k % 5})  ",
+        "journal_name": "IEEE Transactions on  Pattern Analysis and Machine Intelligence",
+        "authors": f"K. He{ref}, X. Zhang, S. Ren and J. Sun",
+        "volume": " 40 ", "issue": "6", "pages": "1452 - 1464", "year": "2018", "doi": f"10.1109/TPAMI.{ref}.{k % 5}",
+    } for k in range(30)]
+
+def run(helpers, refs: int, passes: int) -> float:
+    normalize_text, norm_for_compare, authors_to_list, norm_author, normalize_author_name = helpers
+    t0 = time.perf_counter()
+    for ref in range(refs):
+        recs = _records(ref)
+        for _ in range(passes):
+            for r in recs:
+                for k in ("title", "journal_name", "volume", "issue", "pages", "year", "doi"):
+                    normalize_text(r[k])
+                norm_for_compare(r["title"]); norm_for_compare(r["journal_name"])
+                for a in authors_to_list(r["authors"]):
+                    norm_author(a); normalize_author_name(a)
+    return (time.perf_counter() - t0) / refs * 1e6
+
+def _check(refs: int) -> None:
+    for ref in range(refs):
+        for r in _records(ref):
+            for old, new in zip(OLD[:3], NEW[:3]):
+                for v in r.values():
+                    assert old(v) == new(v), (old.__name__, v)
+            for a in OLD[2](r["authors"]):
+                assert OLD[3](a) == NEW[3](a) and OLD[4](a) == NEW[4](a)
+
+def main():
+    p = argparse.ArgumentParser(description="String helper microbenchmark")
+    p.add_argument("--refs", type=int, default=500)
+    p.add_argument("--passes", type=int, default=6, help="Times each field is normalized per reference")
+    args = p.parse_args()
+    _check(20)
+    old = run(OLD, args.refs, args.passes)
+    new = run(NEW, args.refs, args.passes)
+    print(f"{args.refs} references x 30 candidates x {args.passes} passes")
+    print(f"  previous helpers  {old:9.1f} us/ref")
+    print(f"  memoized helpers  {new:9.1f} us/ref   {old / new:.1f}x")
+    info = utils._normalize_str.cache_info()
+    print(f"  normalize_text memo: {info.hits} hits, {info.misses} misses, size {info.currsize}/{info.maxsize}")
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,10 @@ import argparse, asyncio, json
 from refassist.graphs import run_one
 
 async def _run(args):
-    out = await run_one(args.ref)
+    # Plain mode only prints the formatted reference, so skip exports/report
+    outputs = args.outputs or (None if args.verbose else "formatted")
+    out = await run_one(args.ref, refresh=args.refresh, outputs=outputs, profile=args.profile,
+                        deadline_s=args.deadline)
     print(out.get("formatted", ""))
     if args.verbose:
         print("\nReport:\n", out.get("report",""))
@@ -13,6 +16,11 @@ def main():
     p = argparse.ArgumentParser(description="RefAssist CLI")
     p.add_argument("--ref", required=True, help="Raw reference string")
     p.add_argument("--verbose", action="store_true")
+    p.add_argument("--refresh", action="store_true", help="Bypass the result cache and re-verify")
+    p.add_argument("--profile", choices=["fast", "balanced", "thorough"],
+                   help="Execution profile (default: IEEE_REF_PROFILE or thorough)")
+    p.add_argument("--deadline", type=float, help="Time budget in seconds (default: IEEE_REF_DEADLINE; 0 = unlimited)")
+    p.add_argument("--outputs", help="Comma-separated outputs to compute: formatted,csl_json,bibtex,report")
     args = p.parse_args()
     asyncio.run(_run(args))
 
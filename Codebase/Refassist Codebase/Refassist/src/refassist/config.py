@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Dict, Optional
 import os
 
 @dataclass
@@ -13,5 +14,62 @@ class PipelineConfig:
     openai_model: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
     ollama_model: str = os.getenv("OLLAMA_MODEL", "llama3.2")
     ollama_base: str = os.getenv("OLLAMA_BASE_URL", os.getenv("OLLAMA_HOST", "http://localhost:11434"))
-    agent_threads: int = int(os.getenv("IEEE_REF_AGENT_THREADS", "6"))
+    # Per-node LLM routing, e.g. "validate=ollama:llama3.2,type=ollama,format=openai:gpt-4o"
+    # (nodes: validate, type, parse, correct, format; unrouted nodes use llm_provider)
+    llm_routes: str = os.getenv("IEEE_REF_LLM_ROUTES", "")
+    # Hedging: race a secondary provider[:model] once a call runs longer than llm_hedge_after_s
+    llm_hedge: str = os.getenv("IEEE_REF_LLM_HEDGE", "")
+    llm_hedge_after_s: float = float(os.getenv("IEEE_REF_LLM_HEDGE_AFTER", "2.5"))
+    # Provider health: this many consecutive errors disable a provider for llm_disable_s
+    llm_max_failures: int = int(os.getenv("IEEE_REF_LLM_MAX_FAILURES", "3"))
+    llm_disable_s: float = float(os.getenv("IEEE_REF_LLM_DISABLE", "60"))
+    # Process-wide LLM scheduler: requests in flight, per-provider budgets per minute (0 = unlimited),
+    # retries with exponential backoff on rate limiting
+    llm_max_inflight: int = int(os.getenv("IEEE_REF_LLM_MAX_INFLIGHT", "8"))
+    llm_rpm: int = int(os.getenv("IEEE_REF_LLM_RPM", "0"))
+    llm_tpm: int = int(os.getenv("IEEE_REF_LLM_TPM", "0"))
+    llm_retries: int = int(os.getenv("IEEE_REF_LLM_RETRIES", "3"))
+    llm_backoff_s: float = float(os.getenv("IEEE_REF_LLM_BACKOFF", "1.0"))
+    # Scheduler priority class for this run: interactive (served first) | bulk
+    llm_priority: str = os.getenv("IEEE_REF_LLM_PRIORITY", "interactive")
     recursion_limit: int = int(os.getenv("IEEE_REF_RECURSION_LIMIT", "60"))
+    # Whole-reference result cache in front of run_one
+    result_cache_size: int = int(os.getenv("IEEE_REF_RESULT_CACHE_SIZE", "2048"))
+    result_cache_ttl_s: int = int(os.getenv("IEEE_REF_RESULT_CACHE_TTL", "86400"))
+    # Correction loop: another hop must be expected to verify more than this many fields
+    loop_hop_cost: float = float(os.getenv("IEEE_REF_LOOP_HOP_COST", "0.3"))
+    # Prior chance that a hop fixes a failing flag, e.g. "doi=0.7,presence=0.2" (unlisted flags: 0.5)
+    loop_field_priors: str = os.getenv("IEEE_REF_LOOP_FIELD_PRIORS", "")
+    # End-to-end time budget per reference in seconds (0 = unlimited, the default)
+    deadline_s: float = float(os.getenv("IEEE_REF_DEADLINE", "0"))
+    # Execution profile (graph variant): fast | balanced | thorough
+    profile: str = os.getenv("IEEE_REF_PROFILE", "thorough")
+
+@dataclass(frozen=True)
+class ExecutionProfile:
+    name: str
+    correction_loop: bool = True                 # ApplyCorrections -> LLMCorrect -> EnrichFromBest cycle
+    max_correction_rounds: Optional[int] = None  # cap on top of PipelineConfig.max_correction_rounds
+    journal_abbrev: bool = True                  # NLM Catalog abbreviation check
+    llm_format: bool = True                      # LLM formatter first (else rule-based only)
+    max_sources: int = 0                         # sources queried, in authority order (0 = all)
+    title_variants: int = 0                      # title queries per source (0 = all variants)
+    identifier_only: bool = False                # no title search when a DOI/arXiv id is known
+
+PROFILES: Dict[str, ExecutionProfile] = {
+    # Identifier lookups on the authoritative sources, no correction loop, rule-based formatting
+    "fast": ExecutionProfile(
+        "fast", correction_loop=False, journal_abbrev=False, llm_format=False,
+        max_sources=2, title_variants=1, identifier_only=True,
+    ),
+    # One correction round, one title query per source
+    "balanced": ExecutionProfile("balanced", max_correction_rounds=1, title_variants=1),
+    # Full pipeline (previous behavior)
+    "thorough": ExecutionProfile("thorough"),
+}
+
+def get_profile(name: Optional[str]) -> ExecutionProfile:
+    key = (name or "thorough").strip().lower()
+    if key not in PROFILES:
+        raise ValueError(f"Unknown profile: {name}; expected any of {', '.join(PROFILES)}")
+    return PROFILES[key]
@@ -1,2 +1,2 @@
-from .pipeline import build_graph, run_one
-__all__ = ["build_graph","run_one"]
+from .pipeline import build_graph, get_compiled, run_one, normalize_outputs, OUTPUTS
+__all__ = ["build_graph","get_compiled","run_one","normalize_outputs","OUTPUTS"]
@@ -1,14 +1,26 @@
+import time
+import asyncio
+import copy
+import json
+import hashlib
+from dataclasses import asdict, replace
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple, Union
+from cachetools import TTLCache
 from langgraph.graph import StateGraph, START, END
 from ..state import PipelineState
-from ..config import PipelineConfig
+from ..config import PipelineConfig, get_profile
+from ..metrics import incr, observe
+from ..tools.utils import reference_fingerprint
 from ..nodes import (
     init_runtime, detect_type, parse_extract, multisource_lookup, select_best,
     verify_agents, apply_corrections, llm_correct, enrich_from_best,
-    format_reference, build_exports, build_report, cleanup, route_after_verify
+    format_reference, build_exports, build_report, cleanup, route_after_verify,
+    read_structured, is_structured,
 )
 from ..nodes.validate_reference import validate_input_reference
 from ..nodes.verify_journal_abbrev import verify_journal_abbrev
 from ..nodes.llm_format import llm_format  # NEW
+from ..nodes.init_runtime import make_run_context
 
 # ------------------------------
 # Internal helpers
@@ -18,25 +30,71 @@ def _has_llm_formatted(state: PipelineState) -> bool:
     s = (state.get("formatted") or "").strip()
     return bool(s) and (len(s) > 10)
 
-# Cache a compiled graph so we don't rebuild it on every request.
-_COMPILED = None
+def _wants(state: PipelineState, *outputs: str) -> bool:
+    selected = state.get("_outputs") or ALL_OUTPUTS
+    return any(o in selected for o in outputs)
+
+def _after_exports(state: PipelineState) -> str:
+    return "BuildReport" if _wants(state, "report") else "Cleanup"
+
+def _after_format(state: PipelineState) -> str:
+    return "BuildExports" if _wants(state, "csl_json", "bibtex") else _after_exports(state)
+
+def _route_verified(state: PipelineState, correction_loop: bool = True) -> str:
+    nxt = route_after_verify(state) if correction_loop else "FormatReference"
+    if nxt == "FormatReference" and not _wants(state, "formatted"):
+        return _after_format(state)
+    return nxt
+
+# Compiled graphs per (profile, config hash), so we don't rebuild them on every request.
+_COMPILED: Dict[Tuple[str, str], Any] = {}
+
+# Bump whenever node logic changes the final output, so cached results are not reused.
+PIPELINE_VERSION = "3"
+
+# Final outputs kept per reference by the result cache
+RESULT_KEYS = ("type", "formatted", "csl_json", "bibtex", "verification", "report", "report_sections", "skipped")
+# Config fields that do not influence the result (left out of the cache key)
+_CACHE_NEUTRAL_CFG = {"concurrency", "cache_ttl_s", "result_cache_size", "result_cache_ttl_s",
+                      "deadline_s", "llm_hedge_after_s", "llm_max_failures", "llm_disable_s",
+                      "llm_max_inflight", "llm_rpm", "llm_tpm", "llm_retries", "llm_backoff_s", "llm_priority"}
+
+# Caller-selectable outputs ("type" and "verification" always come with the verification stages)
+OUTPUTS = ("formatted", "csl_json", "bibtex", "report")
+ALL_OUTPUTS: FrozenSet[str] = frozenset(OUTPUTS)
+
+_RESULT_CACHES: Dict[Tuple[int, int], TTLCache] = {}   # (size, ttl) -> cache
+_INFLIGHT: Dict[str, "asyncio.Future"] = {}   # fingerprint -> result of the run currently computing it
 
 def build_graph(cfg: PipelineConfig = PipelineConfig()) -> StateGraph:
+    """
+    Build the graph variant for cfg.profile:
+      - thorough: full pipeline (correction loop, NLM check, LLM formatter first)
+      - balanced: same topology; corrections capped to one round by run_one
+      - fast: no correction loop, no NLM check, rule-based formatting only
+    BibTeX/biblatex entries are read by ReadStructured and join after ParseExtract,
+    skipping the validate/type/parse LLM calls.
+    """
+    prof = get_profile(cfg.profile)
     g = StateGraph(PipelineState)
 
     # Nodes
     g.add_node("InitRuntime", init_runtime)
+    g.add_node("ReadStructured", read_structured)
     g.add_node("VerifyReferenceType", validate_input_reference)
     g.add_node("DetectType", detect_type)
     g.add_node("ParseExtract", parse_extract)
-    g.add_node("VerifyJournalAbbrev", verify_journal_abbrev)  # async-safe
+    if prof.journal_abbrev:
+        g.add_node("VerifyJournalAbbrev", verify_journal_abbrev)  # async-safe
     g.add_node("MultiSourceLookup", multisource_lookup)
     g.add_node("SelectBest", select_best)
     g.add_node("VerifyAgents", verify_agents)
-    g.add_node("ApplyCorrections", apply_corrections)
-    g.add_node("LLMCorrect", llm_correct)
-    g.add_node("EnrichFromBest", enrich_from_best)
-    g.add_node("LLMFormat", llm_format)             # NEW: LLM-first formatter
+    if prof.correction_loop:
+        g.add_node("ApplyCorrections", apply_corrections)
+        g.add_node("LLMCorrect", llm_correct)
+        g.add_node("EnrichFromBest", enrich_from_best)
+    if prof.llm_format:
+        g.add_node("LLMFormat", llm_format)         # NEW: LLM-first formatter
     g.add_node("FormatReference", format_reference)  # Fallback rules
     g.add_node("BuildExports", build_exports)
     g.add_node("BuildReport", build_report)
@@ -44,55 +102,248 @@ def build_graph(cfg: PipelineConfig = PipelineConfig()) -> StateGraph:
 
     # Edges
     g.add_edge(START, "InitRuntime")
-    g.add_edge("InitRuntime", "VerifyReferenceType")
+    g.add_conditional_edges(
+        "InitRuntime",
+        lambda s: "ReadStructured" if is_structured(s) else "VerifyReferenceType",
+        {"ReadStructured": "ReadStructured", "VerifyReferenceType": "VerifyReferenceType"},
+    )
+    after_parse = "VerifyJournalAbbrev" if prof.journal_abbrev else "MultiSourceLookup"
+    g.add_conditional_edges(
+        "ReadStructured",
+        lambda s: after_parse if s.get("extracted") else "VerifyReferenceType",
+        {after_parse: after_parse, "VerifyReferenceType": "VerifyReferenceType"},
+    )
 
     g.add_conditional_edges(
         "VerifyReferenceType",
-        lambda s: "DetectType" if not s.get("_skip_pipeline") else "BuildReport",
-        {"DetectType": "DetectType", "BuildReport": "BuildReport"},
+        lambda s: "DetectType" if not s.get("_skip_pipeline") else _after_exports(s),
+        {"DetectType": "DetectType", "BuildReport": "BuildReport", "Cleanup": "Cleanup"},
     )
 
     g.add_edge("DetectType", "ParseExtract")
-    g.add_edge("ParseExtract", "VerifyJournalAbbrev")
-    g.add_edge("VerifyJournalAbbrev", "MultiSourceLookup")
+    g.add_edge("ParseExtract", after_parse)
+    if prof.journal_abbrev:
+        g.add_edge("VerifyJournalAbbrev", "MultiSourceLookup")
     g.add_edge("MultiSourceLookup", "SelectBest")
     g.add_edge("SelectBest", "VerifyAgents")
 
-    # After verification, either exit to formatting or continue corrections
-    g.add_conditional_edges("VerifyAgents", route_after_verify, {
-        "FormatReference": "LLMFormat",   # try LLM formatter first
-        "ApplyCorrections": "ApplyCorrections",
-    })
+    # After verification, either exit to formatting or continue corrections.
+    # Stages whose outputs were not requested are skipped (see _outputs).
+    verify_routes = {
+        "FormatReference": "LLMFormat" if prof.llm_format else "FormatReference",  # try LLM formatter first
+        "BuildExports": "BuildExports",
+        "BuildReport": "BuildReport",
+        "Cleanup": "Cleanup",
+    }
+    if prof.correction_loop:
+        verify_routes["ApplyCorrections"] = "ApplyCorrections"
+        g.add_conditional_edges("VerifyAgents", _route_verified, verify_routes)
 
-    g.add_edge("ApplyCorrections", "LLMCorrect")
-    g.add_edge("LLMCorrect", "EnrichFromBest")
-    g.add_edge("EnrichFromBest", "MultiSourceLookup")
+        g.add_edge("ApplyCorrections", "LLMCorrect")
+        g.add_edge("LLMCorrect", "EnrichFromBest")
+        g.add_edge("EnrichFromBest", "MultiSourceLookup")
+    else:
+        g.add_conditional_edges("VerifyAgents", lambda s: _route_verified(s, correction_loop=False), verify_routes)
 
     # If LLM formatting failed, fallback to rule-based formatter
-    g.add_conditional_edges(
-        "LLMFormat",
-        lambda s: "BuildExports" if _has_llm_formatted(s) else "FormatReference",
-        {"BuildExports":"BuildExports", "FormatReference":"FormatReference"},
-    )
+    if prof.llm_format:
+        g.add_conditional_edges(
+            "LLMFormat",
+            lambda s: _after_format(s) if _has_llm_formatted(s) else "FormatReference",
+            {"FormatReference":"FormatReference", "BuildExports":"BuildExports",
+             "BuildReport":"BuildReport", "Cleanup":"Cleanup"},
+        )
 
-    g.add_edge("FormatReference", "BuildExports")
-    g.add_edge("BuildExports", "BuildReport")
+    g.add_conditional_edges("FormatReference", _after_format, {
+        "BuildExports":"BuildExports", "BuildReport":"BuildReport", "Cleanup":"Cleanup",
+    })
+    g.add_conditional_edges("BuildExports", _after_exports, {
+        "BuildReport":"BuildReport", "Cleanup":"Cleanup",
+    })
     g.add_edge("BuildReport", "Cleanup")
     g.add_edge("Cleanup", END)
     return g
 
-async def run_one(reference: str, cfg: PipelineConfig = PipelineConfig(), recursion_limit: int | None = None):
+def normalize_outputs(outputs: Union[str, Iterable[str], None]) -> FrozenSet[str]:
+    """
+    Validate an `outputs` selection (list or comma-separated string).
+    None/empty means everything. "report" implies "formatted", since the
+    report embeds the final formatted reference.
+    """
+    if not outputs:
+        return ALL_OUTPUTS
+    if isinstance(outputs, str):
+        outputs = outputs.split(",")
+    selected = {o.strip().lower() for o in outputs if o and o.strip()}
+    unknown = selected - ALL_OUTPUTS
+    if unknown:
+        raise ValueError(f"Unknown output(s): {', '.join(sorted(unknown))}; expected any of {', '.join(OUTPUTS)}")
+    if "report" in selected:
+        selected.add("formatted")
+    return frozenset(selected) or ALL_OUTPUTS
+
+def output_profile(outputs: FrozenSet[str]) -> str:
+    return "all" if outputs == ALL_OUTPUTS else "+".join(o for o in OUTPUTS if o in outputs)
+
+def _get_result_cache(cfg: PipelineConfig) -> TTLCache:
+    # One cache per size/TTL setting, so a config never inherits another one's limits
+    limits = (max(1, cfg.result_cache_size), cfg.result_cache_ttl_s)
+    cache = _RESULT_CACHES.get(limits)
+    if cache is None:
+        cache = _RESULT_CACHES[limits] = TTLCache(maxsize=limits[0], ttl=limits[1])
+    return cache
+
+def _cacheable(out: Dict[str, Any], selected: FrozenSet[str]) -> bool:
+    """
+    A complete run with a verdict: no deadline skips, no failed source/LLM calls (an
+    outage would otherwise pin an unverified result for the TTL), and either a
+    verification by VerifyAgents or an "is not a reference" decision.
+    """
+    if out.get("skipped") or out.get("errors"):
+        return False
+    verification = out.get("verification") or {}
+    if "presence" not in verification and verification.get("is_reference") is not False:
+        return False
+    return "formatted" not in selected or bool((out.get("formatted") or "").strip())
+
+def _cfg_salt(cfg: PipelineConfig) -> str:
+    cfg_items = {k: v for k, v in asdict(cfg).items() if k not in _CACHE_NEUTRAL_CFG}
+    return f"v{PIPELINE_VERSION}:" + json.dumps(cfg_items, sort_keys=True, default=str)
+
+def _result_key(reference: str, cfg: PipelineConfig) -> str:
+    return reference_fingerprint(reference, salt=_cfg_salt(cfg))
+
+def _profile_cfg(cfg: PipelineConfig, profile: Optional[str]) -> PipelineConfig:
+    """Apply a per-request profile and its limits (validated; raises ValueError)."""
+    prof = get_profile(profile or cfg.profile)
+    if prof.name != cfg.profile:
+        cfg = replace(cfg, profile=prof.name)
+    if prof.max_correction_rounds is not None and cfg.max_correction_rounds > prof.max_correction_rounds:
+        cfg = replace(cfg, max_correction_rounds=prof.max_correction_rounds)
+    return cfg
+
+def get_compiled(cfg: PipelineConfig = PipelineConfig()):
+    """Compiled graph for cfg.profile, built once per (profile, config hash)."""
+    key = (cfg.profile, hashlib.sha256(_cfg_salt(cfg).encode("utf-8")).hexdigest())
+    compiled = _COMPILED.get(key)
+    if compiled is None:
+        compiled = _COMPILED[key] = build_graph(cfg).compile()
+    return compiled
+
+def _covers(entry: Optional[Dict[str, Any]], outputs: FrozenSet[str]) -> bool:
+    return entry is not None and outputs <= frozenset(entry.get("outputs") or ())
+
+def _from_cache(entry: Dict[str, Any]) -> Dict[str, Any]:
+    out = copy.deepcopy(entry)
+    out["cached"] = True
+    return out
+
+def run_config(cfg: PipelineConfig, recursion_limit: int | None = None) -> Dict[str, Any]:
+    """LangGraph config for one run; nodes read their runtime handles from configurable["run"]."""
+    return {
+        "recursion_limit": recursion_limit or cfg.recursion_limit,
+        "configurable": {"run": make_run_context(cfg)},
+    }
+
+def _deadline(cfg: PipelineConfig) -> Optional[float]:
+    """Absolute time.monotonic() deadline for a run starting now, or None without a budget."""
+    return time.monotonic() + cfg.deadline_s if cfg.deadline_s and cfg.deadline_s > 0 else None
+
+async def _invoke(reference: str, cfg: PipelineConfig, recursion_limit: int | None,
+                  outputs: FrozenSet[str] = ALL_OUTPUTS, deadline: Optional[float] = None):
+    compiled = get_compiled(cfg)
+    state: PipelineState = {"reference": reference, "_cfg": cfg, "_outputs": outputs}
+    deadline = deadline or _deadline(cfg)
+    if deadline is not None:
+        state["_deadline"] = deadline
+    t0 = time.perf_counter()
+    try:
+        return await compiled.ainvoke(state, config=run_config(cfg, recursion_limit))
+    finally:
+        # Uncached pipeline latency per execution and output profile (e.g. run_one.ms.fast.csl_json)
+        observe(f"run_one.ms.{cfg.profile}.{output_profile(outputs)}", (time.perf_counter() - t0) * 1000)
+
+async def run_one(reference: str, cfg: PipelineConfig = PipelineConfig(), recursion_limit: int | None = None,
+                  refresh: bool = False, outputs: Union[str, Iterable[str], None] = None,
+                  profile: Optional[str] = None, deadline_s: Optional[float] = None,
+                  priority: Optional[str] = None):
     """
     Execute the pipeline for a single reference.
-    - Uses a module-level compiled graph (no re-compilation per call).
+    - Uses module-level compiled graphs, one per profile (no re-compilation per call).
+    - `profile` (fast | balanced | thorough, default cfg.profile) picks the
+      graph variant; results are cached separately per profile.
+    - `deadline_s` (default cfg.deadline_s, 0 = unlimited) bounds the whole run,
+      including time spent waiting on an identical in-flight reference: nodes
+      drop late lookups/LLM calls, the loop exits to formatting, and the report
+      lists what was skipped. Such degraded results are not cached.
+    - `priority` (interactive | bulk, default cfg.llm_priority) is the LLM
+      scheduler class; interactive calls are admitted ahead of bulk ones.
     - Does NOT render/emit Mermaid PNGs (removes I/O overhead).
+    - Serves repeats of the same (normalized) reference from a bounded TTL result
+      cache; concurrent identical references share one pipeline run.
+      `refresh=True` bypasses the cache lookup (forced re-verification) and
+      stores the fresh result.
+    - `outputs` selects what the caller needs (see OUTPUTS; default: all).
+      Formatting, export and report stages nobody asked for are skipped;
+      a cached or in-flight result is reused if it covers the selection.
     """
-    global _COMPILED
-    if _COMPILED is None:
-        _COMPILED = build_graph(cfg).compile()
-
-    state: PipelineState = {"reference": reference, "_cfg": cfg}
-    return await _COMPILED.ainvoke(
-        state,
-        config={"recursion_limit": recursion_limit or cfg.recursion_limit}
-    )
+    selected = normalize_outputs(outputs)
+    cfg = _profile_cfg(cfg, profile)
+    if deadline_s is not None:
+        cfg = replace(cfg, deadline_s=deadline_s)
+    if priority is not None:
+        cfg = replace(cfg, llm_priority=priority)
+    if cfg.result_cache_size <= 0:
+        return await _invoke(reference, cfg, recursion_limit, selected)
+
+    deadline = _deadline(cfg)
+    cache = _get_result_cache(cfg)
+    key = _result_key(reference, cfg)
+    if not refresh:
+        hit = cache.get(key)
+        if _covers(hit, selected):
+            incr("result_cache.hit")
+            return _from_cache(hit)
+        pending = _INFLIGHT.get(key)
+        if pending is not None:
+            # The shared run does not know this caller's deadline: stop waiting when it
+            # passes and run the pipeline (which then only has its degraded path left)
+            wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                shared = await asyncio.wait_for(asyncio.shield(pending), wait)
+            except asyncio.TimeoutError:
+                incr("result_cache.shared_timeout")
+                shared = None
+            if _covers(shared, selected):
+                incr("result_cache.shared")
+                return _from_cache(shared)
+    incr("result_cache.miss" if not refresh else "result_cache.bypass")
+
+    fut = None
+    if key not in _INFLIGHT:
+        fut = asyncio.get_running_loop().create_future()
+        _INFLIGHT[key] = fut
+    try:
+        out = await _invoke(reference, cfg, recursion_limit, selected, deadline)
+    except BaseException:
+        # Waiters fall back to running the pipeline themselves
+        if fut is not None and not fut.done():
+            fut.set_result(None)
+        raise
+    finally:
+        if fut is not None and _INFLIGHT.get(key) is fut:
+            del _INFLIGHT[key]
+
+    entry = None
+    # Only complete, successful runs are cached, so transient LLM/source outages and
+    # deadline-degraded results are not pinned for the TTL
+    if _cacheable(out, selected):
+        entry = copy.deepcopy({k: out.get(k) for k in RESULT_KEYS})
+        entry["outputs"] = sorted(selected)
+        prev = cache.get(key)
+        # Never replace a broader cached result with a narrower one
+        if refresh or prev is None or not selected < frozenset(prev.get("outputs") or ()):
+            cache[key] = entry
+    if fut is not None and not fut.done():
+        fut.set_result(entry)
+    return out
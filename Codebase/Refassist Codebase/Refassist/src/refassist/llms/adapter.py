@@ -1,22 +1,182 @@
 import os
-from typing import Any, Dict, Optional
+import asyncio
+import weakref
+import json as _json
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
 from ..config import PipelineConfig
 from ..logging import logger
-from ..tools.utils import safe_json_load, DEFAULT_UA
+from ..metrics import incr, observe
+from ..tools.utils import safe_json_load, estimate_tokens, DEFAULT_UA
+from .schemas import LLMSchema, validate_output
+from .scheduler import get_scheduler
 
 try:
     import httpx
 except Exception:
     httpx = None
 
+JSON_SYSTEM = "Return STRICT JSON only. No prose."
+TEXT_SYSTEM = "You are a precise formatter. Output plain text only."
+
+PROVIDERS = ("openai", "azure", "anthropic", "ollama")
+LLM_NODES = ("validate", "type", "parse", "correct", "format")
+
+def _system_block(base: str, system: Optional[str]) -> str:
+    # Static instructions first and byte-identical across calls. Provider prompt caches
+    # (OpenAI automatic, Anthropic cache_control) need a prefix of 1024+ tokens; these
+    # prompts are a few hundred at most, so no cache_control is sent
+    return f"{base}\n\n{system}" if system else base
+
+def parse_llm_target(target: str) -> Optional[Tuple[str, Optional[str]]]:
+    """"provider[:model]" -> (provider, model or None); None if the provider is unknown."""
+    provider, _, model = (target or "").strip().partition(":")
+    provider = provider.strip()
+    if provider not in PROVIDERS:
+        return None
+    return provider, model.strip() or None
+
+def parse_llm_routes(spec: str) -> Dict[str, Tuple[str, Optional[str]]]:
+    """
+    Parse IEEE_REF_LLM_ROUTES, e.g. "validate=ollama:llama3.2,type=ollama,format=openai:gpt-4o".
+    Returns {node: (provider, model or None)}; malformed entries are logged and ignored.
+    """
+    routes: Dict[str, Tuple[str, Optional[str]]] = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        node, _, target = part.partition("=")
+        node = node.strip()
+        parsed = parse_llm_target(target)
+        if node not in LLM_NODES or parsed is None:
+            logger.warning("Ignoring LLM route %r (nodes: %s; providers: %s)",
+                           part, ", ".join(LLM_NODES), ", ".join(PROVIDERS))
+            continue
+        routes[node] = parsed
+    return routes
+
+# ------------------------------
+# Provider clients, shared across the runs of one event loop (one connection pool per
+# provider endpoint). Async clients are bound to the loop that first used them, so
+# every loop (e.g. each asyncio.run) gets its own; they go away with their loop.
+# ------------------------------
+_ClientKey = Tuple[str, Optional[str], float]
+_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[_ClientKey, Any]]" = weakref.WeakKeyDictionary()
+_INIT_FAILED: Dict[_ClientKey, float] = {}   # key -> time.monotonic() of the last failed init
+
+def _base_url(provider: str, cfg: PipelineConfig) -> Optional[str]:
+    if provider == "openai":
+        return os.getenv("OPENAI_API_BASE")
+    if provider == "azure":
+        return os.getenv("AZURE_OPENAI_ENDPOINT")
+    if provider == "anthropic":
+        return os.getenv("ANTHROPIC_BASE_URL")
+    if provider == "ollama":
+        return os.getenv("OLLAMA_BASE_URL") or os.getenv("OLLAMA_HOST") or cfg.ollama_base
+    return None
+
+def _make_client(provider: str, base: Optional[str], cfg: PipelineConfig) -> Any:
+    if provider == "openai":
+        # Async clients: calls yield to the event loop and can be cancelled on deadline
+        from openai import AsyncOpenAI
+        # Retries are left to the scheduler (max_retries=0), which also honours budgets
+        return AsyncOpenAI(base_url=base, max_retries=0) if base else AsyncOpenAI(max_retries=0)
+    if provider == "azure":
+        from openai import AsyncAzureOpenAI
+        ver = os.getenv("OPENAI_API_VERSION", "2024-06-01")
+        if not base: raise RuntimeError("AZURE_OPENAI_ENDPOINT is not set")
+        return AsyncAzureOpenAI(azure_endpoint=base, api_version=ver, max_retries=0)
+    if provider == "anthropic":
+        import anthropic
+        return anthropic.AsyncAnthropic(max_retries=0)
+    if provider == "ollama":
+        if httpx is None: raise RuntimeError("httpx is not installed")
+        return httpx.AsyncClient(base_url=base, timeout=cfg.timeout_s, headers={"User-Agent": DEFAULT_UA})
+    return None
+
+def _client_for(provider: str, cfg: PipelineConfig) -> Any:
+    """
+    Client for `provider` at its configured endpoint and timeout, pooled per running
+    event loop (unpooled outside one). None if it cannot be created; creation is
+    retried once cfg.llm_disable_s has passed.
+    """
+    if provider not in PROVIDERS:
+        return None
+    base = _base_url(provider, cfg)
+    key = (provider, base, cfg.timeout_s)
+    try:
+        pool = _CLIENTS.setdefault(asyncio.get_running_loop(), {})
+    except RuntimeError:
+        pool = {}
+    client = pool.get(key)
+    if client is not None:
+        return client
+    failed_at = _INIT_FAILED.get(key)
+    if failed_at is not None and time.monotonic() - failed_at < cfg.llm_disable_s:
+        return None
+    try:
+        client = pool[key] = _make_client(provider, base, cfg)
+        _INIT_FAILED.pop(key, None)
+    except Exception as e:
+        logger.warning("LLM init failed (%s): %s", provider, e)
+        _INIT_FAILED[key] = time.monotonic()
+    return client
+
+# ------------------------------
+# Provider health: repeated runtime errors disable a provider for a cool-down period
+# ------------------------------
+_HEALTH: Dict[str, Dict[str, float]] = {}
+
+def provider_healthy(provider: str) -> bool:
+    h = _HEALTH.get(provider)
+    return h is None or h["disabled_until"] <= time.monotonic()
+
+def _mark_provider(provider: str, ok: bool, cfg: PipelineConfig) -> None:
+    h = _HEALTH.setdefault(provider, {"failures": 0, "disabled_until": 0.0})
+    if ok:
+        h["failures"] = 0
+        return
+    incr(f"llm.{provider}.errors")
+    h["failures"] += 1
+    if h["failures"] >= cfg.llm_max_failures:
+        h["failures"] = 0
+        h["disabled_until"] = time.monotonic() + cfg.llm_disable_s
+        incr(f"llm.{provider}.disabled")
+        logger.warning("LLM provider %s disabled for %ss after repeated errors", provider, cfg.llm_disable_s)
+
+def _usable(task: "asyncio.Future", json_mode: bool) -> bool:
+    """A finished call that returned something the caller can use (valid JSON in JSON mode)."""
+    if task.cancelled() or task.exception() is not None:
+        return False
+    out = task.result()
+    if not out or not json_mode or isinstance(out, dict):
+        return bool(out)
+    try:
+        return isinstance(_json.loads(out), dict)
+    except Exception:
+        return False
+
 class LLMAdapter:
     """LLM adapter supporting OpenAI, Azure OpenAI, Anthropic, Ollama.
-       Provides .json(prompt) and .text(prompt) convenience methods."""
+       Provides .json(prompt) and .text(prompt) convenience methods.
+       Callers pass static instructions as `system` (stable prefix) and only the
+       per-reference payload as `prompt`. With a `schema`, JSON output is constrained
+       by the provider and validated; problems are kept in `errors` for the report.
+       Callers also name their `node`; cfg.llm_routes can send a node to another
+       provider/model (e.g. a small local model for classification). With cfg.llm_hedge,
+       a call still running after cfg.llm_hedge_after_s (or one that failed) is raced
+       against that secondary provider; providers that keep erroring are skipped for a while."""
     def __init__(self, cfg: PipelineConfig):
         self.cfg = cfg
         self.provider = self._auto_provider(cfg.llm_provider)
-        self._client = None
-        self._init_client()
+        self.routes = parse_llm_routes(cfg.llm_routes)
+        self.hedge = parse_llm_target(cfg.llm_hedge) if cfg.llm_hedge else None
+        self.errors: List[str] = []   # schema/validation problems seen during this run
+        self.failures: List[str] = [] # calls that failed outright (provider/network errors)
+        self._client = _client_for(self.provider, cfg)
+        if self._client is None:
+            self.provider = "dummy"
 
     def _auto_provider(self, p: str) -> str:
         if p != "auto": return p
@@ -26,133 +186,233 @@ class LLMAdapter:
         if os.getenv("OLLAMA_BASE_URL") or os.getenv("OLLAMA_HOST"): return "ollama"
         return "dummy"
 
-    def _init_client(self):
-        prov = self.provider
-        try:
-            if prov == "openai":
-                from openai import OpenAI
-                base = os.getenv("OPENAI_API_BASE")
-                self._client = OpenAI(base_url=base) if base else OpenAI()
-            elif prov == "azure":
-                from openai import AzureOpenAI
-                ep = os.getenv("AZURE_OPENAI_ENDPOINT")
-                ver = os.getenv("OPENAI_API_VERSION", "2024-06-01")
-                if not ep: raise RuntimeError("AZURE_OPENAI_ENDPOINT is not set")
-                self._client = AzureOpenAI(azure_endpoint=ep, api_version=ver)
-            elif prov == "anthropic":
-                import anthropic
-                self._client = anthropic.AsyncAnthropic()
-            elif prov == "ollama" and httpx is not None:
-                base = os.getenv("OLLAMA_BASE_URL") or os.getenv("OLLAMA_HOST") or self.cfg.ollama_base
-                self._client = httpx.AsyncClient(base_url=base, timeout=self.cfg.timeout_s, headers={"User-Agent": DEFAULT_UA})
-        except Exception as e:
-            logger.warning("LLM init failed: %s", e)
-            self._client = None
-            self.provider = "dummy"
+    def _default_model(self, provider: str) -> str:
+        if provider == "azure":
+            return os.getenv("AZURE_OPENAI_DEPLOYMENT") or self.cfg.openai_model
+        if provider == "anthropic":
+            return os.getenv("ANTHROPIC_MODEL", "claude-3-5-sonnet-20240620")
+        if provider == "ollama":
+            return self.cfg.ollama_model
+        return self.cfg.openai_model
 
-    # ---------- JSON mode ----------
-    async def _openai_json(self, prompt: str) -> str:
-        model = self.cfg.openai_model
-        resp = self._client.chat.completions.create(
+    def _target(self, provider: str, model: Optional[str]) -> Optional[Tuple[str, str, Any]]:
+        client = _client_for(provider, self.cfg)
+        if client is None:
+            return None
+        return provider, model or self._default_model(provider), client
+
+    def _targets(self, node: Optional[str]) -> List[Tuple[str, str, Any]]:
+        """
+        (provider, model, client) candidates for a node: the primary (its route, else the
+        default provider) and optionally the hedge. Disabled providers are passed over;
+        if none is healthy the first candidate is still tried.
+        """
+        primaries = []
+        if node in self.routes:
+            primaries.append(self._target(*self.routes[node]))
+        if self.provider != "dummy":
+            primaries.append(self._target(self.provider, None))
+        primaries = [t for t in primaries if t is not None]
+        hedge = self._target(*self.hedge) if self.hedge else None
+        healthy = [t for t in primaries if provider_healthy(t[0])]
+        out = healthy[:1]
+        if hedge is not None and provider_healthy(hedge[0]) and hedge[:2] not in [t[:2] for t in out]:
+            out.append(hedge)
+        return out or primaries[:1]
+
+    # ---------- Usage accounting ----------
+    def _record_usage(self, p: str, prompt_tokens: int = 0, cached_tokens: int = 0) -> None:
+        # cached_tokens stays 0 until prompts pass the providers' caching minimum (see _system_block)
+        incr(f"llm.{p}.calls")
+        incr(f"llm.{p}.prompt_tokens", prompt_tokens or 0)
+        incr(f"llm.{p}.cached_tokens", cached_tokens or 0)
+
+    def _openai_usage(self, provider: str, resp) -> None:
+        usage = getattr(resp, "usage", None)
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        self._record_usage(provider, getattr(usage, "prompt_tokens", 0), getattr(details, "cached_tokens", 0) if details else 0)
+
+    def _anthropic_usage(self, msg) -> None:
+        usage = getattr(msg, "usage", None)
+        if usage is None:
+            return
+        read = getattr(usage, "cache_read_input_tokens", 0) or 0
+        # input_tokens excludes cached reads on Anthropic
+        self._record_usage("anthropic", (getattr(usage, "input_tokens", 0) or 0) + read, read)
+
+    def _ollama_usage(self, body: Dict[str, Any]) -> None:
+        # Ollama only reports evaluated tokens
+        self._record_usage("ollama", body.get("prompt_eval_count") or 0)
+
+    # ---------- Provider calls ----------
+    async def _openai_chat(self, provider: str, client: Any, model: str, system: str, prompt: str,
+                           json_mode: bool, schema: Optional[LLMSchema] = None) -> str:
+        kwargs = {}
+        if schema is not None:
+            kwargs["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": schema.name, "schema": schema.schema, "strict": True},
+            }
+        elif json_mode:
+            kwargs["response_format"] = {"type": "json_object"}
+        resp = await client.chat.completions.create(
             model=model,
-            messages=[{"role":"system","content":"Return STRICT JSON only. No prose."},{"role":"user","content":prompt}],
-            temperature=0.1, top_p=0.1, response_format={"type":"json_object"},
-        )
-        return resp.choices[0].message.content
-
-    async def _azure_json(self, prompt: str) -> str:
-        deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT") or self.cfg.openai_model
-        resp = self._client.chat.completions.create(
-            model=deployment,
-            messages=[{"role":"system","content":"Return STRICT JSON only. No prose."},{"role":"user","content":prompt}],
-            temperature=0.1, top_p=0.1, response_format={"type":"json_object"},
+            messages=[{"role":"system","content":system},{"role":"user","content":prompt}],
+            temperature=0.1, top_p=0.1, **kwargs,
         )
-        return resp.choices[0].message.content
+        self._openai_usage(provider, resp)
+        return resp.choices[0].message.content or ""
 
-    async def _anthropic_json(self, prompt: str) -> str:
-        msg = await self._client.messages.create(
-            model=os.getenv("ANTHROPIC_MODEL","claude-3-5-sonnet-20240620"),
-            system="Return STRICT JSON only. No prose.",
+    async def _anthropic_messages(self, client: Any, model: str, system: str, prompt: str,
+                                  schema: Optional[LLMSchema] = None) -> Union[str, Dict[str, Any]]:
+        kwargs = {}
+        if schema is not None:
+            # Forced tool use: the tool input is the structured result
+            kwargs["tools"] = [{
+                "name": schema.name,
+                "description": f"Record the {schema.name.replace('_', ' ')}.",
+                "input_schema": schema.schema,
+            }]
+            kwargs["tool_choice"] = {"type": "tool", "name": schema.name}
+        msg = await client.messages.create(
+            model=model,
+            system=system,
             max_tokens=1024, temperature=0.1,
             messages=[{"role":"user","content":prompt}],
+            **kwargs,
         )
+        self._anthropic_usage(msg)
+        if schema is not None:
+            for c in msg.content:
+                if getattr(c, "type", None) == "tool_use":
+                    return c.input
         texts = []
         for c in msg.content:
             if getattr(c, "type", None) == "text":
                 texts.append(c.text)
         return "".join(texts)
 
-    async def _ollama_json(self, prompt: str) -> str:
-        data = {"model": self.cfg.ollama_model, "prompt": "Return STRICT JSON only.\n\n" + prompt, "stream": False}
-        r = await self._client.post("/api/generate", json=data)
+    async def _ollama_generate(self, client: Any, model: str, system: str, prompt: str,
+                               schema: Optional[LLMSchema] = None) -> str:
+        data = {"model": model, "system": system, "prompt": prompt, "stream": False}
+        if schema is not None:
+            data["format"] = schema.schema   # structured outputs (JSON schema) in /api/generate
+        r = await client.post("/api/generate", json=data)
         r.raise_for_status()
-        return r.json().get("response","")
+        body = r.json()
+        self._ollama_usage(body)
+        return body.get("response","")
 
-    async def json(self, prompt: str) -> Dict[str, Any]:
-        try:
-            if self.provider == "openai": raw = await self._openai_json(prompt)
-            elif self.provider == "azure": raw = await self._azure_json(prompt)
-            elif self.provider == "anthropic": raw = await self._anthropic_json(prompt)
-            elif self.provider == "ollama": raw = await self._ollama_json(prompt)
-            else: return {}
-            return safe_json_load(raw) or {}
-        except Exception as e:
-            logger.warning("LLM json() failed: %s", e)
-            return {}
+    async def _call(self, node: Optional[str], target: Tuple[str, str, Any], system: str, prompt: str,
+                    json_mode: bool, schema: Optional[LLMSchema] = None) -> Union[str, Dict[str, Any]]:
+        provider, model, client = target
 
-    # ---------- TEXT mode (for formatted references) ----------
-    async def _openai_text(self, prompt: str) -> str:
-        model = self.cfg.openai_model
-        resp = self._client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role":"system","content":"You are a precise formatter. Output plain text only."},
-                {"role":"user","content":prompt}
-            ],
-            temperature=0.1, top_p=0.1,
-        )
-        return resp.choices[0].message.content or ""
+        async def send() -> Union[str, Dict[str, Any]]:
+            t0 = time.perf_counter()
+            try:
+                if provider in ("openai", "azure"):
+                    return await self._openai_chat(provider, client, model, system, prompt, json_mode, schema)
+                if provider == "anthropic":
+                    return await self._anthropic_messages(client, model, system, prompt, schema)
+                return await self._ollama_generate(client, model, system, prompt, schema)
+            finally:
+                observe(f"llm.node.{node or 'other'}.{provider}.ms", (time.perf_counter() - t0) * 1000)
 
-    async def _azure_text(self, prompt: str) -> str:
-        deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT") or self.cfg.openai_model
-        resp = self._client.chat.completions.create(
-            model=deployment,
-            messages=[
-                {"role":"system","content":"You are a precise formatter. Output plain text only."},
-                {"role":"user","content":prompt}
-            ],
-            temperature=0.1, top_p=0.1,
-        )
-        return resp.choices[0].message.content or ""
+        try:
+            out = await get_scheduler(self.cfg).run(provider, send, self.cfg.llm_priority,
+                                                    estimate_tokens(system + prompt))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            _mark_provider(provider, False, self.cfg)
+            raise
+        _mark_provider(provider, True, self.cfg)
+        return out
 
-    async def _anthropic_text(self, prompt: str) -> str:
-        msg = await self._client.messages.create(
-            model=os.getenv("ANTHROPIC_MODEL","claude-3-5-sonnet-20240620"),
-            system="You are a precise formatter. Output plain text only.",
-            max_tokens=1024, temperature=0.1,
-            messages=[{"role":"user","content":prompt}],
-        )
-        texts = []
-        for c in msg.content:
-            if getattr(c, "type", None) == "text":
-                texts.append(c.text)
-        return "".join(texts)
+    async def _race(self, node: Optional[str], primary: Tuple[str, str, Any], hedge: Tuple[str, str, Any],
+                    *args: Any) -> Union[str, Dict[str, Any]]:
+        """First usable response of primary and hedge; the hedge starts late (or on failure), the loser is cancelled."""
+        json_mode = args[2]
+        tasks = [asyncio.ensure_future(self._call(node, primary, *args))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.cfg.llm_hedge_after_s)
+            if done and _usable(tasks[0], json_mode):
+                return tasks[0].result()
+            incr("llm.hedge.failover" if done else "llm.hedge.started")
+            tasks.append(asyncio.ensure_future(self._call(node, hedge, *args)))
+            pending = {t for t in tasks if not t.done()}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    if _usable(t, json_mode):
+                        if t is tasks[1]:
+                            incr("llm.hedge.won")
+                        return t.result()
+            # Neither was usable: hand back whatever returned (JSON salvage happens in the caller)
+            for t in tasks:
+                if t.exception() is None:
+                    return t.result()
+            return tasks[0].result()
+        finally:
+            for t in tasks:
+                if not t.done():
+                    t.cancel()
 
-    async def _ollama_text(self, prompt: str) -> str:
-        if not self._client:
+    async def _complete(self, node: Optional[str], system: str, prompt: str, json_mode: bool,
+                        schema: Optional[LLMSchema] = None) -> Union[str, Dict[str, Any]]:
+        targets = self._targets(node)
+        if not targets:
             return ""
-        data = {"model": self.cfg.ollama_model, "prompt": prompt, "stream": False}
-        r = await self._client.post("/api/generate", json=data)
-        r.raise_for_status()
-        return r.json().get("response","")
+        if len(targets) == 1:
+            return await self._call(node, targets[0], system, prompt, json_mode, schema)
+        return await self._race(node, targets[0], targets[1], system, prompt, json_mode, schema)
+
+    def note_errors(self, errors: List[str]) -> None:
+        if not errors:
+            return
+        incr("llm.schema_errors", len(errors))
+        for e in errors:
+            logger.warning("LLM output invalid: %s", e)
+            if e not in self.errors:
+                self.errors.append(e)
+
+    def _decode(self, raw: Union[str, Dict[str, Any], None], schema: Optional[LLMSchema]) -> Any:
+        if isinstance(raw, dict):
+            return raw
+        try:
+            return _json.loads(raw or "")
+        except Exception:
+            salvaged = safe_json_load(raw)
+            if schema is not None:
+                self.note_errors([f"{schema.name}: response was not valid JSON"
+                                   + (" (partially recovered)" if salvaged else "")])
+            return salvaged or {}
+
+    # ---------- JSON mode ----------
+    async def json(self, prompt: str, system: Optional[str] = None,
+                   schema: Optional[LLMSchema] = None, node: Optional[str] = None) -> Dict[str, Any]:
+        if not self._targets(node):
+            return {}
+        try:
+            raw = await self._complete(node, _system_block(JSON_SYSTEM, system), prompt, json_mode=True, schema=schema)
+        except Exception as e:
+            logger.warning("LLM json() failed: %s", e)
+            self.failures.append(f"{node or 'llm'}: {type(e).__name__}")
+            return {}
+        data = self._decode(raw, schema)
+        if schema is None:
+            return data if isinstance(data, dict) else {}
+        data, errors = validate_output(schema, data)
+        self.note_errors(errors)
+        return data
 
-    async def text(self, prompt: str) -> str:
+    # ---------- TEXT mode (for formatted references) ----------
+    async def text(self, prompt: str, system: Optional[str] = None, node: Optional[str] = None) -> str:
         try:
-            if self.provider == "openai": return await self._openai_text(prompt)
-            elif self.provider == "azure": return await self._azure_text(prompt)
-            elif self.provider == "anthropic": return await self._anthropic_text(prompt)
-            elif self.provider == "ollama": return await self._ollama_text(prompt)
-            else: return ""
+            return await self._complete(node, _system_block(TEXT_SYSTEM, system), prompt, json_mode=False)
         except Exception as e:
             logger.warning("LLM text() failed: %s", e)
+            self.failures.append(f"{node or 'llm'}: {type(e).__name__}")
             return ""
@@ -0,0 +1,170 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+from ..config import PipelineConfig
+from ..logging import logger
+from ..metrics import incr, observe
+
+# Process-wide LLM admission control. Every provider call goes through one scheduler:
+# a cap on requests in flight and per-provider requests/tokens-per-minute budgets, both
+# granted from one queue by priority, then arrival; and retry with backoff on rate limiting.
+
+T = TypeVar("T")
+
+PRIORITIES = {"interactive": 0, "bulk": 1}
+_WINDOW_S = 60.0
+
+def is_rate_limited(e: BaseException) -> bool:
+    status = getattr(e, "status_code", None)
+    if status is None:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+    # 529 is Anthropic's "overloaded"
+    return status in (429, 529) or type(e).__name__ == "RateLimitError"
+
+def _retry_after(e: BaseException) -> Optional[float]:
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+class LLMScheduler:
+    def __init__(self, max_inflight: int, rpm: int = 0, tpm: int = 0, retries: int = 3, backoff_s: float = 1.0):
+        self._inflight = 0
+        # (priority, arrival, provider, tokens, future) of calls waiting for admission
+        self._waiters: List[Tuple[int, int, str, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._windows: Dict[str, Deque[Tuple[float, int]]] = defaultdict(deque)
+        self._timer: Optional[asyncio.TimerHandle] = None   # next budget refill check
+        self.configure(max_inflight, rpm, tpm, retries, backoff_s)
+
+    def configure(self, max_inflight: int, rpm: int = 0, tpm: int = 0, retries: int = 3,
+                  backoff_s: float = 1.0) -> None:
+        """(Re)set the limits; raised limits admit queued calls right away."""
+        self.max_inflight = max(1, max_inflight)
+        self.rpm = rpm            # 0 = unlimited
+        self.tpm = tpm            # 0 = unlimited
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self._dispatch()
+
+    # ---------- Admission: in-flight slots and budgets ----------
+    async def _admit(self, provider: str, tokens: int, priority: int) -> None:
+        """Wait for an in-flight slot and `provider` budget for `tokens`, granted together."""
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), provider, tokens, fut))
+        self._dispatch()
+        if not fut.done():
+            observe("llm.queue.depth", len(self._waiters))
+            if self._budget_wait(provider, tokens) > 0:
+                incr(f"llm.{provider}.budget_waits")
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release()       # admitted just as we were cancelled
+            raise
+
+    def _dispatch(self) -> None:
+        """
+        Admit waiters best priority first while slots are free. A waiter whose provider is
+        out of budget holds back every later waiter for that provider (so interactive calls
+        keep their precedence while the budget refills); other providers go ahead. A timer
+        re-runs this when the earliest budget frees up.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        held, blocked = [], set()
+        refill: Optional[float] = None
+        while self._waiters and self._inflight < self.max_inflight:
+            item = heapq.heappop(self._waiters)
+            _, _, provider, tokens, fut = item
+            if fut.done():
+                continue
+            if provider in blocked:
+                held.append(item)
+                continue
+            wait = self._budget_wait(provider, tokens)
+            if wait > 0:
+                blocked.add(provider)
+                held.append(item)
+                refill = wait if refill is None else min(refill, wait)
+                continue
+            self._windows[provider].append((time.monotonic(), tokens))
+            self._inflight += 1
+            fut.set_result(None)
+        for item in held:
+            heapq.heappush(self._waiters, item)
+        if refill is not None:
+            try:
+                self._timer = asyncio.get_running_loop().call_later(refill, self._dispatch)
+            except RuntimeError:
+                pass                  # no loop (configure() from sync code): next release dispatches
+
+    def _release(self) -> None:
+        self._inflight -= 1
+        self._dispatch()
+
+    # ---------- Per-minute budgets ----------
+    def _budget_wait(self, provider: str, tokens: int) -> float:
+        window = self._windows[provider]
+        now = time.monotonic()
+        while window and now - window[0][0] >= _WINDOW_S:
+            window.popleft()
+        if not window:
+            return 0.0
+        if self.rpm and len(window) >= self.rpm:
+            return _WINDOW_S - (now - window[len(window) - self.rpm][0])
+        if self.tpm:
+            used = sum(t for _, t in window)
+            if used + tokens > self.tpm:
+                # Wait until enough of the oldest usage has left the window
+                for ts, t in window:
+                    used -= t
+                    if used + tokens <= self.tpm:
+                        return _WINDOW_S - (now - ts)
+                return _WINDOW_S - (now - window[-1][0])   # oversized request: runs alone
+        return 0.0
+
+    # ---------- Entry point ----------
+    async def run(self, provider: str, call: Callable[[], Awaitable[T]],
+                  priority: str = "interactive", tokens: int = 0) -> T:
+        """Run `call` once admitted; retries it with backoff when the provider rate-limits."""
+        prio = PRIORITIES.get(priority, PRIORITIES["bulk"])
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            await self._admit(provider, tokens, prio)
+            try:
+                observe(f"llm.queue.wait_ms.{priority}", (time.perf_counter() - t0) * 1000)
+                return await call()
+            except Exception as e:
+                if attempt >= self.retries or not is_rate_limited(e):
+                    raise
+                incr(f"llm.{provider}.rate_limited")
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = self.backoff_s * (2 ** attempt) * (0.5 + random.random())
+                logger.info("LLM %s rate-limited; retry %s in %.1fs", provider, attempt + 1, delay)
+            finally:
+                self._release()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+_SCHEDULER: Optional[LLMScheduler] = None
+
+def get_scheduler(cfg: PipelineConfig) -> LLMScheduler:
+    """The process-wide scheduler, with the limits of the calling run's config."""
+    global _SCHEDULER
+    limits = (cfg.llm_max_inflight, cfg.llm_rpm, cfg.llm_tpm, cfg.llm_retries, cfg.llm_backoff_s)
+    if _SCHEDULER is None:
+        _SCHEDULER = LLMScheduler(*limits)
+    elif limits != (_SCHEDULER.max_inflight, _SCHEDULER.rpm, _SCHEDULER.tpm,
+                    _SCHEDULER.retries, _SCHEDULER.backoff_s):
+        _SCHEDULER.configure(*limits)
+    return _SCHEDULER
@@ -0,0 +1,88 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Literal, Tuple, Type
+from pydantic import BaseModel, ValidationError, field_validator
+from ..state import ExtractedModel
+from ..tools.utils import authors_to_list
+
+# Per-node output schemas. The JSON schema goes to the provider (OpenAI json_schema,
+# Anthropic forced tool use, Ollama format); the pydantic model validates what comes back.
+
+REFERENCE_TYPES = (
+    "journal article", "conference paper", "book", "book chapter", "thesis",
+    "technical report", "dataset", "standard", "software", "other",
+)
+_EXTRACTED_FIELDS = (
+    "title", "authors", "journal_name", "journal_abbrev", "conference_name", "volume", "issue",
+    "pages", "year", "month", "doi", "publisher", "location", "edition", "isbn", "url",
+)
+
+@dataclass(frozen=True)
+class LLMSchema:
+    name: str
+    schema: Dict[str, Any]     # strict-mode compatible: every key required, unknowns as null
+    model: Type[BaseModel]
+
+class ReferenceCheck(BaseModel):
+    is_reference: bool
+
+class TypeVote(BaseModel):
+    type: Literal[REFERENCE_TYPES]  # type: ignore[valid-type]
+
+class ExtractedFields(ExtractedModel):
+    """ExtractedModel as produced by an LLM: numbers become strings, author strings are split."""
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def _coerce(cls, v: Any, info):
+        if info.field_name == "authors":
+            return authors_to_list(v) if isinstance(v, str) else v
+        if isinstance(v, (int, float)) and not isinstance(v, bool):
+            return str(v)
+        return v
+
+def _strict_object(props: Dict[str, Any]) -> Dict[str, Any]:
+    """Strict-mode object schema: every property required, no extras (nullability is per property)."""
+    return {
+        "type": "object",
+        "properties": props,
+        "required": list(props),
+        "additionalProperties": False,
+    }
+
+_STR_OR_NULL = {"type": ["string", "null"]}
+_EXTRACTED_SCHEMA = _strict_object({
+    k: ({"type": ["array", "null"], "items": {"type": "string"}} if k == "authors" else _STR_OR_NULL)
+    for k in _EXTRACTED_FIELDS
+})
+
+REFERENCE_CHECK = LLMSchema("reference_check", _strict_object({"is_reference": {"type": "boolean"}}), ReferenceCheck)
+REFERENCE_TYPE = LLMSchema("reference_type", _strict_object({"type": {"type": "string", "enum": list(REFERENCE_TYPES)}}), TypeVote)
+EXTRACTED_REFERENCE = LLMSchema("extracted_reference", _EXTRACTED_SCHEMA, ExtractedFields)
+CORRECTION_PATCH = LLMSchema("correction_patch", _EXTRACTED_SCHEMA, ExtractedFields)
+
+def validate_output(schema: LLMSchema, data: Any) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Validate a model response. Invalid fields are dropped one by one (the rest is kept)
+    and every problem is returned as a readable error instead of vanishing silently.
+    """
+    if not isinstance(data, dict):
+        return {}, [f"{schema.name}: expected a JSON object, got {type(data).__name__}"]
+    data = {k: v for k, v in data.items() if v is not None}
+    errors: List[str] = []
+    unknown = [k for k in data if k not in schema.model.model_fields]
+    for k in unknown:
+        errors.append(f"{schema.name}.{k}: unexpected key")
+        data.pop(k)
+    try:
+        return schema.model(**data).model_dump(exclude_none=True), errors
+    except ValidationError as e:
+        bad = set()
+        for err in e.errors():
+            field = str(err["loc"][0]) if err.get("loc") else "?"
+            bad.add(field)
+            errors.append(f"{schema.name}.{field}: {err['msg']}")
+        rest = {k: v for k, v in data.items() if k not in bad}
+        try:
+            return schema.model(**rest).model_dump(exclude_none=True), errors
+        except ValidationError:
+            return {}, errors
@@ -0,0 +1,34 @@
+import threading
+from collections import defaultdict
+from typing import Any, Dict
+
+# Process-wide counters and timings (cheap, in-memory; exposed via /v1/metrics)
+_LOCK = threading.Lock()
+_COUNTERS: Dict[str, float] = defaultdict(float)
+_TIMINGS: Dict[str, Dict[str, float]] = {}
+
+def incr(name: str, n: float = 1) -> None:
+    with _LOCK:
+        _COUNTERS[name] += n
+
+def value(name: str) -> float:
+    with _LOCK:
+        return _COUNTERS.get(name, 0.0)
+
+def observe(name: str, value: float) -> None:
+    """Record one sample (e.g. a latency in ms); keeps count/sum/max."""
+    with _LOCK:
+        t = _TIMINGS.get(name)
+        if t is None:
+            t = _TIMINGS[name] = {"count": 0, "sum": 0.0, "max": 0.0}
+        t["count"] += 1
+        t["sum"] += value
+        t["max"] = max(t["max"], value)
+
+def snapshot() -> Dict[str, Any]:
+    with _LOCK:
+        timings = {
+            k: {**v, "avg": (v["sum"] / v["count"]) if v["count"] else 0.0}
+            for k, v in _TIMINGS.items()
+        }
+        return {"counters": dict(_COUNTERS), "timings": timings}
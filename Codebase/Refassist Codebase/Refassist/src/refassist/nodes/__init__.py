@@ -15,10 +15,11 @@ from .routing import should_exit, route_after_verify
 from .validate_reference import validate_input_reference
 from .verify_journal_abbrev import verify_journal_abbrev
 from .llm_format import llm_format  # NEW
+from .read_structured import read_structured, is_structured
 
 __all__ = [
     "init_runtime","detect_type","parse_extract","multisource_lookup","select_best",
     "verify_agents","apply_corrections","llm_correct","enrich_from_best",
     "format_reference","build_exports","build_report","cleanup","should_exit","route_after_verify",
-    "validate_input_reference","verify_journal_abbrev","llm_format",
+    "validate_input_reference","verify_journal_abbrev","llm_format","read_structured","is_structured",
 ]
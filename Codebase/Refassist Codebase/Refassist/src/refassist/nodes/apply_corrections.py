@@ -24,7 +24,7 @@ def _first_num(s: str) -> str:
     m = re.search(r"\d+", normalize_text(s))
     return m.group(0) if m else ""
 
-def apply_corrections(state: PipelineState) -> PipelineState:
+def apply_corrections(state: PipelineState) -> Dict[str, Any]:
     ex = dict(state["extracted"])
     best = state.get("best", {}) or {}
     prov = state.get("provenance", {}) or {}
@@ -114,18 +114,17 @@ def apply_corrections(state: PipelineState) -> PipelineState:
             ex["month"] = newm
             audit.setdefault("month","normalize")
 
-    state["extracted"] = ex
-    state["corrections"] = state.get("corrections", []) + changes
-    state["attempts"] = state.get("attempts", 0) + 1
-    state["_made_changes_last_cycle"] = bool(changes)
-    state["audit"] = audit
-
     sugg = state.get("suggestions", {})
     best_now = state.get("best", {})
     new_fp = fingerprint_state(ex, best_now, sugg)
     hist = state.get("_fp_history", set())
-    state["_loop_detected"] = new_fp in hist
-    hist.add(new_fp)
-    state["_fp_history"] = hist
-    state["_fp"] = new_fp
-    return state
+    return {
+        "extracted": ex,
+        "corrections": state.get("corrections", []) + changes,
+        "attempts": state.get("attempts", 0) + 1,
+        "_made_changes_last_cycle": bool(changes),
+        "audit": audit,
+        "_loop_detected": new_fp in hist,
+        "_fp_history": hist | {new_fp},
+        "_fp": new_fp,
+    }
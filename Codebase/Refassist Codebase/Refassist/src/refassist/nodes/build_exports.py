@@ -1,3 +1,4 @@
+from typing import Any, Dict
 from ..state import PipelineState
 from ..tools.utils import authors_to_list, safe_str, format_doi_link, normalize_month_field
 
@@ -129,8 +130,6 @@ def _to_bibtex(ex, rtype):
     body = ",\n  ".join([f"{k} = {{{v}}}" for k, v in fields])
     return f"@{entry_type}{{{key},\n  {body}\n}}"
 
-def build_exports(state: PipelineState) -> PipelineState:
+def build_exports(state: PipelineState) -> Dict[str, Any]:
     ex = state["extracted"]; rtype = (state["type"] or "other").lower()
-    state["csl_json"] = _to_csl_json(ex, rtype)
-    state["bibtex"] = _to_bibtex(ex, rtype)
-    return state
+    return {"csl_json": _to_csl_json(ex, rtype), "bibtex": _to_bibtex(ex, rtype)}
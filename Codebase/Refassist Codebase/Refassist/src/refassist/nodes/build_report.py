@@ -1,13 +1,45 @@
 import os
 import re
-from typing import Dict, List, Tuple, Any
+import io
+import copy
+import json
+import asyncio
+import time
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple, Any
+from langchain_core.runnables import RunnableConfig
 from docx import Document
 from docx.shared import Pt
-from ..state import PipelineState
+from ..state import PipelineState, get_run
 from ..tools.utils import authors_to_list, safe_str, format_doi_link, normalize_month_field, normalize_text
 
-TEMPLATE_PATH = os.path.join(os.getcwd(), "Template.docx")
+TEMPLATE_PATH = os.getenv("IEEE_REF_REPORT_TEMPLATE", os.path.join(os.getcwd(), "Template.docx"))
 EXPORTS_DIR = os.path.join(os.getcwd(), "exports")
+# Exported reports are pruned once older than the TTL, or oldest-first past the size cap
+EXPORTS_TTL_S = float(os.getenv("IEEE_REF_EXPORTS_TTL_S", str(24 * 3600)))
+EXPORTS_MAX_MB = float(os.getenv("IEEE_REF_EXPORTS_MAX_MB", "500"))
+_PRUNE_EVERY_S = 60.0     # at most one directory scan per minute
+_PRUNE_MIN_AGE_S = 300.0  # never prune a report that may still be downloading
+_last_prune = 0.0
+_PRUNE_LOCK = threading.Lock()
+
+# Word template placeholders per report section
+SECTION_PLACEHOLDERS = {
+    "Overview": "{OVERVIEW}",
+    "Field Verification": "{VERIFICATION}",
+    "Corrections Applied": "{CORRECTIONS}",
+    "Provenance (Source per Field)": "{PROVENANCE}",
+    "Online Evidence (links)": "{EVIDENCE}",
+    "Journal Abbreviation Check": "{NLM}",
+    "Formatting Strategy": "{FORMATTING}",
+    "Final Formatted Reference": "{FINAL_REFERENCE}",
+    "Data Quality Warnings": "{WARNINGS}",
+    "Reproducibility": "{FINGERPRINT}",
+}
+
+_TEMPLATE = None                  # parsed Template.docx, loaded once and deep-copied per render
+_TEMPLATE_LOCK = threading.Lock()
 
 SRC_LABELS = {
     "doi-agreement": "DOI agreement",
@@ -48,54 +80,18 @@ def _collect_evidence(state: PipelineState) -> List[Tuple[str, str]]:
         if url and url not in seen:
             seen.add(url); lines.append(("DOI", url))
 
-    # Candidates often carry rich "raw" records we can turn into links.
+    # Source-specific links were extracted from the records at lookup time (candidate "evidence").
     for c in state.get("candidates", []) or []:
         src = (c.get("source") or "").lower()
-        raw = c.get("raw") or {}
 
         def add(label: str, url: str):
             if url and url not in seen:
                 seen.add(url); lines.append((label, url))
 
-        if src == "crossref":
-            doi = normalize_text(raw.get("DOI") or "")
-            add("Crossref (DOI)", _doi_link(doi))
-            # Some Crossref records include a 'URL' to the publisher page:
-            if raw.get("URL"):
-                add("Publisher (from Crossref)", normalize_text(raw.get("URL")))
-
-        elif src == "ieeexplore":
-            # IEEE Xplore API fields are 'html_url'/'pdf_url'
-            add("IEEE Xplore", normalize_text(raw.get("html_url") or ""))
-            if raw.get("pdf_url"):
-                add("IEEE Xplore PDF", normalize_text(raw.get("pdf_url")))
-            doi = normalize_text(raw.get("doi") or "")
-            add("DOI", _doi_link(doi))
-
-        elif src == "openalex":
-            # OpenAlex 'id' is a URL; prefer that; also include DOI if present
-            add("OpenAlex", normalize_text(raw.get("id") or ""))
-            doi = normalize_text(raw.get("doi") or "")
-            add("DOI", _doi_link(doi))
-
-        elif src == "semanticscholar":
-            # Prefer the canonical S2 UI DOI page when available
-            eid = raw.get("externalIds") or {}
-            doi = normalize_text(eid.get("DOI") or raw.get("doi") or "")
-            if doi:
-                add("Semantic Scholar (DOI)", f"https://www.semanticscholar.org/doi/{doi}")
-            # Fallback: paperId
-            pid = normalize_text(raw.get("paperId") or "")
-            if pid:
-                add("Semantic Scholar", f"https://www.semanticscholar.org/paper/{pid}")
-
-        elif src == "pubmed":
-            # esummary record has a numeric uid/pmid
-            pmid = normalize_text(raw.get("uid") or "")
-            if pmid.isdigit():
-                add("PubMed", f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/")
-
-        elif src == "arxiv":
+        for label, url in c.get("evidence") or []:
+            add(label, url)
+
+        if src == "arxiv":
             # If we captured an arXiv id in extracted or best
             ex = state.get("extracted", {}) or {}
             aid = normalize_text(ex.get("arxiv_id") or "")
@@ -175,7 +171,7 @@ def _nlm_note(state: PipelineState) -> str:
         return f"NLM Catalog ISO Abbrev: {v}"
     return "NLM Catalog ISO Abbrev: (not verified or not applicable)"
 
-def _warnings(state: PipelineState) -> List[str]:
+def _warnings(state: PipelineState, llm_errors: List[str]) -> List[str]:
     warn: List[str] = []
     ex = state.get("extracted", {}) or {}
     rtype = normalize_text(state.get("type") or "")
@@ -196,9 +192,16 @@ def _warnings(state: PipelineState) -> List[str]:
             warn.append(f"Detected fake page range '{pages}' collapsed to single page")
         elif pages.isdigit():
             warn.append(f"Single page '{pages}' — verify whether it should be a range")
+    # LLM outputs that failed their schema (fields dropped, not silently lost)
+    for err in llm_errors:
+        warn.append(f"LLM output rejected: {err}")
+    # Steps dropped because the per-reference time budget ran out
+    skipped = state.get("skipped") or []
+    if skipped:
+        warn.append(f"Time budget exhausted; skipped: {'; '.join(skipped)}")
     return warn
 
-def build_report(state: PipelineState) -> PipelineState:
+def build_report(state: PipelineState, config: RunnableConfig) -> Dict[str, Any]:
     ex = state.get("extracted", {}) or {}
     best = state.get("best", {}) or {}
     prov = state.get("provenance", {}) or {}
@@ -242,14 +245,19 @@ def build_report(state: PipelineState) -> PipelineState:
     nlm_txt = _nlm_note(state)
 
     # Warnings / anomalies
-    warnings = _warnings(state)
+    warnings = _warnings(state, getattr(get_run(config).llm, "errors", None) or [])
     warnings_txt = "\n".join([f"- {w}" for w in warnings]) if warnings else "- None"
 
     # Reproducibility fingerprint
     fp = state.get("_fp") or ""
+    tokens_saved = state.get("llm_tokens_saved") or 0
+    repro = f"Fingerprint: {fp}"
+    if tokens_saved:
+        repro += f"\nLLM correction tokens saved (est.): {tokens_saved}"
+    repro_txt = "\n".join(f"- {line}" for line in repro.split("\n"))
 
     # Put it all together
-    state["report"] = f"""
+    report = f"""
 IEEE Reference Report
 
 1. Overview
@@ -280,55 +288,50 @@ IEEE Reference Report
 {warnings_txt}
 
 10. Reproducibility
-- Fingerprint: {fp}
+{repro_txt}
 """
 
-    # -------- Word report (optional) --------
-    if not os.path.exists(EXPORTS_DIR):
-        os.makedirs(EXPORTS_DIR)
+    # Word report is rendered lazily from these (see export_report_docx)
+    report_sections = [
+        ["Overview", overview],
+        ["Field Verification", verification],
+        ["Corrections Applied", corrections],
+        ["Provenance (Source per Field)", provenance],
+        ["Online Evidence (links)", evidence_txt],
+        ["Journal Abbreviation Check", nlm_txt],
+        ["Formatting Strategy", formatting],
+        ["Final Formatted Reference", final_reference],
+        ["Data Quality Warnings", warnings_txt],
+        ["Reproducibility", repro],
+    ]
+    return {"report": report, "report_sections": report_sections}
 
-    try:
-        if not os.path.exists(TEMPLATE_PATH):
-            # Fallback basic .docx
-            doc = Document()
-            doc.add_heading("IEEE Reference Report", level=1)
-            for section, block in [
-                ("Overview", overview),
-                ("Field Verification", verification),
-                ("Corrections Applied", corrections),
-                ("Provenance (Source per Field)", provenance),
-                ("Online Evidence (links)", evidence_txt),
-                ("Journal Abbreviation Check", nlm_txt),
-                ("Formatting Strategy", formatting),
-                ("Final Formatted Reference", final_reference),
-                ("Data Quality Warnings", warnings_txt),
-                ("Reproducibility", f"Fingerprint: {fp}"),
-            ]:
-                doc.add_heading(section, level=2)
-                for line in block.split("\n"):
-                    doc.add_paragraph(line)
-            report_path = os.path.join(EXPORTS_DIR, "report.docx")
-            doc.save(report_path)
-            state["report_path"] = report_path
-            return state
-
-        # If a template exists, we replace placeholders if present,
-        # and append new sections at the end so no info is lost.
-        doc = Document(TEMPLATE_PATH)
-        placeholders = {
-            "{OVERVIEW}": overview,
-            "{VERIFICATION}": verification,
-            "{CORRECTIONS}": corrections,
-            "{PROVENANCE}": provenance,
-            "{EVIDENCE}": evidence_txt,
-            "{NLM}": nlm_txt,
-            "{FORMATTING}": formatting,
-            "{FINAL_REFERENCE}": final_reference,
-            "{WARNINGS}": warnings_txt,
-            "{FINGERPRINT}": fp,
-        }
-
-        matched_any = False
+# ---------- Word (.docx) report: built only when requested ----------
+
+def _template_clone():
+    global _TEMPLATE
+    if not os.path.exists(TEMPLATE_PATH):
+        return None
+    with _TEMPLATE_LOCK:
+        if _TEMPLATE is None:
+            _TEMPLATE = Document(TEMPLATE_PATH)
+        return copy.deepcopy(_TEMPLATE)
+
+def render_report_docx(sections: List[List[str]]) -> bytes:
+    """
+    Render report sections into a .docx (CPU-bound; keep it off the event loop).
+    If a template exists, we replace placeholders if present,
+    otherwise the sections are appended so no info is lost.
+    """
+    doc = _template_clone()
+    matched_any = False
+    if doc is not None:
+        placeholders = {}
+        for section, block in sections:
+            if section in SECTION_PLACEHOLDERS:
+                if section == "Reproducibility":
+                    block = block.replace("Fingerprint: ", "", 1)
+                placeholders[SECTION_PLACEHOLDERS[section]] = block
         for p in doc.paragraphs:
             for placeholder, value in placeholders.items():
                 if placeholder in p.text:
@@ -337,31 +340,86 @@ IEEE Reference Report
                         if placeholder in inline[i].text:
                             inline[i].text = inline[i].text.replace(placeholder, value)
                             matched_any = True
+    else:
+        doc = Document()
 
-        if not matched_any:
-            # Append content if template didn't contain placeholders
-            doc.add_heading("IEEE Reference Report", level=1)
-            for section, block in [
-                ("Overview", overview),
-                ("Field Verification", verification),
-                ("Corrections Applied", corrections),
-                ("Provenance (Source per Field)", provenance),
-                ("Online Evidence (links)", evidence_txt),
-                ("Journal Abbreviation Check", nlm_txt),
-                ("Formatting Strategy", formatting),
-                ("Final Formatted Reference", final_reference),
-                ("Data Quality Warnings", warnings_txt),
-                ("Reproducibility", f"Fingerprint: {fp}"),
-            ]:
-                doc.add_heading(section, level=2)
-                for line in block.split("\n"):
-                    doc.add_paragraph(line)
-
-        report_path = os.path.join(EXPORTS_DIR, "report.docx")
-        doc.save(report_path)
-        state["report_path"] = report_path
-    except Exception:
-        # Fail silently for report file generation; JSON report still returned by API
-        ...
-
-    return state
+    if not matched_any:
+        doc.add_heading("IEEE Reference Report", level=1)
+        for section, block in sections:
+            doc.add_heading(section, level=2)
+            for line in block.split("\n"):
+                doc.add_paragraph(line)
+
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+def prune_exports(exports_dir: Optional[str] = None, force: bool = False) -> int:
+    """
+    Delete exported reports older than EXPORTS_TTL_S, then the least recently written
+    ones until the directory fits EXPORTS_MAX_MB. Returns the number of files removed.
+    """
+    global _last_prune
+    now = time.time()
+    with _PRUNE_LOCK:
+        if not force and now - _last_prune < _PRUNE_EVERY_S:
+            return 0
+        _last_prune = now
+    exports_dir = exports_dir or EXPORTS_DIR
+    files = []
+    try:
+        with os.scandir(exports_dir) as it:
+            for e in it:
+                if e.name.startswith("report-") and e.name.endswith(".docx"):
+                    try:
+                        st = e.stat()
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, e.path))
+    except OSError:
+        return 0
+    files.sort()
+    total = sum(size for _, size, _ in files)
+    budget = EXPORTS_MAX_MB * 2**20
+    removed = 0
+    for mtime, size, path in files:
+        age = now - mtime
+        if age < _PRUNE_MIN_AGE_S or (age < EXPORTS_TTL_S and total <= budget):
+            continue
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+def write_report_docx(sections: List[List[str]], exports_dir: Optional[str] = None) -> str:
+    """
+    Write the report to a content-addressed path (exports/report-<hash>.docx),
+    so concurrent runs never overwrite each other and repeats are free.
+    Old reports are pruned by prune_exports.
+    """
+    exports_dir = exports_dir or EXPORTS_DIR
+    digest = hashlib.sha256(
+        json.dumps([TEMPLATE_PATH, sections], ensure_ascii=False).encode("utf-8", "ignore")
+    ).hexdigest()[:24]
+    report_path = os.path.join(exports_dir, f"report-{digest}.docx")
+    prune_exports(exports_dir)
+    if os.path.exists(report_path):
+        try:
+            os.utime(report_path)  # a repeat counts as fresh for pruning
+            return report_path
+        except OSError:
+            pass  # pruned in the meantime: write it again
+    os.makedirs(exports_dir, exist_ok=True)
+    data = render_report_docx(sections)
+    tmp_path = f"{report_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp_path, report_path)
+    return report_path
+
+async def export_report_docx(sections: List[List[str]], exports_dir: Optional[str] = None) -> str:
+    """Async wrapper: renders and writes the .docx in a worker thread."""
+    return await asyncio.to_thread(write_report_docx, sections, exports_dir)
@@ -1,16 +1,14 @@
-from ..state import PipelineState
+from typing import Any, Dict
+from langchain_core.runnables import RunnableConfig
+from ..state import PipelineState, get_run
 
-async def cleanup(state: PipelineState) -> PipelineState:
-    # Only close per-invocation resources we own.
-    try:
-        if state.get("_http") is not None and state.get("_owns_http", False):
-            await state["_http"].aclose()
-    except Exception:
-        ...
-    try:
-        llm = state.get("_llm")
-        if llm and llm.provider == "ollama" and getattr(llm, "_client", None) is not None:
-            await llm._client.aclose()
-    except Exception:
-        ...
-    return state
+async def cleanup(state: PipelineState, config: RunnableConfig) -> Dict[str, Any]:
+    # Nothing to release: the HTTP client and LLM clients are shared across runs
+    # and owned by init_runtime / the LLM adapter, not by the run.
+    # Source/LLM calls that failed during the run are recorded, so run_one can keep
+    # results produced during an outage out of its cache.
+    run = get_run(config)
+    errors = list(getattr(run.llm, "failures", None) or [])
+    for src in run.sources:
+        errors += getattr(src, "failures", None) or []
+    return {"errors": list(dict.fromkeys(errors))} if errors else {}
@@ -1,17 +1,23 @@
 import re
-from ..state import PipelineState
+from typing import Any, Dict
+from langchain_core.runnables import RunnableConfig
+from ..state import PipelineState, get_run
 from ..tools.type_reconcile import reconcile_type
+from ..tools.deadline import run_within, with_skipped
+from ..llms.schemas import REFERENCE_TYPE
 
-async def detect_type(state: PipelineState) -> PipelineState:
+TYPE_SYSTEM = (
+    "Classify this reference into one of: journal article, conference paper, book, book chapter, "
+    "thesis, technical report, dataset, standard, software, other. "
+    "Return JSON {\"type\": \"...\"}."
+)
+
+async def detect_type(state: PipelineState, config: RunnableConfig) -> Dict[str, Any]:
     ref = state["reference"]
-    llm = state["_llm"]
+    llm = get_run(config).llm
 
     # Ask LLM for type classification
-    vote = await llm.json(
-        "Classify this reference into one of: journal article, conference paper, book, book chapter, "
-        "thesis, technical report, dataset, standard, software, other. "
-        "Return JSON {\"type\": \"...\"}. Ref:\n" + ref
-    )
+    vote = await run_within(state, "LLM type classification", llm.json("Ref:\n" + ref, system=TYPE_SYSTEM, schema=REFERENCE_TYPE, node="type"), {})
 
     # Print LLM output for debugging
     print("=== LLM Type Vote ===")
@@ -19,12 +25,13 @@ async def detect_type(state: PipelineState) -> PipelineState:
     print("=====================")
 
     # Save the LLM type vote in state
-    state["_llm_type_vote"] = (vote or {}).get("type")
+    type_vote = (vote or {}).get("type")
 
     # Use online candidates if available; otherwise empty list
     candidates = state.get("candidates", [])
 
     # Reconcile using only LLM + online sources
-    state["type"] = reconcile_type(candidates=candidates, llm_vote=state["_llm_type_vote"])
-    
-    return state
+    return with_skipped(state, {
+        "_llm_type_vote": type_vote,
+        "type": reconcile_type(candidates=candidates, llm_vote=type_vote),
+    })
@@ -1,3 +1,4 @@
+from typing import Any, Dict
 from ..state import PipelineState
 from ..tools.utils import normalize_month_field, normalize_text
 import re
@@ -15,7 +16,7 @@ def _first_num(s: str) -> str:
     m = re.search(r"\d+", normalize_text(s))
     return m.group(0) if m else ""
 
-def enrich_from_best(state: PipelineState) -> PipelineState:
+def enrich_from_best(state: PipelineState) -> Dict[str, Any]:
     ex = dict(state["extracted"]); be = state.get("best") or {}
     for k in ("journal_abbrev","journal_name","volume","issue","pages","year","month","doi","conference_name","publisher","location","edition","isbn","url","title","authors"):
         if not ex.get(k) and be.get(k):
@@ -30,5 +31,4 @@ def enrich_from_best(state: PipelineState) -> PipelineState:
 
     if ex.get("month"):
         ex["month"] = normalize_month_field(ex["month"])
-    state["extracted"] = ex
-    return state
+    return {"extracted": ex}
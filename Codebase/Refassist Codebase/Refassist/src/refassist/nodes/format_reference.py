@@ -1,3 +1,4 @@
+from typing import Any, Dict
 from ..state import PipelineState
 from ..tools.utils import (
   authors_to_list, format_authors_ieee_list,
@@ -5,7 +6,7 @@ from ..tools.utils import (
   MONTHS_NAME, format_doi_link
 )
 
-def format_reference(state: PipelineState) -> PipelineState:
+def format_reference(state: PipelineState) -> Dict[str, Any]:
     ex = state["extracted"]; rtype = (state["type"] or "other").lower()
     A = authors_to_list(ex.get("authors") or [])
     A_fmt = format_authors_ieee_list(A)
@@ -85,5 +86,4 @@ def format_reference(state: PipelineState) -> PipelineState:
         if pages_norm: parts.append(f"pp. {pages_norm}")
         if doi_link: parts.append(doi_link)
 
-    state["formatted"] = (", ".join([p for p in parts if p]) + ".").replace(" ,", ",")
-    return state
+    return {"formatted": (", ".join([p for p in parts if p]) + ".").replace(" ,", ",")}
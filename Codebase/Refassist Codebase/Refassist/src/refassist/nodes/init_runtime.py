@@ -1,4 +1,5 @@
 import asyncio
+from typing import Any, Dict
 from cachetools import TTLCache
 from ..config import PipelineConfig
 from ..llms import LLMAdapter
@@ -8,7 +9,7 @@ try:
 except Exception:
     httpx = None
 
-from ..state import PipelineState
+from ..state import PipelineState, RunContext
 from ..tools.sources import (
     CrossrefClient, OpenAlexClient, SemanticScholarClient, PubMedClient, ArxivClient,
     IEEEXploreClient,  # NEW
@@ -38,13 +39,9 @@ def _get_shared_resources(cfg: PipelineConfig):
         )
     return _SHARED_HTTP, _SHARED_CACHE, _SHARED_LIMITER
 
-async def init_runtime(state: PipelineState) -> PipelineState:
-    cfg = state.get("_cfg") or PipelineConfig()
-    llm = LLMAdapter(cfg)
-
-    # Obtain (or create) shared async HTTP client, cache, limiter
+def make_run_context(cfg: PipelineConfig) -> RunContext:
+    """Per-run dependencies: a fresh LLM adapter (pooled clients) plus the shared HTTP client, cache and limiter."""
     http, cache, limiter = _get_shared_resources(cfg)
-
     sources = [
         # Order matters: earlier sources have higher authority weight in consensus
         CrossrefClient(cfg, client=http, limiter=limiter, cache=cache),          # DOI registry (authoritative)
@@ -54,16 +51,12 @@ async def init_runtime(state: PipelineState) -> PipelineState:
         PubMedClient(cfg, client=http, limiter=limiter, cache=cache),
         ArxivClient(cfg, client=http, limiter=limiter, cache=cache),
     ]
+    return RunContext(llm=LLMAdapter(cfg), http=http, cache=cache, limiter=limiter, sources=sources)
 
-    # _owns_http=False because we are using a shared client; cleanup must not close it
-    state.update({
-        "_cfg": cfg,
-        "_llm": llm,
-        "_http": http,
-        "_owns_http": False,
-        "_cache": cache,
-        "_limiter": limiter,
-        "_sources": sources,
+async def init_runtime(state: PipelineState) -> Dict[str, Any]:
+    # Runtime handles come in through the run context (see make_run_context); only loop counters live in state
+    return {
+        "_cfg": state.get("_cfg") or PipelineConfig(),
         "hops": state.get("hops", 0),
         "attempts": state.get("attempts", 0),
         "_ver_score": state.get("_ver_score", -1),
@@ -75,5 +68,4 @@ async def init_runtime(state: PipelineState) -> PipelineState:
         # NEW KEYS for reference verification
         "_skip_pipeline": False,
         "verification_message": "",
-    })
-    return state
+    }
@@ -1,11 +1,115 @@
 import json
-from ..state import PipelineState, ExtractedModel
-from ..tools.utils import authors_to_list, normalize_month_field, normalize_text, fingerprint_state
+import re
+from typing import Any, Dict
+from langchain_core.runnables import RunnableConfig
+from ..state import PipelineState, get_run
+from ..tools.deadline import run_within, with_skipped
+from ..tools.utils import authors_to_list, normalize_month_field, normalize_text, fingerprint_state, estimate_tokens
+from ..metrics import incr
+from ..llms.schemas import CORRECTION_PATCH, validate_output
 
 # Never let LLM override authoritative values once set
 _LOCK_ALWAYS = {"doi", "year", "month", "title", "authors", "pages"}  # pages added to prevent regressions
 _LOCK_IF_PRESENT = {"journal_name", "journal_abbrev", "conference_name", "volume", "issue"}
 
+_PATCH_KEYS = (
+    "title", "authors", "journal_name", "journal_abbrev", "conference_name", "volume", "issue",
+    "pages", "year", "month", "doi", "publisher", "location", "edition", "isbn", "url",
+)
+# Optional fields only worth asking for when the type uses them or the raw text hints at them
+_OPTIONAL_BY_TYPE = {
+    "journal article": {"journal_name", "journal_abbrev"},
+    "conference paper": {"conference_name"},
+    "book": {"publisher", "location", "edition", "isbn"},
+    "book chapter": {"publisher", "location", "edition", "isbn"},
+    "thesis": {"publisher", "location"},
+    "technical report": {"publisher", "location"},
+    "standard": {"publisher"},
+}
+_OPTIONAL = {"journal_name", "journal_abbrev", "conference_name", "month",
+             "publisher", "location", "edition", "isbn", "url"}
+_URL_HINT = re.compile(r"https?://|www\.", re.I)
+_ISBN_HINT = re.compile(r"\bISBN\b", re.I)
+_MONTH_HINT = re.compile(r"\b(jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?(?=\s|,|$)", re.I)
+# Signs in the raw text that a field the parse missed is really there (see hinted_targets)
+_FIELD_HINTS = {
+    "doi": re.compile(r"\b10\.\d{4,9}/"),
+    "year": re.compile(r"\b(?:1[89]|20)\d{2}\b"),
+    "month": _MONTH_HINT,
+    "volume": re.compile(r"\bvol(?:ume)?\b", re.I),
+    "issue": re.compile(r"\b(?:no|issue|nr)\b\.?\s*\d", re.I),
+    "pages": re.compile(r"\bpp?\.\s*\d|\b\d+\s*[-–]\s*\d+\b"),
+    "url": _URL_HINT,
+    "isbn": _ISBN_HINT,
+}
+
+CORRECT_SYSTEM = (
+    "You are an IEEE reference corrector.\n"
+    "From the raw reference, return a STRICT JSON patch for ONLY the requested keys "
+    "when they are missing or obviously malformed. authors is a list. "
+    "If unsure, omit the key. JSON ONLY."
+)
+
+def _targets(state: PipelineState, ex, ver, lock_fields) -> list:
+    """Unlocked fields the LLM could still improve: missing or failing verification."""
+    ref = state.get("reference") or ""
+    wanted_optional = set(_OPTIONAL_BY_TYPE.get(normalize_text(state.get("type")).lower(), ()))
+    if _URL_HINT.search(ref): wanted_optional.add("url")
+    if _ISBN_HINT.search(ref): wanted_optional.add("isbn")
+    if _MONTH_HINT.search(ref): wanted_optional.add("month")
+    out = []
+    for k in _PATCH_KEYS:
+        if k in lock_fields:
+            continue
+        missing = not normalize_text(ex.get(k))
+        failing = ver.get(k) is False
+        if failing or (missing and (k not in _OPTIONAL or k in wanted_optional)):
+            out.append(k)
+    return out
+
+def _lock_fields(best: Dict[str, Any]) -> set:
+    """Fields the online consensus/best already settles; the LLM patch never touches them."""
+    return {k for k in _LOCK_ALWAYS | _LOCK_IF_PRESENT if normalize_text(best.get(k))}
+
+def hinted_targets(state: PipelineState) -> list:
+    """
+    Fields the next LLMCorrect pass can plausibly fill: requested, missing from the
+    parse, and hinted at by the raw text. A present value that merely fails verification
+    is not counted; the LLM has nothing better to offer for it.
+    """
+    ref = state.get("reference") or ""
+    ex = state.get("extracted") or {}
+    targets = _targets(state, ex, state.get("verification") or {}, _lock_fields(state.get("best") or {}))
+    return [k for k in targets
+            if not normalize_text(ex.get(k)) and k in _FIELD_HINTS and _FIELD_HINTS[k].search(ref)]
+
+# Fixed text of the original single-shot prompt (instructions and section labels), kept
+# only to estimate what the compact prompt and skips save
+_LEGACY_PROMPT_CHARS = len(
+    "You are an IEEE reference corrector.\n"
+    "Given the raw reference, the current JSON, and a pack of VERIFIED fields from online sources, "
+    "produce a STRICT JSON patch correcting only fields that are missing or obviously malformed.\n"
+    "Under NO circumstances change any VERIFIED field. Keys among: title, authors (list), journal_name, "
+    "journal_abbrev, conference_name, volume, issue, pages, year, month, doi, publisher, location, edition, isbn, url. "
+    "If unsure, omit the key. JSON ONLY.\n\n"
+    "Raw: \n\nCurrent: \n\nVerified (frozen): \n\nVerification flags: "
+)
+_FROZEN_KEYS = ("title", "authors", "journal_name", "conference_name", "year", "month", "volume", "issue", "pages", "doi")
+
+def _json_chars(d: Dict[str, Any]) -> int:
+    """Approximate length of json.dumps(d) without serializing it."""
+    return 2 + sum(len(k) + len(str(v)) + 6 for k, v in d.items())
+
+def _tokens_saved(ref: str, ex: Dict[str, Any], best: Dict[str, Any], ver: Dict[str, Any], sent_prompt: str) -> int:
+    """Estimated prompt tokens not sent compared with the legacy full prompt."""
+    frozen = {k: best[k] for k in _FROZEN_KEYS if best.get(k)}
+    full_chars = _LEGACY_PROMPT_CHARS + len(ref) + _json_chars(ex) + _json_chars(frozen) + _json_chars(ver)
+    saved = (full_chars + 3) // 4 - estimate_tokens(sent_prompt)
+    if saved <= 0:
+        return 0
+    incr("llm_correct.tokens_saved", saved)
+    return saved
+
 def _coerce_year(y: str) -> str:
     y = normalize_text(y)
     if len(y) >= 4:
@@ -15,38 +119,34 @@ def _coerce_year(y: str) -> str:
                 return seg
     return ""
 
-async def llm_correct(state: PipelineState) -> PipelineState:
+async def llm_correct(state: PipelineState, config: RunnableConfig) -> Dict[str, Any]:
     ref = state["reference"]
     ex = state["extracted"]
     ver = state.get("verification") or {}
-    llm = state["_llm"]
+    llm = get_run(config).llm
 
     # Authoritative values from online consensus/best
     best = state.get("best") or {}
 
-    # Build lock set
-    lock_fields = set()
-    for k in _LOCK_ALWAYS:
-        if normalize_text(best.get(k)):
-            lock_fields.add(k)
-    for k in _LOCK_IF_PRESENT:
-        if normalize_text(best.get(k)):
-            lock_fields.add(k)
-
-    # Build a *frozen* entity pack for the LLM (for transparency, but not mutable)
-    frozen_entities = {k: best.get(k) for k in ["title","authors","journal_name","conference_name","year","month","volume","issue","pages","doi"] if best.get(k)}
-    prompt = (
-        "You are an IEEE reference corrector.\n"
-        "Given the raw reference, the current JSON, and a pack of VERIFIED fields from online sources, "
-        "produce a STRICT JSON patch correcting only fields that are missing or obviously malformed.\n"
-        "Under NO circumstances change any VERIFIED field. Keys among: title, authors (list), journal_name, "
-        "journal_abbrev, conference_name, volume, issue, pages, year, month, doi, publisher, location, edition, isbn, url. "
-        "If unsure, omit the key. JSON ONLY.\n\n"
-        f"Raw: {ref}\n\nCurrent: {json.dumps(ex, ensure_ascii=False)}\n\n"
-        f"Verified (frozen): {json.dumps(frozen_entities, ensure_ascii=False)}\n\n"
-        f"Verification flags: {json.dumps(ver)}"
-    )
-    patch = await llm.json(prompt) or {}
+    lock_fields = _lock_fields(best)
+
+    targets = _targets(state, ex, ver, lock_fields)
+    if not targets:
+        # Every unlocked field is present and verified: nothing the LLM could change
+        incr("llm_correct.skipped")
+        saved = _tokens_saved(ref, ex, best, ver, "")
+        patch = {}
+    else:
+        # Compact prompt: only the unlocked fields still worth fixing
+        current = {k: ex.get(k) for k in targets if ex.get(k) not in (None, "", [])}
+        prompt = (
+            f"Requested keys: {', '.join(targets)}\n\n"
+            f"Raw: {ref}\n\nCurrent: {json.dumps(current, ensure_ascii=False)}"
+        )
+        incr("llm_correct.compact")
+        saved = _tokens_saved(ref, ex, best, ver, CORRECT_SYSTEM + prompt)
+        patch = await run_within(state, "LLM correction pass", llm.json(prompt, system=CORRECT_SYSTEM, schema=CORRECTION_PATCH, node="correct"), {}) or {}
+        patch = {k: v for k, v in patch.items() if k in targets} if isinstance(patch, dict) else {}
 
     # Normalize authors + month + year
     if isinstance(patch.get("authors"), str):
@@ -56,11 +156,10 @@ async def llm_correct(state: PipelineState) -> PipelineState:
     if patch.get("year"):
         patch["year"] = _coerce_year(str(patch["year"]))
 
-    # Validate best-effort
-    try:
-        patch = ExtractedModel(**patch).dict(exclude_none=True)
-    except Exception:
-        patch = {}
+    # Validate after normalization; invalid fields are dropped individually and reported
+    patch, errors = validate_output(CORRECTION_PATCH, patch)
+    if hasattr(llm, "note_errors"):
+        llm.note_errors(errors)
 
     ex2 = dict(ex)
     changes = []
@@ -85,12 +184,15 @@ async def llm_correct(state: PipelineState) -> PipelineState:
             changes.append((k, ex2.get(k), bv))
             ex2[k] = bv
 
-    state["extracted"] = ex2
-    state["corrections"] = (state.get("corrections") or []) + changes
-    state["_made_changes_last_cycle"] = state.get("_made_changes_last_cycle", False) or bool(changes)
-
     # Update fingerprint
     sugg = state.get("suggestions") or {}
     best_now = state.get("best") or {}
-    state["_fp"] = fingerprint_state(ex2, best_now, sugg)
-    return state
+    update = {
+        "extracted": ex2,
+        "corrections": (state.get("corrections") or []) + changes,
+        "_made_changes_last_cycle": state.get("_made_changes_last_cycle", False) or bool(changes),
+        "_fp": fingerprint_state(ex2, best_now, sugg),
+    }
+    if saved:
+        update["llm_tokens_saved"] = (state.get("llm_tokens_saved") or 0) + saved
+    return with_skipped(state, update)
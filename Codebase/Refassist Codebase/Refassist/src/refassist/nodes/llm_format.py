@@ -1,6 +1,9 @@
 import re
-from ..state import PipelineState
+from typing import Any, Dict
+from langchain_core.runnables import RunnableConfig
+from ..state import PipelineState, get_run
 from ..tools.utils import normalize_text
+from ..tools.deadline import run_within, with_skipped
 
 IEEE_HINT = (
     "You are a precise IEEE reference formatter. "
@@ -45,16 +48,18 @@ def _post_sanitize(s: str) -> str:
     s = re.sub(r"\s+", " ", s)
     return s.strip()
 
-async def llm_format(state: PipelineState) -> PipelineState:
-    llm = state.get("_llm")
-    ex = state.get("extracted", {}) or {}
+async def llm_format(state: PipelineState, config: RunnableConfig) -> Dict[str, Any]:
+    llm = get_run(config).llm
+    ex = dict(state.get("extracted", {}) or {})
     rtype = normalize_text(state.get("type") or "other")
 
     if not llm:
-        return state
+        return {}
 
+    update: Dict[str, Any] = {}
     if "pages" in ex and ex["pages"]:
         ex["pages"] = _normalize_pages_field(str(ex["pages"]))
+        update["extracted"] = ex
 
     payload_lines = [f"type: {rtype}"]
     for k in (
@@ -70,14 +75,14 @@ async def llm_format(state: PipelineState) -> PipelineState:
             payload_lines.append(f"{k}: {v}")
 
     user_payload = "\n".join(payload_lines)
+    # IEEE_HINT is the stable system prefix; only the fields vary per reference
     prompt = (
-        f"{IEEE_HINT}\n\n"
         f"Fields to use (authoritative; do not change values):\n{user_payload}\n\n"
         "Return exactly one IEEE-formatted reference line, nothing else."
     )
 
-    out_text = (await llm.text(prompt)).strip() if hasattr(llm, "text") else ""
+    out_text = (await run_within(state, "LLM formatting (rule-based formatter used)", llm.text(prompt, system=IEEE_HINT, node="format"), "")).strip() if hasattr(llm, "text") else ""
     if _is_reasonable(out_text):
         cleaned = _post_sanitize(_safe_line(out_text))
-        state["formatted"] = _safe_line(cleaned)
-    return state
+        update["formatted"] = _safe_line(cleaned)
+    return with_skipped(state, update)
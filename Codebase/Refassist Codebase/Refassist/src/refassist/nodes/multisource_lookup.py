@@ -1,13 +1,52 @@
 from typing import Any, Dict, List, Tuple
-from ..state import PipelineState
-from ..tools.utils import normalize_text
+from langchain_core.runnables import RunnableConfig
+from ..state import Candidate, PipelineState, get_run
+from ..config import PipelineConfig, get_profile
+from ..tools.deadline import expired, note_skipped, time_left, with_skipped
+from ..tools.utils import normalize_text, format_doi_link
 from ..tools.sources.arxiv import ArxivClient
 import asyncio
 import re
 
-def _normalize_candidate(source: str, rec: Dict[str, Any]) -> Dict[str, Any]:
-    from ..tools.utils import normalize_text
-    out: Dict[str, Any] = {"source": source, "raw": rec}
+def _evidence_links(source: str, rec: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(label, URL) evidence for the report, taken from the source record before it is dropped."""
+    links: List[Tuple[str, str]] = []
+
+    def add(label: str, url: str):
+        if url:
+            links.append((label, url))
+
+    if source == "crossref":
+        add("Crossref (DOI)", format_doi_link(normalize_text(rec.get("DOI") or "")))
+        # Some Crossref records include a 'URL' to the publisher page
+        add("Publisher (from Crossref)", normalize_text(rec.get("URL") or ""))
+    elif source == "ieeexplore":
+        # IEEE Xplore API fields are 'html_url'/'pdf_url'
+        add("IEEE Xplore", normalize_text(rec.get("html_url") or ""))
+        add("IEEE Xplore PDF", normalize_text(rec.get("pdf_url") or ""))
+        add("DOI", format_doi_link(normalize_text(rec.get("doi") or "")))
+    elif source == "openalex":
+        # OpenAlex 'id' is a URL; also include DOI if present
+        add("OpenAlex", normalize_text(rec.get("id") or ""))
+        add("DOI", format_doi_link(normalize_text(rec.get("doi") or "")))
+    elif source == "semanticscholar":
+        eid = rec.get("externalIds") or {}
+        doi = normalize_text(eid.get("DOI") or rec.get("doi") or "")
+        if doi:
+            add("Semantic Scholar (DOI)", f"https://www.semanticscholar.org/doi/{doi}")
+        pid = normalize_text(rec.get("paperId") or "")
+        if pid:
+            add("Semantic Scholar", f"https://www.semanticscholar.org/paper/{pid}")
+    elif source == "pubmed":
+        # esummary record has a numeric uid/pmid
+        pmid = normalize_text(rec.get("uid") or "")
+        if pmid.isdigit():
+            add("PubMed", f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/")
+    return links
+
+def _normalize_candidate(source: str, rec: Dict[str, Any]) -> Candidate:
+    # Only normalized fields and evidence links are kept; the source record itself is not
+    out: Dict[str, Any] = {"source": source, "evidence": _evidence_links(source, rec)}
     if source == "crossref":
         out["title"] = normalize_text((rec.get("title") or [""])[0]) if rec.get("title") else ""
         out["authors"] = [
@@ -103,7 +142,7 @@ def _normalize_candidate(source: str, rec: Dict[str, Any]) -> Dict[str, Any]:
         out["month"] = ""
     else:
         out.update({k: "" for k in ("title", "authors", "journal_name", "journal_abbrev", "doi", "volume", "issue", "pages", "year", "month")})
-    return out
+    return Candidate(**out)
 
 def _title_variants(title: str) -> List[str]:
     t = normalize_text(title)
@@ -121,23 +160,55 @@ def _title_variants(title: str) -> List[str]:
             seen.add(v); uniq.append(v)
     return uniq
 
-async def multisource_lookup(state: PipelineState) -> PipelineState:
-    ex, sources = state["extracted"], state["_sources"]
+def _lookup_plan(state: PipelineState, sources: List[Any], doi: str, title: str,
+                 arxiv_id: str) -> Tuple[List[Any], List[str]]:
+    """Sources and title variants to query under the run's execution profile."""
+    prof = get_profile((state.get("_cfg") or PipelineConfig()).profile)
+    if prof.max_sources:
+        # An arXiv id is only resolvable by the arXiv client, so keep it in the plan
+        sources = sources[:prof.max_sources] + [
+            s for s in sources[prof.max_sources:] if arxiv_id and isinstance(s, ArxivClient)
+        ]
+    variants = _title_variants(title)
+    if prof.title_variants:
+        variants = variants[:prof.title_variants]
+    if prof.identifier_only and (doi or arxiv_id):
+        variants = []
+    return sources, variants
+
+async def multisource_lookup(state: PipelineState, config: RunnableConfig) -> Dict[str, Any]:
+    ex = state["extracted"]
     doi = normalize_text(ex.get("doi") or "").lower().replace("doi:", "")
     title = normalize_text(ex.get("title") or "")
     arxiv_id = normalize_text(ex.get("arxiv_id") or "")
+    sources, variants = _lookup_plan(state, get_run(config).sources, doi, title, arxiv_id)
+    if expired(state):
+        # Keep the candidates of earlier hops; don't start new lookups
+        note_skipped(state, "Source lookups")
+        return with_skipped(state, {"candidates": state.get("candidates") or []})
 
-    tasks = []
+    coros, owners = [], []
     for s in sources:
         if arxiv_id and isinstance(s, ArxivClient):
-            tasks.append(s.by_id(arxiv_id))
+            coros.append(s.by_id(arxiv_id)); owners.append(s.NAME)
         if doi:
-            tasks.append(s.by_doi(doi))
-        if title:
-            for tv in _title_variants(title):
-                tasks.append(s.by_title(tv))
+            coros.append(s.by_doi(doi)); owners.append(s.NAME)
+        for tv in variants:
+            coros.append(s.by_title(tv)); owners.append(s.NAME)
 
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    # Take only the sources that answer within the time budget
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    results: List[Any] = []
+    if tasks:
+        _done, pending = await asyncio.wait(tasks, timeout=time_left(state))
+        for t in pending:
+            t.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            late = sorted({owners[i] for i, t in enumerate(tasks) if t in pending})
+            note_skipped(state, f"Source lookups not answered in time ({', '.join(late)})")
+        for t in tasks:
+            results.append(None if t.cancelled() else (t.exception() or t.result()))
     out_norm: List[Dict[str, Any]] = []
     idx = 0
     for s in sources:
@@ -152,18 +223,16 @@ async def multisource_lookup(state: PipelineState) -> PipelineState:
                     out_norm.append(_normalize_candidate(s.NAME, r))
             elif isinstance(rec, dict) and rec:
                 out_norm.append(_normalize_candidate(s.NAME, rec))
-        if title:
-            for _tv in _title_variants(title):
-                rec = results[idx]; idx += 1
-                if isinstance(rec, list):
-                    for r in rec:
-                        out_norm.append(_normalize_candidate(s.NAME, r))
-                elif isinstance(rec, dict) and rec:
-                    out_norm.append(_normalize_candidate(s.NAME, rec))
+        for _tv in variants:
+            rec = results[idx]; idx += 1
+            if isinstance(rec, list):
+                for r in rec:
+                    out_norm.append(_normalize_candidate(s.NAME, r))
+            elif isinstance(rec, dict) and rec:
+                out_norm.append(_normalize_candidate(s.NAME, rec))
 
     dedup = {}
     for c in out_norm:
         key = (c["source"], (c.get("doi") or "").lower() or c.get("title") or "")
         dedup[key] = c
-    state["candidates"] = list(dedup.values())
-    return state
+    return with_skipped(state, {"candidates": list(dedup.values())})
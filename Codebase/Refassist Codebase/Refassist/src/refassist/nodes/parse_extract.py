@@ -1,25 +1,30 @@
 import re, json
-from ..state import PipelineState, ExtractedModel
+from typing import Any, Dict
+from langchain_core.runnables import RunnableConfig
+from ..state import PipelineState, get_run
+from ..tools.deadline import run_within, with_skipped
+from ..llms.schemas import EXTRACTED_REFERENCE, validate_output
 from ..tools.utils import (
     normalize_text, authors_to_list, normalize_month_field,
 )
 ARXIV_RE = re.compile(r'(arxiv:)?\s*(\d{4}\.\d{4,5})(v\d+)?', re.I)
 DOI_RE = re.compile(r'(10\.\d{4,9}/[^\s,;]+)', re.I)
 
-async def parse_extract(state: PipelineState) -> PipelineState:
+PARSE_SYSTEM = (
+    "Parse the IEEE-style reference. Return STRICT JSON. Keys among:\n"
+    "title, authors (list or string), journal_name, journal_abbrev, conference_name,\n"
+    "volume, issue, pages, year, month, doi, publisher, location, edition, isbn, url.\n"
+    "Omit unknown or invalid keys.\n"
+    "IMPORTANT: If any extracted field contains extra characters, unexpected full stops, "
+    "or other formatting issues that make it unlikely to be correct, DO NOT extract it. JSON ONLY."
+)
+
+async def parse_extract(state: PipelineState, config: RunnableConfig) -> Dict[str, Any]:
     ref, rtype = state["reference"], state["type"]
-    llm = state["_llm"]
-    prompt = (
-        "Parse the IEEE-style reference. Return STRICT JSON. Keys among:\n"
-        "title, authors (list or string), journal_name, journal_abbrev, conference_name,\n"
-        "volume, issue, pages, year, month, doi, publisher, location, edition, isbn, url.\n"
-        "Omit unknown or invalid keys.\n"
-        "IMPORTANT: If any extracted field contains extra characters, unexpected full stops, "
-        "or other formatting issues that make it unlikely to be correct, DO NOT extract it. JSON ONLY.\n\n"
-        f"Type hint: {rtype}\nReference: {ref}"
-    )
+    llm = get_run(config).llm
+    prompt = f"Type hint: {rtype}\nReference: {ref}"
 
-    parsed = await llm.json(prompt) or {}
+    parsed = await run_within(state, "LLM field extraction (regex fallback used)", llm.json(prompt, system=PARSE_SYSTEM, schema=EXTRACTED_REFERENCE, node="parse"), {}) or {}
     if isinstance(parsed.get("authors"), str): parsed["authors"] = authors_to_list(parsed["authors"])
 
     if not parsed:
@@ -36,9 +41,7 @@ async def parse_extract(state: PipelineState) -> PipelineState:
         if (im := re.search(r"no\.?\s*([0-9A-Za-z]+)", ref, flags=re.I)): parsed["issue"] = im.group(1)
         if (y := re.search(r"\b(19|20)\d{2}\b", ref)): parsed["year"] = y.group(0)
     if parsed.get("month"): parsed["month"] = normalize_month_field(parsed["month"])
-    try:
-        parsed = ExtractedModel(**parsed).dict(exclude_none=True)
-    except Exception:
-        ...
-    state["extracted"] = parsed
-    return state
+    parsed, errors = validate_output(EXTRACTED_REFERENCE, parsed)
+    if errors and hasattr(llm, "note_errors"):
+        llm.note_errors(errors)
+    return with_skipped(state, {"extracted": parsed})
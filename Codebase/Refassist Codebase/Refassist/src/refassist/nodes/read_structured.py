@@ -0,0 +1,28 @@
+from typing import Any, Dict
+from ..state import PipelineState
+from ..metrics import incr
+from ..llms.schemas import EXTRACTED_REFERENCE, validate_output
+from ..tools.bibtex import STRUCTURED_RE, parse_structured
+
+def is_structured(state: PipelineState) -> bool:
+    return bool(STRUCTURED_RE.match(state.get("reference") or ""))
+
+async def read_structured(state: PipelineState) -> Dict[str, Any]:
+    """
+    BibTeX/biblatex entries already carry their type and fields: read them natively
+    instead of the validate/type/parse LLM calls. An entry that cannot be read
+    (no title) returns no `extracted` and takes the LLM path instead.
+    """
+    parsed = parse_structured(state["reference"])
+    if parsed is None:
+        incr("structured.unreadable")
+        return {}
+    rtype, fields = parsed
+    extracted, _ = validate_output(EXTRACTED_REFERENCE, fields)
+    incr("structured.read")
+    return {
+        "type": rtype,
+        "extracted": extracted,
+        "verification_message": "Structured entry read natively; LLM validation and parsing skipped. ",
+        "verification": {"is_reference": True},
+    }
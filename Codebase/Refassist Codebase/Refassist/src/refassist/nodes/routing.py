@@ -1,14 +1,122 @@
+from functools import lru_cache
+from typing import Dict, Tuple
 from ..state import PipelineState
+from ..logging import logger
+from ..metrics import incr
+from .llm_correct import hinted_targets
+from ..tools.deadline import expired
+from ..tools.utils import normalize_text
+
+# Extracted fields each verification flag is judged on (see verify_agents)
+_FLAG_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "title": ("title",),
+    "authors": ("authors",),
+    "journal_name": ("journal_name", "journal_abbrev"),
+    "journal_abbrev": ("journal_name", "journal_abbrev"),
+    "year": ("year", "month"),
+    "month": ("year", "month"),
+    "volume": ("volume", "issue", "pages", "doi"),
+    "issue": ("volume", "issue", "pages", "doi"),
+    "pages": ("volume", "issue", "pages", "doi"),
+    "doi": ("volume", "issue", "pages", "doi"),
+    "presence": ("title", "authors"),
+}
+# Fields that key the next MultiSourceLookup; changing them can surface new candidates
+_LOOKUP_KEYS = ("doi", "title")
+# Weight of "maybe new candidates" relative to a direct fix from best/suggestions
+_LOOKUP_SHIFT_WEIGHT = 0.5
+# Chance that a hop fixes a failing flag unless IEEE_REF_LOOP_FIELD_PRIORS says otherwise
+DEFAULT_FIX_PRIOR = 0.5
+
+def _norm(v) -> str:
+    if isinstance(v, list):
+        v = ", ".join(str(x) for x in v)
+    return normalize_text(v).lower()
+
+def _fixable(state: PipelineState, fields: Tuple[str, ...]) -> bool:
+    """Another hop can only flip a flag if best/suggestions hold a value we don't have yet."""
+    ex = state.get("extracted") or {}
+    best = state.get("best") or {}
+    sugg = state.get("suggestions") or {}
+    for k in fields:
+        for v in (best.get(k), sugg.get(k)):
+            if _norm(v) and _norm(v) != _norm(ex.get(k)):
+                return True
+    return False
+
+@lru_cache(maxsize=32)
+def parse_field_priors(spec: str) -> Dict[str, float]:
+    """
+    Parse IEEE_REF_LOOP_FIELD_PRIORS, e.g. "doi=0.7,presence=0.2", on top of
+    DEFAULT_FIX_PRIOR; malformed entries are logged and ignored.
+    """
+    priors = {f: DEFAULT_FIX_PRIOR for f in _FLAG_FIELDS}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        flag, _, raw = part.partition("=")
+        try:
+            p = float(raw)
+        except ValueError:
+            p = -1.0
+        if flag.strip() not in _FLAG_FIELDS or not 0.0 <= p <= 1.0:
+            logger.warning("Ignoring loop field prior %r (flags: %s; values 0..1)", part, ", ".join(_FLAG_FIELDS))
+            continue
+        priors[flag.strip()] = p
+    return priors
+
+def field_fix_rate(flag: str, cfg) -> float:
+    """Configured chance that a hop fixes this flag (fixed per config, so runs are reproducible)."""
+    return parse_field_priors(cfg.loop_field_priors).get(flag, DEFAULT_FIX_PRIOR)
+
+def expected_gain(state: PipelineState) -> float:
+    """
+    Expected number of flags another correction hop turns green: from values best or
+    suggestions offer, fields LLMCorrect can fill in, or new candidates when a lookup
+    key (DOI/title) is about to change.
+    """
+    cfg = state.get("_cfg")
+    ver = state.get("verification") or {}
+    failing = [f for f, ok in ver.items() if not ok and f in _FLAG_FIELDS]
+    if not failing:
+        return 0.0
+    llm = set(hinted_targets(state))
+    lookup_shift = _fixable(state, _LOOKUP_KEYS) or bool(llm.intersection(_LOOKUP_KEYS))
+    gain = 0.0
+    for f in failing:
+        if _fixable(state, _FLAG_FIELDS[f]) or llm.intersection(_FLAG_FIELDS[f]):
+            gain += field_fix_rate(f, cfg)
+        elif lookup_shift:
+            gain += field_fix_rate(f, cfg) * _LOOKUP_SHIFT_WEIGHT
+    return gain
 
 def should_exit(state: PipelineState) -> bool:
     cfg = state.get("_cfg")
     if state.get("_loop_detected"): return True
+    if expired(state): return True  # out of time: format with whatever is verified so far
     if (state.get("hops") or 0) >= cfg.max_hops: return True
     if (state.get("attempts") or 0) >= cfg.max_correction_rounds: return True
     if (state.get("_stagnation") or 0) >= cfg.stagnation_patience: return True
     if not state.get("_made_changes_last_cycle") and (state.get("_stagnation",0) >= 1): return True
     ver = state.get("verification") or {}
-    return bool(ver) and all(ver.values())
+    if bool(ver) and all(ver.values()): return True
+    # Only pay for another hop (lookups + LLM) if it is expected to verify enough
+    if expected_gain(state) <= cfg.loop_hop_cost:
+        incr("loop.exit.no_gain")
+        return True
+    return False
 
 def route_after_verify(state: PipelineState) -> str:
     return "FormatReference" if should_exit(state) else "ApplyCorrections"
+
+def record_hop_outcome(prev: Dict[str, bool], now: Dict[str, bool]) -> None:
+    """
+    Per-flag loop statistics: hops spent while a flag was failing, and hops that fixed it.
+    For tuning IEEE_REF_LOOP_FIELD_PRIORS only; routing never reads them.
+    """
+    for f, ok in prev.items():
+        if f in _FLAG_FIELDS and not ok:
+            incr(f"loop.field.{f}.attempts")
+            if now.get(f):
+                incr(f"loop.field.{f}.fixed")
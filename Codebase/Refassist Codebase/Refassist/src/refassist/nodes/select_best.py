@@ -1,10 +1,14 @@
 from collections import Counter, defaultdict
-from typing import Dict, List, Tuple, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple, Optional
 import re
 from ..state import PipelineState
-from ..tools.scoring import score_candidate, is_trustworthy_match
+from ..tools.scoring import CandidateScorer
 from ..tools.utils import normalize_text, token_similarity, authors_to_list, is_plausible_year, coerce_year
 
+_DIGITS_RE = re.compile(r"\d+")
+
+@lru_cache(maxsize=8192)
 def _norm_author(author: str) -> str:
     parts = author.strip().split()
     if not parts: return ""
@@ -16,17 +20,7 @@ def _norm_author(author: str) -> str:
 def _title_sim(a: str, b: str) -> float:
     return token_similarity(normalize_text(a), normalize_text(b))
 
-def _cluster_by_title(cands: List[Dict]) -> List[List[Dict]]:
-    clusters: List[List[Dict]] = []
-    THRESH = 0.92  # tighter to avoid merging similar papers
-    for c in cands:
-        placed = False
-        for cl in clusters:
-            if _title_sim(c.get("title",""), cl[0].get("title","")) >= THRESH:
-                cl.append(c); placed=True; break
-        if not placed:
-            clusters.append([c])
-    return clusters
+_CLUSTER_THRESH = 0.92  # tighter to avoid merging similar papers
 
 def _w(src: str) -> float:
     # Prioritize IEEE Xplore and Crossref in consensus voting
@@ -39,7 +33,7 @@ def _pages_richness(s: str) -> int:
     if not s:
         return 0
     s2 = normalize_text(s).replace("—","-").replace("–","-")
-    nums = re.findall(r"\d+", s2)
+    nums = _DIGITS_RE.findall(s2)
     if "-" in s2 and len(nums) >= 2:
         try:
             if int(nums[0]) != int(nums[1]):
@@ -119,9 +113,8 @@ def _best_year(cl: List[Dict]) -> Tuple[str, str]:
         return y, "consensus"
     return "", ""
 
-def _consensus_record(ex: dict, candidates: List[Dict]) -> Tuple[Dict, List[str], Dict[str,str]]:
-    if not candidates: return {}, [], {}
-    clusters = _cluster_by_title(candidates)
+def _consensus_record(ex: dict, clusters: List[List[Dict]]) -> Tuple[Dict, List[str], Dict[str,str]]:
+    if not clusters: return {}, [], {}
 
     def cl_score(cl: List[Dict]) -> float:
         doi = _has_any_doi_agreement(cl)
@@ -157,7 +150,7 @@ def _consensus_record(ex: dict, candidates: List[Dict]) -> Tuple[Dict, List[str]
     # prefer richer page ranges if top cluster has only single-page
     top_pages = best.get("pages", "")
     if _pages_richness(top_pages) == 1:
-        start = re.search(r"\d+", top_pages)
+        start = _DIGITS_RE.search(top_pages)
         start = start.group(0) if start else ""
         if start:
             richest = top_pages
@@ -166,7 +159,7 @@ def _consensus_record(ex: dict, candidates: List[Dict]) -> Tuple[Dict, List[str]
             for c in top:
                 candp = normalize_text(c.get("pages",""))
                 if _pages_richness(candp) == 2:
-                    nums = re.findall(r"\d+", candp)
+                    nums = _DIGITS_RE.findall(candp)
                     if nums and nums[0] == start:
                         if 2 > richest_rank or (2 == richest_rank and len(candp) > len(richest)):
                             richest = candp
@@ -191,16 +184,17 @@ def _consensus_record(ex: dict, candidates: List[Dict]) -> Tuple[Dict, List[str]
 
     return best, matching_fields, provenance
 
-def select_best(state: PipelineState) -> PipelineState:
+def _untrusted() -> Dict[str, Any]:
+    return {"best": {}, "matching_fields": [], "provenance": {}}
+
+def select_best(state: PipelineState) -> Dict[str, Any]:
     ex = state["extracted"]
     cands = state.get("candidates", [])
     if not cands:
-        state["best"] = {}
-        state["matching_fields"] = []
-        state["provenance"] = {}
-        return state
+        return _untrusted()
 
-    consensus, matching_fields, prov = _consensus_record(ex, cands)
+    scorer = CandidateScorer(ex, cands)
+    consensus, matching_fields, prov = _consensus_record(ex, scorer.clusters(_CLUSTER_THRESH))
 
     # Enforce strict trust before adopting consensus:
     #   - If consensus has DOI and it matches extracted DOI -> trust
@@ -210,19 +204,19 @@ def select_best(state: PipelineState) -> PipelineState:
         trusted = normalize_text(consensus["doi"]).lower().replace("doi:","") == normalize_text(ex["doi"]).lower().replace("doi:","")
 
     if not trusted:
-        best_scored = max(cands, key=lambda c: score_candidate(ex, c))
-        if is_trustworthy_match(ex, best_scored):
-            consensus2, matching_fields2, prov2 = _consensus_record(ex, [best_scored])
+        idx = range(len(cands))
+        best_scored = max(idx, key=scorer.score)
+        if scorer.is_trustworthy(best_scored):
+            consensus2, matching_fields2, prov2 = _consensus_record(ex, [[cands[best_scored]]])
             consensus = consensus2 or consensus
             matching_fields = matching_fields or matching_fields2
             prov = prov or prov2
             trusted = True
         else:
             # One more attempt: pick the candidate with highest title sim to extracted
-            def _title_sim_to_ex(c): return _title_sim(ex.get("title",""), c.get("title",""))
-            best_by_title = max(cands, key=_title_sim_to_ex)
-            if _title_sim_to_ex(best_by_title) >= 0.95 and is_trustworthy_match(ex, best_by_title):
-                consensus2, matching_fields2, prov2 = _consensus_record(ex, [best_by_title])
+            best_by_title = max(idx, key=scorer.title_similarity)
+            if scorer.title_similarity(best_by_title) >= 0.95 and scorer.is_trustworthy(best_by_title):
+                consensus2, matching_fields2, prov2 = _consensus_record(ex, [[cands[best_by_title]]])
                 consensus = consensus2 or consensus
                 matching_fields = matching_fields or matching_fields2
                 prov = prov or prov2
@@ -230,14 +224,8 @@ def select_best(state: PipelineState) -> PipelineState:
 
     # If still not trusted, **do not** override — keep minimal best so later nodes don't rewrite facts
     if not trusted:
-        state["best"] = {}
-        state["matching_fields"] = []
-        state["provenance"] = {}
-        return state
-
-    state["best"] = consensus or {}
-    state["matching_fields"] = matching_fields or []
-    state["provenance"] = prov or {}
-    return state
+        return _untrusted()
+
+    return {"best": consensus or {}, "matching_fields": matching_fields or [], "provenance": prov or {}}
 
 
@@ -1,42 +1,52 @@
 import re
 import json
-from typing import Optional
-from ..state import PipelineState
+from typing import Any, Dict, Optional
+from langchain_core.runnables import RunnableConfig
+from ..state import PipelineState, get_run
+from ..tools.deadline import DeadlineExceeded, bounded, note_skipped, with_skipped
+from ..llms.schemas import REFERENCE_CHECK
 
-async def validate_input_reference(state: PipelineState) -> PipelineState:
+# Static instructions (stable system prefix); the reference goes in the user message
+VALIDATE_SYSTEM = (
+    "You are a bibliographic reference detector.\n"
+    "Decide if the input is a complete reference (journal, conference, book, etc.).\n"
+    "Respond ONLY with JSON: {\"is_reference\": true} or {\"is_reference\": false}."
+)
+
+async def validate_input_reference(state: PipelineState, config: RunnableConfig) -> Dict[str, Any]:
     ref = state.get("reference")
-    llm = state.get("_llm")
+    llm = get_run(config).llm
 
     if not ref or not isinstance(ref, str) or not llm:
-        state["_skip_pipeline"] = True
-        state["verification_message"] = "Reference missing or LLM not initialized."
-        state["verification"] = {"is_reference": False}
-        return state
+        return {
+            "_skip_pipeline": True,
+            "verification_message": "Reference missing or LLM not initialized.",
+            "verification": {"is_reference": False},
+        }
 
     # LLM-first (and only) check
     is_reference = False
     source = "model"
-    prompt = (
-        "You are a bibliographic reference detector.\n"
-        "Decide if the input is a complete reference (journal, conference, book, etc.).\n"
-        "Respond ONLY with JSON: {\"is_reference\": true} or {\"is_reference\": false}.\n"
-        f"Input:\n{ref}\nOutput:"
-    )
+    prompt = f"Input:\n{ref}\nOutput:"
 
     try:
-        raw_json = await llm.json(prompt)
+        raw_json = await bounded(state, llm.json(prompt, system=VALIDATE_SYSTEM, schema=REFERENCE_CHECK, node="validate"))
         if isinstance(raw_json, dict) and "is_reference" in raw_json:
             is_reference = bool(raw_json["is_reference"])
+    except DeadlineExceeded:
+        # Out of time: don't reject the input, just proceed unchecked
+        note_skipped(state, "Reference validity check")
+        is_reference = True
     except Exception as e:
         print(">> LLM call failed:", repr(e))
         is_reference = False
 
     # No heuristic fallback
-    state["_skip_pipeline"] = not is_reference
-    state["verification_message"] = (
-        "Reference detected, proceeding with pipeline." if is_reference
-        else "Reference invalid or incomplete."
-    )
-    state["verification"] = {"is_reference": is_reference}
-
-    return state
+    return with_skipped(state, {
+        "_skip_pipeline": not is_reference,
+        "verification_message": (
+            "Reference detected, proceeding with pipeline." if is_reference
+            else "Reference invalid or incomplete."
+        ),
+        "verification": {"is_reference": is_reference},
+    })
@@ -1,11 +1,16 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from ..config import PipelineConfig
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict
+from ..metrics import incr, observe
 from ..state import PipelineState
+from ..tools.deadline import expired, note_skipped, with_skipped
+from .routing import record_hop_outcome
 from ..tools.utils import (
     heuristic_abbrev, token_similarity, authors_to_list, normalize_text,
     normalize_month_field, fingerprint_state, is_plausible_year
 )
 
+@lru_cache(maxsize=8192)
 def normalize_author_name(author: str) -> str:
     parts = author.strip().split()
     if not parts:
@@ -16,15 +21,62 @@ def normalize_author_name(author: str) -> str:
     surname = parts[-1] if parts[-1][0].isalpha() else ""
     return " ".join(initials + [surname]).lower().strip()
 
+_TEXT_FIELDS = ("title", "journal_name", "journal_abbrev", "volume", "issue", "pages", "doi")
+
+_NORMALIZERS: Dict[str, Callable[["_Side"], Any]] = {
+    **{k: (lambda side, k=k: normalize_text(side.raw.get(k, ""))) for k in _TEXT_FIELDS},
+    "year": lambda side: str(side.raw.get("year", "")).strip(),
+    "month": lambda side: normalize_month_field(side.raw.get("month", "")),
+    "authors": lambda side: authors_to_list(side.raw.get("authors", [])),
+    "author_keys": lambda side: [n for n in (normalize_author_name(a) for a in side.authors) if n],
+}
+
+class _Side:
+    """
+    Normalized fields of one record (extracted or best), each computed on first use and
+    shared by all agents. A malformed value only fails the agents that read it.
+    """
+    __slots__ = ("raw", "_values")
+
+    def __init__(self, rec: Dict[str, Any]):
+        self.raw = rec if isinstance(rec, dict) else {}
+        self._values: Dict[str, Any] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        norm = _NORMALIZERS.get(name)
+        if norm is None:
+            raise AttributeError(name)
+        if name not in self._values:
+            self._values[name] = norm(self)
+        return self._values[name]
+
+class VerifyInputs:
+    """What every agent sees: the extracted reference and the selected best record."""
+    __slots__ = ("ex", "be")
+
+    def __init__(self, extracted: Dict[str, Any], best: Dict[str, Any]):
+        self.ex = _Side(extracted)
+        self.be = _Side(best)
+
+# Verification agents, run inline in registration order. Each takes VerifyInputs and
+# returns {"ok": bool, "correction": {field: value} | None}; register new ones with @agent.
+Agent = Callable[[VerifyInputs], Dict[str, Any]]
+AGENTS: Dict[str, Agent] = {}
+
+def agent(name: str) -> Callable[[Agent], Agent]:
+    def register(fn: Agent) -> Agent:
+        AGENTS[name] = fn
+        return fn
+    return register
+
 def _prefer_abbrev(be_ab: str, fallback: str) -> str:
     if be_ab: return be_ab
     return fallback
 
-def agent_journal(extracted, best):
-    ex_j = normalize_text(extracted.get("journal_name", ""))
-    ex_ab = normalize_text(extracted.get("journal_abbrev", ""))
-    be_j = normalize_text(best.get("journal_name", ""))
-    be_ab = normalize_text(best.get("journal_abbrev", ""))
+@agent("journal")
+def agent_journal(v: VerifyInputs):
+    ex_j, ex_ab = v.ex.journal_name, v.ex.journal_abbrev
+    be_j, be_ab = v.be.journal_name, v.be.journal_abbrev
     corr = {}
     ok = False
 
@@ -41,16 +93,13 @@ def agent_journal(extracted, best):
 
     return {"ok": ok, "correction": corr or None}
 
-def agent_authors(extracted, best):
-    ex = authors_to_list(extracted.get("authors", []))
-    be = authors_to_list(best.get("authors", []))
+@agent("authors")
+def agent_authors(v: VerifyInputs):
+    be = v.be.authors
     if not be:
         return {"ok": False, "correction": None}
 
-    def norm_list(L):
-        return [normalize_author_name(a) for a in L if normalize_author_name(a)]
-
-    exn, ben = norm_list(ex), norm_list(be)
+    exn, ben = v.ex.author_keys, v.be.author_keys
     if not exn or not ben:
         return {"ok": False, "correction": {"authors": be} if be else None}
 
@@ -62,19 +111,18 @@ def agent_authors(extracted, best):
 
     return {"ok": False, "correction": {"authors": be}}
 
-def agent_title(extracted, best):
-    ex_t = normalize_text(extracted.get("title", ""))
-    be_t = normalize_text(best.get("title", ""))
+@agent("title")
+def agent_title(v: VerifyInputs):
+    ex_t, be_t = v.ex.title, v.be.title
     if be_t:
         sim = token_similarity(ex_t, be_t)
         return {"ok": sim >= 0.90, "correction": None if sim >= 0.90 else {"title": be_t}}
     return {"ok": False, "correction": None}
 
-def agent_year_month(extracted, best):
-    ex_y = str(extracted.get("year", "")).strip()
-    ex_m = normalize_month_field(extracted.get("month", ""))
-    be_y = str(best.get("year", "")).strip()
-    be_m = normalize_month_field(best.get("month", ""))
+@agent("year_month")
+def agent_year_month(v: VerifyInputs):
+    ex_y, ex_m = v.ex.year, v.ex.month
+    be_y, be_m = v.be.year, v.be.month
 
     ok = False
     corr = {}
@@ -88,9 +136,10 @@ def agent_year_month(extracted, best):
 
     return {"ok": ok, "correction": corr or None}
 
-def agent_vipd(extracted, best):
-    ex_v, ex_i, ex_p, ex_d = [normalize_text(extracted.get(k, "")) for k in ("volume", "issue", "pages", "doi")]
-    be_v, be_i, be_p, be_d = [normalize_text(best.get(k, "")) for k in ("volume", "issue", "pages", "doi")]
+@agent("vipd")
+def agent_vipd(v: VerifyInputs):
+    ex_v, ex_i, ex_p, ex_d = v.ex.volume, v.ex.issue, v.ex.pages, v.ex.doi
+    be_v, be_i, be_p, be_d = v.be.volume, v.be.issue, v.be.pages, v.be.doi
     corr = {}
     ok = False
 
@@ -106,24 +155,29 @@ def agent_vipd(extracted, best):
 
     return {"ok": ok, "correction": corr or None}
 
-def agent_presence(extracted, best):
-    return {"ok": bool(extracted.get("title")) and bool(extracted.get("authors"))}
-
-def verify_agents(state: PipelineState) -> PipelineState:
+@agent("presence")
+def agent_presence(v: VerifyInputs):
+    return {"ok": bool(v.ex.raw.get("title")) and bool(v.ex.raw.get("authors"))}
+
+def run_agents(extracted: Dict[str, Any], best: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Run every registered agent on one shared VerifyInputs; per-agent timings go to metrics."""
+    inputs = VerifyInputs(extracted, best)
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, fn in AGENTS.items():
+        t0 = time.perf_counter()
+        try:
+            results[name] = fn(inputs)
+        except Exception:
+            incr(f"verify.agent.{name}.errors")
+            results[name] = {"ok": False}
+        observe(f"verify.agent.{name}.ms", (time.perf_counter() - t0) * 1000)
+    return results
+
+def verify_agents(state: PipelineState) -> Dict[str, Any]:
     ex = state["extracted"]
     be = state.get("best", {})
     matching_fields = state.get("matching_fields", [])
-    agents = [agent_journal, agent_authors, agent_title, agent_year_month, agent_vipd, agent_presence]
-    results = {}
-
-    with ThreadPoolExecutor(max_workers=state["_cfg"].agent_threads) as pool:
-        fut_map = {pool.submit(a, ex, be): a.__name__ for a in agents}
-        for fut in as_completed(fut_map):
-            name = fut_map[fut]
-            try:
-                results[name] = fut.result()
-            except Exception:
-                results[name] = {"ok": False}
+    results = run_agents(ex, be)
 
     suggestions = {}
     for name, out in results.items():
@@ -132,21 +186,21 @@ def verify_agents(state: PipelineState) -> PipelineState:
                 if k == "authors" or k not in matching_fields:
                     suggestions[k] = v
 
-    vipd_ok = results.get("agent_vipd", {}).get("ok", False)
-    ym_ok = results.get("agent_year_month", {}).get("ok", False)
+    vipd_ok = results.get("vipd", {}).get("ok", False)
+    ym_ok = results.get("year_month", {}).get("ok", False)
 
     verification = {
-        "title": results.get("agent_title", {}).get("ok", False) or "title" in matching_fields,
-        "authors": results.get("agent_authors", {}).get("ok", False),
-        "journal_name": results.get("agent_journal", {}).get("ok", False) or "journal_name" in matching_fields,
-        "journal_abbrev": results.get("agent_journal", {}).get("ok", False) or "journal_abbrev" in matching_fields,
+        "title": results.get("title", {}).get("ok", False) or "title" in matching_fields,
+        "authors": results.get("authors", {}).get("ok", False),
+        "journal_name": results.get("journal", {}).get("ok", False) or "journal_name" in matching_fields,
+        "journal_abbrev": results.get("journal", {}).get("ok", False) or "journal_abbrev" in matching_fields,
         "year": ym_ok or "year" in matching_fields,
         "month": ym_ok or "month" in matching_fields,
         "volume": vipd_ok or "volume" in matching_fields,
         "issue": vipd_ok or "issue" in matching_fields,
         "pages": vipd_ok or "pages" in matching_fields,
         "doi": vipd_ok or "doi" in matching_fields,
-        "presence": results.get("agent_presence", {}).get("ok", False),
+        "presence": results.get("presence", {}).get("ok", False),
     }
 
     ver_score = sum(1 for v in verification.values() if v)
@@ -154,16 +208,22 @@ def verify_agents(state: PipelineState) -> PipelineState:
     stagnation = state.get("_stagnation", 0)
     stagnation = 0 if ver_score > last_score else (stagnation + 1)
 
-    state["_ver_score"] = ver_score
-    state["_stagnation"] = stagnation
-    state["verification"] = verification
-    state["suggestions"] = suggestions
-    state["hops"] = state.get("hops", 0) + 1
+    # Every verification after the first follows a correction hop
+    if state.get("hops", 0) > 0:
+        record_hop_outcome(state.get("verification") or {}, verification)
+
+    if expired(state) and not all(verification.values()):
+        note_skipped(state, "Further correction rounds")
 
     fp = fingerprint_state(ex, be, suggestions)
     hist = state.get("_fp_history", set())
-    state["_loop_detected"] = fp in hist
-    hist.add(fp)
-    state["_fp_history"] = hist
-    state["_fp"] = fp
-    return state
+    return with_skipped(state, {
+        "_ver_score": ver_score,
+        "_stagnation": stagnation,
+        "verification": verification,
+        "suggestions": suggestions,
+        "hops": state.get("hops", 0) + 1,
+        "_loop_detected": fp in hist,
+        "_fp_history": hist | {fp},
+        "_fp": fp,
+    })
@@ -1,17 +1,27 @@
 from typing import Any, Dict
-from ..state import PipelineState
+from langchain_core.runnables import RunnableConfig
+from ..state import PipelineState, get_run
+from ..tools.deadline import DeadlineExceeded, bounded, note_skipped
 
 # Async NLM Catalog verification using the shared httpx.AsyncClient
 NLM_ESEARCH = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
 NLM_ESUMMARY = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
 
-async def verify_journal_abbrev(state: PipelineState) -> PipelineState:
+# Keys _verify may replace on its working copy of the state
+_UPDATED_KEYS = ("extracted", "corrections", "verification_message", "skipped")
+
+async def verify_journal_abbrev(state: PipelineState, config: RunnableConfig) -> Dict[str, Any]:
     """
     Verify journal abbreviation using NLM Catalog API (async, non-blocking).
     Updates:
       - state.extracted['verified_journal_abbrev']
       - logs issues in state.corrections and state.verification_message
     """
+    work = dict(state)
+    await _verify(work, get_run(config).http)
+    return {k: work[k] for k in _UPDATED_KEYS if k in work and work[k] is not state.get(k)}
+
+async def _verify(state: PipelineState, client: Any) -> None:
     journal = (state.get("extracted", {}) or {}).get("journal_name", "") or ""
     current_abbrev = (state.get("extracted", {}) or {}).get("journal_abbrev", "") or ""
 
@@ -21,13 +31,12 @@ async def verify_journal_abbrev(state: PipelineState) -> PipelineState:
         state["corrections"] = state.get("corrections", []) + [
             ("journal_abbrev", current_abbrev, "Missing journal name")
         ]
-        return state
+        return
 
-    client = state.get("_http")
     if client is None:
         state["verification_message"] = (state.get("verification_message", "") +
                                          "HTTP client unavailable; skipped journal abbreviation verification. ")
-        return state
+        return
 
     try:
         # Step 1: esearch → NLM ID
@@ -37,7 +46,7 @@ async def verify_journal_abbrev(state: PipelineState) -> PipelineState:
             "retmode": "json",
             "retmax": 1
         }
-        r1 = await client.get(NLM_ESEARCH, params=es_params)
+        r1 = await bounded(state, client.get(NLM_ESEARCH, params=es_params))
         r1.raise_for_status()
         data = r1.json()
         idlist = (data.get("esearchresult") or {}).get("idlist") or []
@@ -47,7 +56,7 @@ async def verify_journal_abbrev(state: PipelineState) -> PipelineState:
             state["corrections"] = state.get("corrections", []) + [
                 ("journal_abbrev", current_abbrev, "Journal not found")
             ]
-            return state
+            return
 
         nlm_id = idlist[0]
 
@@ -57,14 +66,14 @@ async def verify_journal_abbrev(state: PipelineState) -> PipelineState:
             "id": nlm_id,
             "retmode": "json"
         }
-        r2 = await client.get(NLM_ESUMMARY, params=sum_params)
+        r2 = await bounded(state, client.get(NLM_ESUMMARY, params=sum_params))
         r2.raise_for_status()
         sdata = r2.json()
         journal_data = (sdata.get("result") or {}).get(nlm_id, {}) or {}
         standard_abbrev = journal_data.get("isoabbreviation", "") or ""
 
         if standard_abbrev:
-            state["extracted"]["verified_journal_abbrev"] = standard_abbrev
+            state["extracted"] = {**state.get("extracted", {}), "verified_journal_abbrev": standard_abbrev}
             if current_abbrev and current_abbrev.lower() != standard_abbrev.lower():
                 state["corrections"] = state.get("corrections", []) + [
                     ("journal_abbrev", current_abbrev, standard_abbrev)
@@ -78,11 +87,11 @@ async def verify_journal_abbrev(state: PipelineState) -> PipelineState:
                 ("journal_abbrev", current_abbrev, "Not found")
             ]
 
+    except DeadlineExceeded:
+        note_skipped(state, "Journal abbreviation check (NLM Catalog)")
     except Exception as e:
         state["verification_message"] = (state.get("verification_message", "") +
                                          f"Failed to verify journal abbreviation: {str(e)}. ")
         state["corrections"] = state.get("corrections", []) + [
             ("journal_abbrev", current_abbrev, f"Verification error: {str(e)}")
         ]
-
-    return state
@@ -1,2 +1,3 @@
-from .models import PipelineState, ExtractedModel
-__all__ = ["PipelineState", "ExtractedModel"]
+from .models import PipelineState, ExtractedModel, Candidate
+from .context import RunContext, get_run
+__all__ = ["PipelineState", "ExtractedModel", "Candidate", "RunContext", "get_run"]
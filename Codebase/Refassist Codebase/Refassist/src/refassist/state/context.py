@@ -0,0 +1,18 @@
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+@dataclass
+class RunContext:
+    """
+    Runtime dependencies of one pipeline run (LLM adapter, shared HTTP client,
+    source cache/limiter, source clients). Nodes get it from
+    config["configurable"]["run"] so PipelineState stays plain, checkpointable data.
+    """
+    llm: Any = None
+    http: Any = None
+    cache: Any = None
+    limiter: Any = None
+    sources: List[Any] = field(default_factory=list)
+
+def get_run(config: Optional[dict]) -> RunContext:
+    return ((config or {}).get("configurable") or {}).get("run") or RunContext()
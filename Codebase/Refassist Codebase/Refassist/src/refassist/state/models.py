@@ -1,4 +1,4 @@
-from typing import Any, Dict, List, Optional, Tuple, Set
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Set
 from typing_extensions import TypedDict
 
 try:
@@ -28,26 +28,59 @@ class ExtractedModel(BaseModel):
     url: Optional[str] = None
     arxiv_id: Optional[str] = None
 
+class Candidate:
+    """
+    One normalized source record. A reference holds dozens of these for the whole run,
+    so fields live in __slots__ (no per-instance dict, no raw payload); reads work like
+    a dict (c["title"], c.get("doi", "")) so scoring/consensus code takes either.
+    """
+    __slots__ = (
+        "source", "title", "authors", "journal_name", "journal_abbrev", "conference_name",
+        "volume", "issue", "pages", "year", "month", "doi", "url",
+        "cr_type", "oa_is_proceedings", "s2_types",   # per-source type hints (type_reconcile)
+        "evidence",                                  # (label, URL) links for the report
+    )
+
+    def __init__(self, source: str, **fields: Any):
+        self.source = source
+        for k, v in fields.items():
+            setattr(self, k, v)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default) if key in _CANDIDATE_FIELDS else default
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _CANDIDATE_FIELDS and hasattr(self, key):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in _CANDIDATE_FIELDS and hasattr(self, key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self.__slots__ if hasattr(self, k)}
+
+    def __repr__(self) -> str:
+        return f"Candidate({self.to_dict()!r})"
+
+_CANDIDATE_FIELDS = frozenset(Candidate.__slots__)
+
 class PipelineState(TypedDict, total=False):
     reference: str
     type: str
     extracted: Dict[str, Any]
-    candidates: List[Dict[str, Any]]
+    candidates: List[Candidate]
     best: Dict[str, Any]
     verification: Dict[str, bool]
     suggestions: Dict[str, Any]
     corrections: List[Tuple[str, Any, Any]]
     formatted: str
     report: str
+    report_sections: List[List[str]]  # (title, block) pairs; the .docx is rendered from these on request
     attempts: int
     hops: int
     _made_changes_last_cycle: bool
-    _cfg: Any
-    _llm: Any
-    _http: Any
-    _cache: Any
-    _limiter: Any
-    _sources: Any
+    _cfg: Any  # PipelineConfig; runtime handles (LLM, HTTP, sources) live in RunContext, not here
     _llm_type_vote: Optional[str]
     csl_json: Dict[str, Any]
     bibtex: str
@@ -57,5 +90,12 @@ class PipelineState(TypedDict, total=False):
     _fp_history: Set[str]
     _loop_detected: bool
     _skip_pipeline: Optional[bool]
+    _deadline: float  # absolute time.monotonic() budget for this reference (see tools.deadline)
+    skipped: List[str]  # steps dropped because the deadline was hit
+    errors: List[str]  # source/LLM calls that failed during the run (such results are not cached)
+    llm_tokens_saved: int  # estimated prompt tokens LLMCorrect did not send (skips + compaction)
+    _outputs: FrozenSet[str]  # outputs requested by the caller; stages nobody asked for are routed around
     verification_message: Optional[str]
+    provenance: Dict[str, str]  # field -> source of the best value (SelectBest)
+    audit: Dict[str, str]  # field -> source of each applied correction (ApplyCorrections)
     matching_fields: List[str]  # NEW: List of fields that matched the best candidate
\ No newline at end of file
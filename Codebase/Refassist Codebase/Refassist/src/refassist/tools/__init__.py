@@ -1,4 +1,7 @@
 from .utils import *
-from .scoring import score_candidate, is_trustworthy_match
+from .scoring import score_candidate, is_trustworthy_match, CandidateScorer
 from .type_reconcile import reconcile_type
-__all__ = ["score_candidate", "is_trustworthy_match", "reconcile_type"]
+from .dedupe import cluster_references, RefCluster
+from .bibtex import parse_structured, split_bibliography
+__all__ = ["score_candidate", "is_trustworthy_match", "CandidateScorer", "reconcile_type", "cluster_references", "RefCluster",
+           "parse_structured", "split_bibliography"]
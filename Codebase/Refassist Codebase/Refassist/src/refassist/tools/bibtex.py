@@ -0,0 +1,368 @@
+"""
+Native readers for LaTeX bibliographies, so structured input can skip the LLM parsing stages.
+
+  - BibTeX (.bib)      : @article{key, title = {...}, ...} with @string macros, # and crossref
+  - biblatex/biber .bbl: \\entry{key}{type}{} ... \\endentry blocks
+  - thebibliography    : \\bibitem{key} ... items (.bbl from classic BibTeX styles, .tex).
+                         These are already formatted text, so they become one plain-text
+                         reference each and still go through the LLM parser.
+
+split_bibliography() cuts such input into one string per entry (BibTeX entries are
+rewritten with macros and crossrefs resolved, so each one stands alone);
+parse_structured() reads one BibTeX/biblatex entry back into (type, extracted fields).
+"""
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+from .utils import normalize_text, normalize_month_field
+
+# A reference string that parse_structured can read
+STRUCTURED_RE = re.compile(r"^\s*(?:@\s*[A-Za-z]+\s*[{(]|\\entry\{)")
+
+_BIB_ENTRY_RE = re.compile(r"@\s*([A-Za-z]+)\s*([{(])")
+_BIB_LINE_RE = re.compile(r"^\s*@\s*[A-Za-z]+\s*[{(]", re.M)
+_IDENT_RE = re.compile(r"[^\s,=#{}()\"]+")
+_KEY_RE = re.compile(r"\s*([^,\s{}()]*)\s*(,?)")
+_BBL_ENTRY_RE = re.compile(r"\\entry\{([^}]*)\}\{([^}]*)\}\{[^}]*\}(.*?)\\endentry", re.S)
+_BBL_FIELD_RE = re.compile(r"\\(field|list|name)\{([^}]*)\}")
+_BBL_VERB_RE = re.compile(r"\\verb\{([^}]*)\}\s*\\verb\s+(.*?)\s*\\endverb", re.S)
+_BBL_NAMEPART_RE = re.compile(r"\b(family|given|prefix|suffix)=(\{)")
+_THEBIB_RE = re.compile(r"\\begin\{thebibliography\}\s*\{[^}]*\}(.*?)(?:\\end\{thebibliography\}|\Z)", re.S)
+_BIBITEM_RE = re.compile(r"\\bibitem\s*(?:\[[^\]]*\])?\s*\{[^}]*\}")
+_AND_RE = re.compile(r"\s+and\s+", re.I)
+
+_BIB_MONTHS = {m: m for m in ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")}
+
+TYPE_MAP = {
+    "article": "journal article",
+    "inproceedings": "conference paper", "conference": "conference paper", "proceedings": "conference paper",
+    "book": "book", "mvbook": "book", "booklet": "book",
+    "inbook": "book chapter", "incollection": "book chapter", "bookinbook": "book chapter",
+    "phdthesis": "thesis", "mastersthesis": "thesis", "thesis": "thesis",
+    "techreport": "technical report", "report": "technical report",
+    "dataset": "dataset", "standard": "standard", "software": "software",
+}
+_VENUE_IS_CONFERENCE = {"inproceedings", "conference", "proceedings"}
+
+# ---------- LaTeX -> text ----------
+_ACCENTS = {
+    "`": "\u0300", "'": "\u0301", "^": "\u0302", "~": "\u0303", "=": "\u0304", "u": "\u0306",
+    ".": "\u0307", '"': "\u0308", "r": "\u030a", "H": "\u030b", "v": "\u030c", "c": "\u0327", "k": "\u0328",
+}
+_SPECIAL = {"ss": "ß", "ae": "æ", "AE": "Æ", "oe": "œ", "OE": "Œ", "aa": "å", "AA": "Å",
+            "o": "ø", "O": "Ø", "l": "ł", "L": "Ł", "i": "i", "j": "j"}
+_SYM_ACCENT_RE = re.compile(r"\\([`'^\"~=.])\s*(?:\{\s*\\?([A-Za-z])\s*\}|\\?([A-Za-z]))")
+_LETTER_ACCENT_RE = re.compile(r"\\([uvHckr])(?:\s*\{\s*\\?([A-Za-z])\s*\}|\s+\\?([A-Za-z]))")
+# Commands that print text (logos, symbols); everything else unknown is markup and dropped
+_TEXT_CMD = {"LaTeX": "LaTeX", "LaTeXe": "LaTeX2e", "TeX": "TeX", "BibTeX": "BibTeX", "XeTeX": "XeTeX",
+             "XeLaTeX": "XeLaTeX", "LuaTeX": "LuaTeX", "LuaLaTeX": "LuaLaTeX", "ConTeXt": "ConTeXt",
+             "AmS": "AMS", "AmSTeX": "AMS-TeX", "MF": "Metafont", "MP": "MetaPost",
+             "ldots": "...", "dots": "...", "textellipsis": "...", "textemdash": "—",
+             "textregistered": "®", "texttrademark": "™", "copyright": "©", "textcopyright": "©"}
+_TEXT_CMD_RE = re.compile(r"\\(" + "|".join(_TEXT_CMD) + r")(?![A-Za-z])")
+_SPECIAL_RE = re.compile(r"\\(ss|ae|AE|oe|OE|aa|AA|o|O|l|L|i|j)(?![A-Za-z])\s*")
+_LINK_RE = re.compile(r"\\(?:url|path|doi)\s*\{([^}]*)\}|\\href\s*\{[^}]*\}\s*\{([^}]*)\}")
+_ESCAPED_RE = re.compile(r"\\([&%$#_{}])")
+_PROTECT = {"{": "\ue000", "}": "\ue001", "$": "\ue002"}   # escaped chars the markup pass would strip
+_SPACE_CMD_RE = re.compile(r"\\(?:newblock|bibinitdelim|bibnamedelim[a-z]|[ ,;:!])|(?<!\\)~")
+_COMMAND_RE = re.compile(r"\\[A-Za-z]+\*?\s*|\\.")
+
+
+def _accent(m: re.Match) -> str:
+    return (m.group(2) or m.group(3)) + _ACCENTS[m.group(1)]
+
+
+def latex_to_text(s: Any) -> str:
+    """Plain text of a LaTeX field value: accents, escapes and dashes resolved, markup dropped."""
+    s = str(s or "")
+    if "\\" in s or "{" in s or "~" in s or "$" in s:
+        s = _LINK_RE.sub(lambda m: m.group(1) or m.group(2), s)
+        s = s.replace("\\bibinitperiod", ".").replace("\\bibrangedash", "-").replace("\\textendash", "–")
+        s = _TEXT_CMD_RE.sub(lambda m: _TEXT_CMD[m.group(1)], s)
+        s = _SPECIAL_RE.sub(lambda m: _SPECIAL[m.group(1)], s)
+        s = _SYM_ACCENT_RE.sub(_accent, s)
+        s = _LETTER_ACCENT_RE.sub(_accent, s)
+        s = _SPACE_CMD_RE.sub(" ", s)
+        s = _ESCAPED_RE.sub(lambda m: _PROTECT.get(m.group(1), m.group(1)), s)
+        s = _COMMAND_RE.sub("", s)
+        s = s.replace("{", "").replace("}", "").replace("$", "")
+        for ch, mark in _PROTECT.items():
+            s = s.replace(mark, ch)
+    s = s.replace("``", "“").replace("''", "”").replace("---", "—").replace("--", "–")
+    return normalize_text(unicodedata.normalize("NFC", s))
+
+
+# ---------- BibTeX ----------
+def _group_end(s: str, i: int, close: str) -> int:
+    """Index of the `close` that ends the group opened just before i (braces nest)."""
+    depth = 0
+    while i < len(s):
+        ch = s[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            if depth == 0 and close == "}":
+                return i
+            depth -= 1
+        elif ch == close and depth == 0:
+            return i
+        i += 1
+    return len(s)
+
+
+class _BibScanner:
+    def __init__(self, text: str, macros: Dict[str, str]):
+        self.s, self.i, self.macros = text, 0, macros
+
+    def ws(self) -> None:
+        while self.i < len(self.s) and self.s[self.i].isspace():
+            self.i += 1
+
+    def peek(self) -> str:
+        self.ws()
+        return self.s[self.i] if self.i < len(self.s) else ""
+
+    def ident(self) -> str:
+        self.ws()
+        m = _IDENT_RE.match(self.s, self.i)
+        if not m:
+            return ""
+        self.i = m.end()
+        return m.group(0)
+
+    def value(self) -> str:
+        parts = []
+        while True:
+            ch = self.peek()
+            if ch == "{":
+                end = _group_end(self.s, self.i + 1, "}")
+                parts.append(self.s[self.i + 1:end])
+                self.i = end + 1
+            elif ch == '"':
+                end = _group_end(self.s, self.i + 1, '"')
+                parts.append(self.s[self.i + 1:end])
+                self.i = end + 1
+            else:
+                word = self.ident()
+                if not word:
+                    break
+                parts.append(word if word.isdigit() else self.macros.get(word.lower(), word))
+            if self.peek() != "#":
+                break
+            self.i += 1
+        return "".join(parts)
+
+    def fields(self, close: str) -> Dict[str, str]:
+        out: Dict[str, str] = {}
+        while self.i < len(self.s):
+            ch = self.peek()
+            if ch in (close, ""):
+                self.i += 1
+                break
+            if ch == ",":
+                self.i += 1
+                continue
+            name = self.ident()
+            if not name or self.peek() != "=":
+                # Malformed: give up on the rest of this entry
+                self.i = _group_end(self.s, self.i, close) + 1
+                break
+            self.i += 1
+            out[name.lower()] = self.value()
+        return out
+
+
+def parse_bibtex(text: str) -> List[Tuple[str, str, Dict[str, str]]]:
+    """(type, key, raw fields) for every entry, with @string macros expanded and crossrefs merged."""
+    macros = dict(_BIB_MONTHS)
+    entries: List[Tuple[str, str, Dict[str, str]]] = []
+    pos = 0
+    while (m := _BIB_ENTRY_RE.search(text, pos)):
+        kind, close = m.group(1).lower(), ("}" if m.group(2) == "{" else ")")
+        sc = _BibScanner(text, macros)
+        sc.i = m.end()
+        if kind in ("comment", "preamble"):
+            sc.i = _group_end(text, sc.i, close) + 1
+        elif kind == "string":
+            macros.update(sc.fields(close))
+        else:
+            km = _KEY_RE.match(text, sc.i)
+            key, sc.i = km.group(1), km.end()
+            fields = sc.fields(close) if km.group(2) else {}
+            if fields:
+                entries.append((kind, key, fields))
+        pos = max(sc.i, m.end())
+
+    by_key = {key.lower(): fields for _, key, fields in entries}
+    for _, _, fields in entries:
+        parent = by_key.get((fields.get("crossref") or "").strip().lower())
+        if parent is not None and parent is not fields:
+            for k, v in parent.items():
+                if k == "title" and "booktitle" not in fields:
+                    fields["booktitle"] = v
+                fields.setdefault(k, v)
+    return entries
+
+
+def _split_top(s: str, sep: re.Pattern) -> List[str]:
+    """Split on sep outside braces (BibTeX protects "{Barnes and Noble}" from splitting)."""
+    out, depth, start, i = [], 0, 0, 0
+    while i < len(s):
+        ch = s[i]
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+        elif depth == 0 and (m := sep.match(s, i)):
+            out.append(s[start:i])
+            start = i = m.end()
+            continue
+        i += 1
+    out.append(s[start:])
+    return [p.strip() for p in out if p.strip()]
+
+
+def _bibtex_names(raw: str) -> List[str]:
+    names = []
+    for name in _split_top(normalize_text(raw), _AND_RE):
+        if name.lower() == "others":
+            continue
+        parts = _split_top(name, re.compile(r",\s*"))
+        if len(parts) == 2:        # Last, First
+            name = f"{parts[1]} {parts[0]}"
+        elif len(parts) >= 3:      # Last, Jr, First
+            name = f"{parts[2]} {parts[0]} {parts[1]}"
+        if (name := latex_to_text(name)):
+            names.append(name)
+    return names
+
+
+def _render_bibtex(kind: str, key: str, fields: Dict[str, str]) -> str:
+    body = ", ".join(f"{k} = {{{normalize_text(v)}}}" for k, v in fields.items() if normalize_text(v))
+    return f"@{kind}{{{key}, {body}}}"
+
+
+# ---------- biblatex .bbl ----------
+def _braced(s: str, i: int) -> Tuple[Optional[str], int]:
+    """Content of the {...} group at s[i] (after whitespace/%) and the index after it; None if there is none."""
+    while i < len(s) and (s[i].isspace() or s[i] == "%"):
+        i += 1
+    if i >= len(s) or s[i] != "{":
+        return None, i
+    end = _group_end(s, i + 1, "}")
+    return s[i + 1:end], end + 1
+
+
+def _groups(s: str) -> List[str]:
+    out, i = [], 0
+    while (g := _braced(s, i))[0] is not None:
+        out.append(g[0])
+        i = g[1]
+    return out
+
+
+def _bbl_name(item: str) -> str:
+    parts = {}
+    for m in _BBL_NAMEPART_RE.finditer(item):
+        parts.setdefault(m.group(1), _braced(item, m.start(2))[0])
+    if not parts:
+        # biblatex < 3.3: {options}{family}{f.}{given}{g.}{prefix}{p.}{suffix}{s.}
+        groups = _groups(item)
+        groups = groups[1:] if len(groups) > 8 else groups
+        parts = dict(zip(("family", "", "given", "", "prefix", "", "suffix"), groups))
+    name = " ".join(p for p in (parts.get("given"), parts.get("prefix"), parts.get("family"), parts.get("suffix")) if p)
+    return latex_to_text(name)
+
+
+def _bbl_fields(body: str) -> Tuple[Dict[str, str], List[str]]:
+    fields: Dict[str, str] = {}
+    names: Dict[str, List[str]] = {}
+    for m in _BBL_FIELD_RE.finditer(body):
+        kind, name = m.group(1), m.group(2).lower()
+        i = m.end()
+        if kind in ("list", "name"):
+            _, i = _braced(body, i)                     # count
+        if kind == "name":
+            _, i = _braced(body, i)                     # per-list options
+        value = _braced(body, i)[0] or ""
+        if kind == "field":
+            fields.setdefault(name, value)
+        elif kind == "list":
+            fields.setdefault(name, " and ".join(g for g in _groups(value) if g))
+        else:
+            names.setdefault(name, [p for p in map(_bbl_name, _groups(value)) if p])
+    for m in _BBL_VERB_RE.finditer(body):
+        fields.setdefault(m.group(1).lower(), m.group(2).strip())
+    return fields, names.get("author") or names.get("editor") or []
+
+
+# ---------- Fields -> ExtractedModel ----------
+def _extracted(kind: str, fields: Dict[str, str], authors: List[str]) -> Dict[str, Any]:
+    f = {k: latex_to_text(v) for k, v in fields.items()}
+    out: Dict[str, Any] = {"authors": authors}
+    title = f.get("title")
+    if title and f.get("subtitle"):
+        title = f"{title}: {f['subtitle']}"
+    out["title"] = title
+    out["journal_name"] = f.get("journal") or f.get("journaltitle")
+    out["journal_abbrev"] = f.get("shortjournal")
+    if kind in _VENUE_IS_CONFERENCE:
+        out["conference_name"] = f.get("booktitle") or f.get("eventtitle") or (title if kind == "proceedings" else None)
+    out["volume"] = f.get("volume")
+    out["issue"] = f.get("number") or f.get("issue")
+    if f.get("pages"):
+        out["pages"] = re.sub(r"\s*[-–—]+\s*", "-", f["pages"])
+    date = f.get("date") or ""
+    out["year"] = f.get("year") or date[:4]
+    month = f.get("month") or date[5:7]
+    out["month"] = normalize_month_field(month[:3] if month.isalpha() else month)
+    out["doi"] = re.sub(r"^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)", "", f.get("doi") or "", flags=re.I)
+    out["publisher"] = f.get("publisher") or f.get("school") or f.get("institution") or f.get("organization")
+    out["location"] = f.get("address") or f.get("location")
+    out["edition"] = f.get("edition")
+    out["isbn"] = f.get("isbn")
+    out["url"] = f.get("url")
+    if (f.get("archiveprefix") or f.get("eprinttype") or "").lower() == "arxiv" and f.get("eprint"):
+        out["arxiv_id"] = f["eprint"]
+    return {k: v for k, v in out.items() if v}
+
+
+def parse_structured(reference: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """(reference type, ExtractedModel fields) of one BibTeX or biblatex entry; None for anything else."""
+    if not STRUCTURED_RE.match(reference or ""):
+        return None
+    if (m := _BBL_ENTRY_RE.search(reference)):
+        kind = m.group(2).lower()
+        fields, authors = _bbl_fields(m.group(3))
+    else:
+        entries = parse_bibtex(reference)
+        if not entries:
+            return None
+        kind, _, fields = entries[0]
+        authors = _bibtex_names(fields.get("author") or fields.get("editor") or "")
+    extracted = _extracted(kind, fields, authors)
+    if not extracted.get("title"):
+        return None
+    return TYPE_MAP.get(kind, "other"), extracted
+
+
+def split_bibliography(text: str) -> Optional[List[str]]:
+    """
+    One reference string per entry when text is a LaTeX bibliography, else None
+    (the caller falls back to its plain-text splitter).
+    """
+    if "\\entry{" in text and (bbl := _BBL_ENTRY_RE.findall(text)):
+        return [" ".join(f"\\entry{{{key}}}{{{kind}}}{{}} {body} \\endentry".split()) for key, kind, body in bbl]
+    if _BIB_LINE_RE.search(text):
+        refs = [_render_bibtex(kind, key, fields) for kind, key, fields in parse_bibtex(text)]
+        if refs:
+            return refs
+    if "\\bibitem" in text:
+        m = _THEBIB_RE.search(text)
+        items = _BIBITEM_RE.split(m.group(1) if m else text)[1:]
+        refs = [latex_to_text(item) for item in items]
+        return [r for r in refs if r] or None
+    return None
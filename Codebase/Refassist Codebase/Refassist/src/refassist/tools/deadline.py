@@ -0,0 +1,57 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, Optional, TypeVar
+from ..state import PipelineState
+
+# Per-reference time budget. run_one stores an absolute time.monotonic() deadline
+# in state["_deadline"]; nodes bound their I/O with it and record what they had
+# to drop in state["skipped"] (surfaced in the report; returned via with_skipped).
+
+T = TypeVar("T")
+
+class DeadlineExceeded(Exception):
+    pass
+
+def time_left(state: PipelineState) -> Optional[float]:
+    """Seconds until the deadline (never negative), or None when the run has no deadline."""
+    deadline = state.get("_deadline")
+    if not deadline:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+def expired(state: PipelineState) -> bool:
+    left = time_left(state)
+    return left is not None and left <= 0
+
+def note_skipped(state: PipelineState, what: str) -> None:
+    skipped = state.get("skipped") or []
+    if what not in skipped:
+        state["skipped"] = [*skipped, what]
+
+def with_skipped(state: PipelineState, update: Dict[str, Any]) -> Dict[str, Any]:
+    """A node's partial update, plus the skipped list noted on its working copy of the state."""
+    if state.get("skipped"):
+        update["skipped"] = state["skipped"]
+    return update
+
+async def bounded(state: PipelineState, aw: Awaitable[T]) -> T:
+    """Await `aw` within the remaining budget; cancels it and raises DeadlineExceeded on overrun."""
+    left = time_left(state)
+    if left is None:
+        return await aw
+    if left <= 0:
+        if asyncio.iscoroutine(aw):
+            aw.close()
+        raise DeadlineExceeded()
+    try:
+        return await asyncio.wait_for(aw, left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded() from None
+
+async def run_within(state: PipelineState, what: str, aw: Awaitable[T], default: Any = None) -> T:
+    """Like bounded(), but degrades to `default` and records `what` as skipped."""
+    try:
+        return await bounded(state, aw)
+    except DeadlineExceeded:
+        note_skipped(state, what)
+        return default
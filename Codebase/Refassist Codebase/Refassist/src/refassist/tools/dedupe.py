@@ -0,0 +1,108 @@
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Tuple
+from .utils import norm_for_compare, token_similarity
+
+DOI_RE = re.compile(r'(10\.\d{4,9}/[^\s,;]+)', re.I)
+_MARKER_RE = re.compile(r"^\s*(?:\[\d+\]|\d+[.)])\s*")   # "[3] " / "3. " list numbering
+_ROMAN_RE = re.compile(r"(?:x{0,3})(?:ix|iv|v?i{0,3})")
+
+@dataclass
+class RefCluster:
+    rep: int                                              # index of the reference that gets processed
+    members: List[int]                                    # all indices in the cluster (incl. rep), ascending
+    reasons: Dict[int, str] = field(default_factory=dict) # member -> why it was merged into rep
+
+def _doi(ref: str) -> str:
+    m = DOI_RE.search(ref or "")
+    return m.group(1).rstrip(".").lower() if m else ""
+
+def _block_keys(tokens: List[str], df: Counter, k: int) -> List[str]:
+    # The k rarest informative tokens; near-duplicates share their distinctive title words
+    informative = {t for t in tokens if len(t) >= 4 and not t.isdigit()}
+    return sorted(informative, key=lambda t: (df[t], t))[:k]
+
+def _numbers(ref: str) -> FrozenSet[str]:
+    """
+    Year, volume, issue, pages and part numbers of a reference: its digit and roman-numeral
+    tokens, without the list marker and the DOI. Different works by the same authors under
+    the same title (a later volume, "Part II") differ here even when the text is 0.97 alike.
+    """
+    text = norm_for_compare(DOI_RE.sub(" ", _MARKER_RE.sub("", ref or "")))
+    return frozenset(str(int(t)) if t.isdigit() else t
+                     for t in text.split() if t.isdigit() or _ROMAN_RE.fullmatch(t))
+
+def cluster_references(refs: List[str], threshold: float = 0.93, keys_per_ref: int = 3,
+                       max_block: int = 64) -> List[RefCluster]:
+    """
+    Group near-duplicate references of one batch.
+      - Same DOI => duplicate; different DOIs => never duplicates.
+      - Else token_similarity >= threshold on normalized text and the same numbers
+        (year/volume/issue/pages, see _numbers), compared only inside blocks of
+        references sharing a rare token (no all-pairs scan).
+    Matches do not chain: a reference joins a cluster only if it matches every member.
+    The longest member (most complete citation) is the representative.
+    """
+    n = len(refs)
+    dois = [_doi(r) for r in refs]
+    links: Dict[Tuple[int, int], str] = {}   # (i, j), i < j -> why they are duplicates
+
+    by_doi: Dict[str, List[int]] = defaultdict(list)
+    for i, d in enumerate(dois):
+        if d: by_doi[d].append(i)
+    for d, same in by_doi.items():
+        for a in range(len(same)):
+            for b in range(a + 1, len(same)):
+                links[(same[a], same[b])] = f"same DOI {d}"
+
+    norm = [norm_for_compare(r) for r in refs]
+    toks = [t.split() for t in norm]
+    df = Counter(t for ts in toks for t in set(ts))
+    blocks: Dict[str, List[int]] = defaultdict(list)
+    for i, ts in enumerate(toks):
+        for key in _block_keys(ts, df, keys_per_ref):
+            blocks[key].append(i)
+
+    numbers: Dict[int, FrozenSet[str]] = {}
+    compared = set()
+    for members in blocks.values():
+        if len(members) < 2 or len(members) > max_block:
+            continue
+        for a in range(len(members)):
+            for b in range(a + 1, len(members)):
+                i, j = members[a], members[b]
+                if (i, j) in compared or (i, j) in links: continue
+                compared.add((i, j))
+                if dois[i] and dois[j] and dois[i] != dois[j]: continue
+                sim = token_similarity(norm[i], norm[j])
+                if sim < threshold: continue
+                for k in (i, j):
+                    if k not in numbers: numbers[k] = _numbers(refs[k])
+                if numbers[i] == numbers[j]:
+                    links[(i, j)] = f"text similarity {sim:.2f}"
+
+    # Complete linkage, in input order: join the first cluster whose members all match
+    linked: Dict[int, set] = defaultdict(set)
+    for i, j in links:
+        linked[i].add(j); linked[j].add(i)
+    groups: List[List[int]] = []
+    group_of: Dict[int, int] = {}
+    for i in range(n):
+        home = None
+        for g in sorted({group_of[j] for j in linked[i] if j < i}):
+            if all(m in linked[i] for m in groups[g]):
+                home = g
+                break
+        if home is None:
+            home = len(groups)
+            groups.append([])
+        groups[home].append(i)
+        group_of[i] = home
+
+    clusters: List[RefCluster] = []
+    for members in groups:
+        rep = max(members, key=lambda i: (len(refs[i]), -i))
+        reasons = {i: links.get((min(i, rep), max(i, rep)), "near-duplicate") for i in members if i != rep}
+        clusters.append(RefCluster(rep=rep, members=members, reasons=reasons))
+    return clusters
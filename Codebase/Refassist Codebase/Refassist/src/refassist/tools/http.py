@@ -1,5 +1,5 @@
 import asyncio
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from cachetools import TTLCache
 from .utils import DEFAULT_UA  # fixed import
 try:
@@ -14,6 +14,9 @@ class SourceClient:
         self.client = client or (httpx.AsyncClient(timeout=self.cfg.timeout_s) if httpx is not None else None)
         self.limiter = limiter or asyncio.Semaphore(cfg.concurrency)
         self.cache = cache
+        # Requests that failed after retries (the by_* methods swallow them and return None);
+        # clients live for one run, so run_one can tell an outage from "nothing found"
+        self.failures: List[str] = []
 
     def _cache_get(self, key: str):
         if not self.cache: return None
@@ -25,6 +28,7 @@ class SourceClient:
 
     async def _get_json(self, url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
         if self.client is None:
+            self.failures.append(f"{self.NAME}: HTTP client unavailable")
             raise RuntimeError("HTTP client unavailable.")
         hdrs = {"User-Agent": DEFAULT_UA}
         if headers: hdrs.update(headers)
@@ -41,10 +45,14 @@ class SourceClient:
                 ct = r.headers.get("content-type","")
                 if "json" in ct: return r.json()
                 return {"_raw": r.text}
-            except Exception:
+            except Exception as e:
                 if attempt <= 2:
                     await asyncio.sleep(0.3 * attempt)
                     continue
+                status = getattr(getattr(e, "response", None), "status_code", None)
+                if status is None or status == 429 or status >= 500:
+                    # A 4xx answer (unknown DOI etc.) is a result, not an outage
+                    self.failures.append(f"{self.NAME}: {status or type(e).__name__}")
                 raise
 
     async def by_doi(self, doi: str): raise NotImplementedError
@@ -1,97 +1,147 @@
-from typing import Any, Dict, List
-from .utils import normalize_text, token_similarity, authors_to_list
+from typing import Any, Dict, List, NamedTuple, Sequence
+from .utils import normalize_text, norm_for_compare, authors_to_list, similarity_matrix, np
 
 # NEW: venues we consider highly authoritative (when present)
 _TRUSTED_SOURCES = {"crossref", "ieeexplore", "openalex"}
 
-def _venue_similarity(a: str, b: str) -> float:
-    if not a or not b: return 0.0
-    return token_similarity(a, b)
+# Source weights (IEEE Xplore highest among sources we query)
+_SOURCE_WEIGHT = {"ieeexplore": 0.16, "crossref": 0.12, "openalex": 0.08, "semanticscholar": 0.06, "pubmed": 0.05, "arxiv": 0.03}
+
+class _Features(NamedTuple):
+    """Everything scoring compares, normalized once per record."""
+    doi: str
+    title: str            # norm_for_compare form
+    last_names: List[str]
+    year: str             # as written (score)
+    year4: str            # normalized, first four chars (trust check)
+    venue: str            # norm_for_compare form
+    has_venue: bool
+    source: str
+
+def _features(rec: Dict[str, Any]) -> _Features:
+    venue = normalize_text(rec.get("journal_name") or rec.get("conference_name") or "")
+    return _Features(
+        doi=normalize_text(rec.get("doi") or "").lower().replace("doi:", ""),
+        title=norm_for_compare(rec.get("title") or ""),
+        last_names=[a.split()[-1].lower() for a in authors_to_list(rec.get("authors")) if a.split()],
+        year=str(rec.get("year") or "").strip(),
+        year4=normalize_text(rec.get("year") or "")[:4],
+        venue=norm_for_compare(venue),
+        has_venue=bool(venue),
+        source=rec.get("source") or "",
+    )
+
+def _first_match(row: Any, heads: List[int], threshold: float) -> int:
+    """Index into heads of the first head whose similarity in row reaches threshold, else -1."""
+    if np is not None and isinstance(row, np.ndarray):
+        hit = np.flatnonzero(row[heads] >= threshold)
+        return int(hit[0]) if hit.size else -1
+    return next((k for k, h in enumerate(heads) if row[h] >= threshold), -1)
+
+class CandidateScorer:
+    """
+    Scores one reference's candidates. Each record is normalized once; title similarities
+    (candidate x candidate, plus the extracted title against each) come from one matrix,
+    so clustering, scoring and the trust check don't re-normalize strings per comparison.
+    """
 
-def score_candidate(extracted: Dict[str, Any], cand: Dict[str, Any]) -> float:
-    score = 0.0
-
-    ex_doi = normalize_text(extracted.get("doi") or "").lower().replace("doi:","")
-    ca_doi = normalize_text(cand.get("doi") or "").lower().replace("doi:","")
-    if ex_doi and ca_doi and ex_doi == ca_doi:
-        score += 1.0
-
-    # Titles carry most of the signal
-    t_sim = token_similarity(extracted.get("title") or "", cand.get("title") or "")
-    score += 0.9 * t_sim
-
-    ex_auth = [a.split()[-1].lower() for a in authors_to_list(extracted.get("authors")) if a.split()]
-    ca_auth = [a.split()[-1].lower() for a in authors_to_list(cand.get("authors")) if a.split()]
-    if ex_auth and ca_auth:
-        inter = len(set(ex_auth) & set(ca_auth))
-        score += 0.25 * (inter / max(1, len(set(ex_auth) | set(ca_auth))))
-    else:
-        score -= 0.05
-
-    ey = str(extracted.get("year") or "").strip()
-    cy = str(cand.get("year") or "").strip()
-    if ey and cy:
-        if ey == cy:
-            score += 0.12
+    def __init__(self, extracted: Dict[str, Any], candidates: Sequence[Any]):
+        self.candidates = list(candidates)
+        self._ex = _features(extracted)
+        self._feats = [_features(c) for c in self.candidates]
+        titles = [f.title for f in self._feats]
+        # Rows 0..n-1: candidates; row n: the extracted title
+        self.title_sim = similarity_matrix(titles + [self._ex.title], titles)
+        self._ex_title_sim = [float(v) for v in self.title_sim[len(titles)]]
+        self._venue_sim = [float(v) for v in similarity_matrix([self._ex.venue], [f.venue for f in self._feats])[0]]
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    def title_similarity(self, i: int) -> float:
+        """Title similarity of candidate i to the extracted reference."""
+        return self._ex_title_sim[i]
+
+    def clusters(self, threshold: float) -> List[List[Any]]:
+        """Greedy title clusters: each candidate joins the first cluster whose head is similar enough."""
+        heads: List[int] = []
+        members: List[List[Any]] = []
+        for i, c in enumerate(self.candidates):
+            k = _first_match(self.title_sim[i], heads, threshold) if heads else -1
+            if k >= 0:
+                members[k].append(c)
+            else:
+                heads.append(i)
+                members.append([c])
+        return members
+
+    def score(self, i: int) -> float:
+        ex, ca = self._ex, self._feats[i]
+        score = 0.0
+
+        if ex.doi and ca.doi and ex.doi == ca.doi:
+            score += 1.0
+
+        # Titles carry most of the signal
+        score += 0.9 * self.title_similarity(i)
+
+        if ex.last_names and ca.last_names:
+            ex_auth, ca_auth = set(ex.last_names), set(ca.last_names)
+            score += 0.25 * (len(ex_auth & ca_auth) / max(1, len(ex_auth | ca_auth)))
         else:
-            try:
-                gap = abs(int(ey[:4]) - int(cy[:4]))
-                if gap == 1: score -= 0.03
-                elif gap == 2: score -= 0.06
-                elif gap >= 3: score -= 0.12
-            except Exception:
-                score -= 0.02
-
-    # NEW: venue similarity bonus (kept small but helps tie-break)
-    ex_venue = (normalize_text(extracted.get("journal_name") or extracted.get("conference_name") or ""))
-    ca_venue = (normalize_text(cand.get("journal_name") or cand.get("conference_name") or ""))
-    if ex_venue and ca_venue:
-        score += 0.08 * _venue_similarity(ex_venue, ca_venue)
-
-    # Source weights (IEEE Xplore highest among sources we query)
-    src_weight = {"ieeexplore": 0.16, "crossref": 0.12, "openalex": 0.08, "semanticscholar": 0.06, "pubmed": 0.05, "arxiv": 0.03}
-    score += src_weight.get(cand.get("source",""), 0.0)
-    return score
+            score -= 0.05
+
+        if ex.year and ca.year:
+            if ex.year == ca.year:
+                score += 0.12
+            else:
+                try:
+                    gap = abs(int(ex.year[:4]) - int(ca.year[:4]))
+                    if gap == 1: score -= 0.03
+                    elif gap == 2: score -= 0.06
+                    elif gap >= 3: score -= 0.12
+                except Exception:
+                    score -= 0.02
+
+        # NEW: venue similarity bonus (kept small but helps tie-break)
+        score += 0.08 * self._venue_sim[i]
+
+        score += _SOURCE_WEIGHT.get(ca.source, 0.0)
+        return score
+
+    def is_trustworthy(self, i: int) -> bool:
+        """
+        Strict guard:
+          - DOI exact match => trust.
+          - Else require very high title similarity (>= 0.93)
+            AND (author overlap OR |year_gap| <= 1)
+            AND (if both venues present) venue similarity >= 0.80.
+          - Only trust if candidate source is in TRUSTED_SOURCES.
+        """
+        ex, ca = self._ex, self._feats[i]
+        if ca.source.lower() not in _TRUSTED_SOURCES:
+            return False
+
+        if ex.doi and ca.doi and ex.doi == ca.doi:
+            return True
+
+        if self.title_similarity(i) < 0.93:
+            return False
+
+        author_ok = bool(set(ex.last_names) & set(ca.last_names))
+
+        year_ok = False
+        if ex.year4.isdigit() and ca.year4.isdigit():
+            year_ok = abs(int(ex.year4) - int(ca.year4)) <= 1
+
+        venue_ok = True
+        if ex.has_venue and ca.has_venue:
+            venue_ok = self._venue_sim[i] >= 0.80
+
+        return (author_ok or year_ok) and venue_ok
+
+def score_candidate(extracted: Dict[str, Any], cand: Dict[str, Any]) -> float:
+    return CandidateScorer(extracted, [cand]).score(0)
 
 def is_trustworthy_match(ex, cand) -> bool:
-    """
-    Strict guard:
-      - DOI exact match => trust.
-      - Else require very high title similarity (>= 0.93)
-        AND (author overlap OR |year_gap| <= 1)
-        AND (if both venues present) venue similarity >= 0.80.
-      - Only trust if candidate source is in TRUSTED_SOURCES.
-    """
-    src = (cand.get("source") or "").lower()
-    if src not in _TRUSTED_SOURCES:
-        return False
-
-    ex_doi = normalize_text(ex.get("doi")).lower().replace("doi:","")
-    ca_doi = normalize_text(cand.get("doi")).lower().replace("doi:","")
-    if ex_doi and ca_doi and ex_doi == ca_doi:
-        return True
-
-    t_sim = token_similarity(ex.get("title",""), cand.get("title",""))
-    if t_sim < 0.93:
-        return False
-
-    ex_last = {a.split()[-1].lower() for a in authors_to_list(ex.get("authors")) if a.split()}
-    ca_last = {a.split()[-1].lower() for a in authors_to_list(cand.get("authors")) if a.split()}
-    author_ok = bool(ex_last and ca_last and (ex_last & ca_last))
-
-    ey = normalize_text(ex.get("year") or "")[:4]
-    cy = normalize_text(cand.get("year") or "")[:4]
-    year_ok = False
-    if ey.isdigit() and cy.isdigit():
-        try:
-            year_ok = abs(int(ey) - int(cy)) <= 1
-        except Exception:
-            year_ok = False
-
-    venue_ok = True
-    ex_venue = normalize_text(ex.get("journal_name") or ex.get("conference_name") or "")
-    ca_venue = normalize_text(cand.get("journal_name") or cand.get("conference_name") or "")
-    if ex_venue and ca_venue:
-        venue_ok = _venue_similarity(ex_venue, ca_venue) >= 0.80
-
-    return (author_ok or year_ok) and venue_ok
+    return CandidateScorer(ex, [cand]).is_trustworthy(0)
@@ -1,4 +1,5 @@
-import re, json, hashlib
+import re, json, hashlib, unicodedata
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 
@@ -19,6 +20,13 @@ except Exception:
     fuzz = None
     RF_AVAILABLE = False
 
+try:
+    import numpy as np
+    from rapidfuzz.process import cdist
+except Exception:
+    np = None
+    cdist = None
+
 _THIS_YEAR = datetime.utcnow().year
 
 def safe_json_load(s: Any) -> Optional[Dict[str, Any]]:
@@ -52,16 +60,38 @@ def safe_json_load(s: Any) -> Optional[Dict[str, Any]]:
                     except Exception: start=None
     return None
 
+# The string helpers below run on the same titles/authors/venues many times per reference
+# (lookup, scoring, consensus, verification, report); their str -> str work is memoized.
+# Long texts (abstracts, whole reference lists) are rarely repeated and bypass the memo.
+_MEMO_SIZE = 16384
+_MEMO_MAX_LEN = 512
+_WS_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_AUTHOR_SEP_RE = re.compile(r",\s*|\s+&\s+| and ")
+_INITIAL_RE = re.compile(r"[A-Za-z]\.")
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def _normalize_str(s: str) -> str:
+    return _WS_RE.sub(" ", s.strip())
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def _compare_str(s: str) -> str:
+    s = _PUNCT_RE.sub(" ", s.strip().lower())
+    return _WS_RE.sub(" ", s).strip()
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def _split_authors(s: str) -> Tuple[str, ...]:
+    return tuple(n for n in (_normalize_str(p) for p in _AUTHOR_SEP_RE.split(s)) if n)
+
 def normalize_text(x: Any) -> str:
     if x is None: return ""
-    s = re.sub(r"\s+"," ", str(x).strip())
-    return s
+    s = x if isinstance(x, str) else str(x)
+    return _normalize_str(s) if len(s) <= _MEMO_MAX_LEN else _normalize_str.__wrapped__(s)
 
 def norm_for_compare(x: Any) -> str:
-    s = normalize_text(x).lower()
-    s = re.sub(r"[^\w\s]"," ", s)
-    s = re.sub(r"\s+"," ", s).strip()
-    return s
+    if x is None: return ""
+    s = x if isinstance(x, str) else str(x)
+    return _compare_str(s) if len(s) <= _MEMO_MAX_LEN else _compare_str.__wrapped__(s)
 
 def token_similarity(a: str, b: str) -> float:
     a = norm_for_compare(a); b = norm_for_compare(b)
@@ -72,19 +102,33 @@ def token_similarity(a: str, b: str) -> float:
     union = sa | sb
     return len(inter) / max(1, len(union))
 
+def similarity_matrix(rows: List[str], cols: List[str]) -> Any:
+    """
+    token_similarity for every (row, col) pair of already norm_for_compare'd strings:
+    a NumPy array from rapidfuzz's cdist, or nested lists without NumPy. Index as m[i][j].
+    """
+    if RF_AVAILABLE and cdist is not None:
+        # token_sort_ratio == ratio of the token-sorted strings; sort each string once, not per pair
+        srt = lambda xs: [" ".join(sorted(x.split())) for x in xs]
+        workers = -1 if len(rows) * len(cols) >= 10_000 else 1
+        m = cdist(srt(rows), srt(cols), scorer=fuzz.ratio, dtype=np.float64, workers=workers) / 100.0
+        m[[not r for r in rows], :] = 0.0   # empty strings never match (rapidfuzz scores ""/"" as 100)
+        m[:, [not c for c in cols]] = 0.0
+        return m
+    return [[token_similarity(r, c) for c in cols] for r in rows]
+
 def authors_to_list(a: Any) -> List[str]:
     if not a: return []
-    if isinstance(a, list): return [normalize_text(x) for x in a if normalize_text(x)]
-    parts = re.split(r",\s*|\s+&\s+| and ", str(a))
-    return [normalize_text(p) for p in parts if normalize_text(p)]
+    if isinstance(a, list): return [n for n in (normalize_text(x) for x in a) if n]
+    return list(_split_authors(str(a)))   # a fresh list: callers may edit it
 
 def _initials(given: str) -> List[str]:
-    parts = re.split(r"\s+", given.strip()); out=[]
+    parts = _WS_RE.split(given.strip()); out=[]
     for p in parts:
         if not p: continue
         hy = p.split("-")
         if len(hy)>1: out.append("-".join([h[0].upper()+"." for h in hy if h]))
-        elif re.match(r"^[A-Za-z]\.$", p): out.append(p.upper())
+        elif _INITIAL_RE.fullmatch(p): out.append(p.upper())
         elif p.lower().rstrip(".") in SUFFIXES: out.append(p.capitalize().rstrip(".")+".")
         else: out.append(p[0].upper()+".")
     return out
@@ -176,6 +220,24 @@ def fingerprint_state(ex: Dict[str, Any], best: Dict[str, Any], sugg: Dict[str,
     payload = json.dumps({"ex": ex, "best": best, "sugg": sugg}, sort_keys=True, ensure_ascii=False)
     return hashlib.sha256(payload.encode("utf-8","ignore")).hexdigest()
 
+_REF_MARKER_RE = re.compile(r"^\s*(?:\[\d+\]|\d+\.)\s*")
+_NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+def reference_fingerprint(reference: str, salt: str = "") -> str:
+    """
+    Canonical key for a raw reference string: list markers, case, quotes,
+    dashes, punctuation and whitespace differences all map to the same key.
+    `salt` lets callers bind the key to a pipeline/config version.
+    """
+    s = unicodedata.normalize("NFKC", reference or "")
+    s = _REF_MARKER_RE.sub("", s).casefold()
+    s = _NON_WORD_RE.sub(" ", s).strip()
+    return hashlib.sha256(f"{salt}\x00{s}".encode("utf-8", "ignore")).hexdigest()
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt size (~4 characters per token); good enough for savings accounting."""
+    return (len(text or "") + 3) // 4
+
 def safe_str(v: Any) -> str:
     try:
         if v is None: return ""
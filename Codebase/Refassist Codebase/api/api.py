@@ -1,20 +1,31 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
+from typing import List, Optional
 import asyncio
-from refassist.graphs import run_one
-from refassist.config import PipelineConfig
+from refassist.graphs import run_one, normalize_outputs
+from refassist.config import PipelineConfig, get_profile
 
 app = FastAPI(title="RefAssist API", version="0.1.0")
 
 class ResolveRequest(BaseModel):
     reference: str
+    refresh: bool = False  # bypass the result cache (forced re-verification)
+    outputs: Optional[List[str]] = None  # subset of formatted/csl_json/bibtex/report (default: all)
+    profile: Optional[str] = None        # fast | balanced | thorough (default: IEEE_REF_PROFILE)
+    deadline_s: Optional[float] = None   # per-reference time budget (default: IEEE_REF_DEADLINE)
 
 @app.post("/v1/resolve")
 async def resolve(req: ResolveRequest):
     if not req.reference.strip():
         raise HTTPException(status_code=400, detail="reference is required")
     try:
-        out = await run_one(req.reference, PipelineConfig())
+        outputs = normalize_outputs(req.outputs)
+        profile = get_profile(req.profile or PipelineConfig().profile).name
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        out = await run_one(req.reference, PipelineConfig(), refresh=req.refresh, outputs=outputs, profile=profile,
+                            deadline_s=req.deadline_s)
         return {
             "type": out.get("type"),
             "formatted": out.get("formatted"),
@@ -22,6 +33,10 @@ async def resolve(req: ResolveRequest):
             "verification": out.get("verification"),
             "csl_json": out.get("csl_json"),
             "bibtex": out.get("bibtex"),
+            "cached": bool(out.get("cached")),
+            "outputs": sorted(outputs),
+            "profile": profile,
+            "skipped": out.get("skipped") or [],
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
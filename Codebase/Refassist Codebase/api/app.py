@@ -1,96 +1,51 @@
 from fastapi import FastAPI, Request, UploadFile, File, Form, HTTPException
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from refassist.graphs import run_one
-from refassist.config import PipelineConfig
-from docx import Document as DocxDocument
-from typing import Optional, List, Tuple
+from refassist.graphs import run_one, normalize_outputs
+from refassist.config import PipelineConfig, get_profile
+from refassist.metrics import snapshot as metrics_snapshot
+from refassist.nodes.build_report import write_report_docx
+from refassist.tools.bibtex import split_bibliography
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, List
+from .batch import cluster_batch, iter_entries, iter_entries_from, process_all
+from .results import ResultStore
+from .jobs import JobStore, JobRunner, JOB_WORKERS
+from .artifacts import ARTIFACTS, build_artifact, build_zip, formatted_line
+from .uploads import Spooled, cleanup, iter_extracted, read_all, spool
+from .workers import cpu_pool
 import re
+import json
 import asyncio
-import io
-import zipfile
 import logging
 
-# Optional PDF support (install: pip install pdfminer.six)
-try:
-    from pdfminer.high_level import extract_text as pdf_extract_text
-    PDF_AVAILABLE = True
-except Exception:
-    PDF_AVAILABLE = False
-
 # ---------- Setup ----------
-app = FastAPI(title="RefAssist API", version="0.7.0")
+job_store = JobStore()
+job_runner = JobRunner(job_store, workers=JOB_WORKERS)
+result_store = ResultStore()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # In-process job workers (set REFASSIST_JOB_WORKERS=0 when running `python -m api.jobs` separately)
+    cpu_pool.start()
+    if JOB_WORKERS > 0:
+        await job_runner.start()
+    try:
+        yield
+    finally:
+        if JOB_WORKERS > 0:
+            await job_runner.stop()
+        cpu_pool.shutdown()
+
+app = FastAPI(title="RefAssist API", version="0.7.0", lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 app.mount("/new_ui", StaticFiles(directory="new_UI"), name="new_ui")
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("refassist")
 
-# ---------- Text extraction from uploads ----------
-async def _read_all(files: List[UploadFile]) -> str:
-    """
-    Server-side extraction:
-      - .txt/.bbl/.tex : UTF-8 text
-      - .docx          : python-docx paragraphs
-      - .pdf           : pdfminer.six (if available)
-      - .doc           : not supported (suggest converting to .docx)
-    Returns the concatenated text from all files.
-    """
-    chunks: List[str] = []
-
-    for up in files:
-        name = (up.filename or "").lower()
-        ext = "." + name.split(".")[-1] if "." in name else ""
-        raw = await up.read()
-
-        if ext in (".txt", ".bbl", ".tex"):
-            try:
-                chunks.append(raw.decode("utf-8", "ignore"))
-            except Exception:
-                chunks.append(raw.decode("latin-1", "ignore"))
-
-        elif ext == ".docx":
-            try:
-                from io import BytesIO
-                doc = DocxDocument(BytesIO(raw))
-                paras = [p.text for p in doc.paragraphs if p.text and p.text.strip()]
-                chunks.append("\n".join(paras))
-            except Exception as e:
-                logger.exception("Failed to read DOCX: %s", name)
-                raise HTTPException(status_code=400, detail=f"Failed to read DOCX {name}: {e}")
-
-        elif ext == ".pdf":
-            if not PDF_AVAILABLE:
-                raise HTTPException(
-                    status_code=400,
-                    detail="PDF support is not available on the server. Install pdfminer.six."
-                )
-            try:
-                from io import BytesIO
-                text = pdf_extract_text(BytesIO(raw)) or ""
-                chunks.append(text)
-            except Exception as e:
-                logger.exception("Failed to read PDF: %s", name)
-                raise HTTPException(status_code=400, detail=f"Failed to read PDF {name}: {e}")
-
-        elif ext == ".doc":
-            # Old .doc is binary and not reliably parsed in pure Python.
-            # Ask users to convert to .docx (Word/Google Docs) before uploading.
-            raise HTTPException(
-                status_code=400,
-                detail=f"'{name}' is .doc (legacy). Please convert to .docx and re-upload."
-            )
-
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported file type for '{name}'. Allowed: .pdf, .docx, .tex, .bbl, .txt"
-            )
-
-    # Join with blank lines to help the splitter
-    return "\n\n".join(c.strip() for c in chunks if c and c.strip())
-
 
 # ---------- Smart reference splitting ----------
 _MARKER_PATTERNS = [
@@ -117,6 +72,8 @@ def _strip_full_marker(line: str) -> str:
 def split_references(text: str) -> List[str]:
     """
     Smarter splitter:
+      0) LaTeX bibliographies (BibTeX, biblatex .bbl, thebibliography): one reference per
+         entry; BibTeX/biblatex entries are later read natively by the pipeline.
       1) If markers like [1], '1.', '-' exist — use them (existing behavior).
       2) Else: split on blank lines (paragraphs).
       3) Else: heuristic segmentation using cues (title quotes/DOI/url/years/authors).
@@ -124,6 +81,9 @@ def split_references(text: str) -> List[str]:
     text = (text or "").strip()
     if not text:
         return []
+    entries = split_bibliography(text)
+    if entries is not None:
+        return entries
 
     # Normalize
     text = re.sub(r"\r\n?", "\n", text)
@@ -206,41 +166,21 @@ def split_references(text: str) -> List[str]:
     return [r for r in refs if r] or [blob.strip()]
 
 
-# ---------- Formatting batch processing ----------
-async def process_references(refs: List[str]) -> Tuple[List[str], DocxDocument]:
-    formatted_refs: List[str] = []
-    report_doc = DocxDocument()
-    report_doc.add_heading("Reference Processing Report", 0)
-
-    async def process_single(idx: int, ref: str) -> Tuple[str, dict]:
-        try:
-            out = await run_one(ref.strip(), PipelineConfig())
-            formatted = out.get("formatted", ref)
-            report_entry = {
-                "idx": idx,
-                "original": ref,
-                "formatted": formatted,
-                "report": out.get("report", "No changes"),
-            }
-            return formatted, report_entry
-        except Exception as e:
-            logger.exception("Error processing reference %s", idx)
-            return ref + " [ERROR]", {
-                "idx": idx, "original": ref, "formatted": None, "report": f"Error: {str(e)}"
-            }
-
-    tasks = [process_single(i + 1, ref) for i, ref in enumerate(refs)]
-    results = await asyncio.gather(*tasks, return_exceptions=False)
-
-    for formatted, entry in results:
-        formatted_refs.append(formatted)
-        report_doc.add_heading(f"Reference {entry['idx']}", level=2)
-        report_doc.add_paragraph(f"Original: {entry['original']}")
-        if entry['formatted']:
-            report_doc.add_paragraph(f"Processed: {entry['formatted']}")
-        report_doc.add_paragraph(entry['report'])
-
-    return formatted_refs, report_doc
+def _check_options(outputs: Optional[str], profile: Optional[str]) -> None:
+    try:
+        normalize_outputs(outputs)
+        if profile:
+            get_profile(profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# ---------- Streaming batch processing ----------
+def _encode_event(event: str, payload: dict, sse: bool) -> str:
+    data = json.dumps(payload, ensure_ascii=False)
+    if sse:
+        return f"event: {event}\ndata: {data}\n\n"
+    return json.dumps({"event": event, **payload}, ensure_ascii=False) + "\n"
 
 
 # ---------- Routes ----------
@@ -252,13 +192,23 @@ async def get_new_home(request: Request):
 # Single-reference resolver
 class ResolveRequest(BaseModel):
     reference: str
+    refresh: bool = False  # bypass the result cache (forced re-verification)
+    outputs: Optional[List[str]] = None  # subset of formatted/csl_json/bibtex/report (default: all)
+    profile: Optional[str] = None        # fast | balanced | thorough (default: IEEE_REF_PROFILE)
+    deadline_s: Optional[float] = None   # per-reference time budget (default: IEEE_REF_DEADLINE)
 
 @app.post("/v1/resolve")
 async def resolve(req: ResolveRequest):
     if not req.reference.strip():
         raise HTTPException(status_code=400, detail="reference is required")
     try:
-        out = await run_one(req.reference, PipelineConfig())
+        outputs = normalize_outputs(req.outputs)
+        profile = get_profile(req.profile or PipelineConfig().profile).name
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        out = await run_one(req.reference, PipelineConfig(), refresh=req.refresh, outputs=outputs, profile=profile,
+                            deadline_s=req.deadline_s)
         return {
             "type": out.get("type"),
             "formatted": out.get("formatted"),
@@ -266,11 +216,38 @@ async def resolve(req: ResolveRequest):
             "verification": out.get("verification"),
             "csl_json": out.get("csl_json"),
             "bibtex": out.get("bibtex"),
+            "cached": bool(out.get("cached")),
+            "outputs": sorted(outputs),
+            "profile": profile,
+            "skipped": out.get("skipped") or [],
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Per-reference Word report, rendered only on request (off the event loop)
+@app.post("/v1/report.docx")
+async def resolve_report_docx(req: ResolveRequest):
+    if not req.reference.strip():
+        raise HTTPException(status_code=400, detail="reference is required")
+    _check_options(None, req.profile)
+    try:
+        out = await run_one(req.reference, PipelineConfig(), refresh=req.refresh, profile=req.profile)
+        report_path = await cpu_pool.run(write_report_docx, out.get("report_sections") or [])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return FileResponse(
+        report_path,
+        media_type=ARTIFACTS["docx"][1],
+        filename="reference_report.docx",
+    )
+
+
+@app.get("/v1/metrics")
+async def metrics():
+    return {**metrics_snapshot(), "cpu_pool": cpu_pool.stats()}
+
+
 # NEW: Server-side text extraction for uploaded files (multiple)
 @app.post("/api/extract")
 async def extract_files_endpoint(files: List[UploadFile] = File(...)):
@@ -279,7 +256,7 @@ async def extract_files_endpoint(files: List[UploadFile] = File(...)):
     """
     if not files:
         raise HTTPException(status_code=400, detail="No files uploaded")
-    text = await _read_all(files)
+    text = await read_all(files)
     if not text.strip():
         raise HTTPException(status_code=400, detail="No text could be extracted")
     return {"text": text}
@@ -289,13 +266,16 @@ async def extract_files_endpoint(files: List[UploadFile] = File(...)):
 @app.post("/api/process")
 async def process_references_api(
     references: Optional[str] = Form(None),
-    files: Optional[List[UploadFile]] = File(None)
+    files: Optional[List[UploadFile]] = File(None),
+    refresh: bool = Form(False),
+    outputs: Optional[str] = Form(None),
+    profile: Optional[str] = Form(None)
 ):
     refs_text: str = (references or "").strip()
 
     # If files were sent directly to this endpoint, extract them here too
     if (not refs_text) and files:
-        refs_text = (await _read_all(files)).strip()
+        refs_text = (await read_all(files)).strip()
 
     if not refs_text:
         raise HTTPException(status_code=400, detail="No references provided")
@@ -303,32 +283,12 @@ async def process_references_api(
     refs = split_references(refs_text)
     if not refs:
         raise HTTPException(status_code=400, detail="No references detected in input")
+    _check_options(outputs, profile)
 
     # Process
-    formatted_refs: List[str] = []
-    detailed: List[dict] = []
-
-    async def process_single_detailed(idx: int, ref: str) -> Tuple[str, dict]:
-        try:
-            out = await run_one(ref.strip(), PipelineConfig())
-            formatted = out.get("formatted", ref)
-            return formatted, {
-                "idx": idx, "original": ref, "formatted": formatted,
-                "report": out.get("report", "No changes"), "status": "success"
-            }
-        except Exception as e:
-            err_fmt = ref + " [ERROR]"
-            return err_fmt, {
-                "idx": idx, "original": ref, "formatted": err_fmt,
-                "report": f"Error: {str(e)}", "status": "error"
-            }
-
-    tasks = [process_single_detailed(i + 1, ref) for i, ref in enumerate(refs)]
-    results = await asyncio.gather(*tasks, return_exceptions=False)
-
-    for formatted, entry in results:
-        formatted_refs.append(formatted)
-        detailed.append(entry)
+    detailed: List[dict] = await process_all(refs, refresh=refresh, outputs=outputs, profile=profile,
+                                             priority="interactive")
+    formatted_refs: List[str] = [formatted_line(entry) for entry in detailed]
 
     formatted_output = "\n".join(f"[{i+1}] {ref}" for i, ref in enumerate(formatted_refs))
 
@@ -346,7 +306,7 @@ async def process_references_api(
     for entry in detailed[:10]:
         preview_lines.append(f"Reference {entry['idx']}:")
         preview_lines.append(f"Original: {entry['original']}")
-        if entry['status'] == 'success':
+        if entry['status'] == 'success' and entry['formatted']:
             preview_lines.append(f"Formatted: {entry['formatted']}")
         preview_lines.append(f"Notes: {entry['report']}")
         preview_lines.append("")
@@ -354,6 +314,8 @@ async def process_references_api(
 
     return {
         "success": True,
+        # Pass back to /api/download-report to build the ZIP without re-running the pipeline
+        "result_id": result_store.put(detailed),
         "total_references": total_refs,
         "formatted_output": formatted_output,
         "preview": preview_text,
@@ -361,15 +323,121 @@ async def process_references_api(
     }
 
 
+# Streaming variant of /api/process: one event per reference as soon as it finishes
+@app.post("/api/process/stream")
+async def process_references_stream(
+    request: Request,
+    references: Optional[str] = Form(None),
+    files: Optional[List[UploadFile]] = File(None),
+    refresh: bool = Form(False),
+    outputs: Optional[str] = Form(None),
+    profile: Optional[str] = Form(None),
+    keep_results: bool = Form(False)
+):
+    """
+    Emits NDJSON lines (default) or Server-Sent Events when the client sends
+    `Accept: text/event-stream`:
+      - start      : {"total": N} for pasted text; {"total": null, "files": K} for uploads
+      - file       : {"file", "first", "references", "total"} when an uploaded file has been
+                     read and its references numbered first.. (files complete in any order)
+      - file_error : {"file", "error"} when a file cannot be read; the others carry on
+      - reference  : one per reference, in completion order (carries "idx")
+      - summary    : {"total", "success", "errors"}, plus "result_id" with keep_results
+    Entries are not held by the stream; with keep_results each one is added to the result
+    store as it is emitted, so /api/download-report can reuse them via result_id.
+    Uploaded files are spooled and size-checked before the stream starts; their references
+    enter the pipeline as soon as each file is extracted.
+    """
+    refs_text: str = (references or "").strip()
+    if not refs_text and not files:
+        raise HTTPException(status_code=400, detail="No references provided")
+    _check_options(outputs, profile)
+
+    refs: List[str] = []
+    spooled: List[Spooled] = []
+    if refs_text:
+        refs = split_references(refs_text)
+        if not refs:
+            raise HTTPException(status_code=400, detail="No references detected in input")
+    else:
+        spooled = await spool(files)
+
+    sse = "text/event-stream" in (request.headers.get("accept") or "")
+    file_events: List[str] = []
+
+    async def file_batches() -> AsyncIterator[List[str]]:
+        total = 0
+        async for sp, text, error in iter_extracted(spooled, return_errors=True):
+            if error is not None:
+                file_events.append(_encode_event("file_error", {"file": sp.name, "error": error.detail}, sse))
+                continue
+            batch = split_references(text.strip())
+            file_events.append(_encode_event("file", {
+                "file": sp.name, "first": total + 1, "references": len(batch), "total": total + len(batch),
+            }, sse))
+            total += len(batch)
+            if batch:
+                yield batch
+
+    async def events() -> AsyncIterator[str]:
+        total = success_count = 0
+        result_id = result_store.open() if keep_results else None
+        if spooled:
+            yield _encode_event("start", {"total": None, "files": len(spooled)}, sse)
+            source = iter_entries_from(file_batches(), refresh=refresh, outputs=outputs, profile=profile,
+                                       priority="interactive")
+        else:
+            yield _encode_event("start", {"total": len(refs)}, sse)
+            source = iter_entries(refs, refresh=refresh, outputs=outputs, profile=profile,
+                                  priority="interactive")
+        async for entry in source:
+            while file_events:
+                yield file_events.pop(0)
+            total += 1
+            if entry["status"] == "success":
+                success_count += 1
+            if result_id:
+                result_store.append(result_id, entry)
+            yield _encode_event("reference", entry, sse)
+        while file_events:
+            yield file_events.pop(0)
+        summary = {"total": total, "success": success_count, "errors": total - success_count}
+        if result_id:
+            summary["result_id"] = result_id
+        yield _encode_event("summary", summary, sse)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Temp files left behind if the client disconnects before the stream starts
+        background=BackgroundTask(cleanup, spooled),
+    )
+
+
 # Full report ZIP
 @app.post("/api/download-report")
 async def download_full_report(
     references: Optional[str] = Form(None),
-    files: Optional[List[UploadFile]] = File(None)
+    files: Optional[List[UploadFile]] = File(None),
+    result_id: Optional[str] = Form(None)
 ):
+    # Reuse results from /api/process when the client passes its handle
+    if result_id:
+        entries = result_store.get(result_id)
+        if entries is not None:
+            data = await cpu_pool.run(build_zip, entries)
+            return Response(
+                content=data,
+                media_type="application/zip",
+                headers={"Content-Disposition": 'attachment; filename="refassist_report.zip"'}
+            )
+        if not (references or "").strip() and not files:
+            raise HTTPException(status_code=410, detail="Result expired; please process the references again")
+
     refs_text: str = (references or "").strip()
     if (not refs_text) and files:
-        refs_text = (await _read_all(files)).strip()
+        refs_text = (await read_all(files)).strip()
 
     if not refs_text:
         raise HTTPException(status_code=400, detail="No references provided")
@@ -378,24 +446,82 @@ async def download_full_report(
     if not refs:
         raise HTTPException(status_code=400, detail="No references detected in input")
 
-    formatted_refs, report_doc = await process_references(refs)
+    entries = await process_all(refs, priority="interactive")
+    data = await cpu_pool.run(build_zip, entries)
+    return Response(
+        content=data,
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="refassist_report.zip"'}
+    )
+
 
-    # Build ZIP
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-        txt_content = "\n".join(f"[{i+1}] {ref}" for i, ref in enumerate(formatted_refs))
-        zipf.writestr("formatted_references.txt", txt_content)
+# ---------- Background jobs ----------
+def _job_view(job: dict) -> dict:
+    view = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "total": job["total"],
+        "done": job["done"],
+        "errors": job["errors"],
+        "progress": round(job["done"] / job["total"], 4) if job["total"] else 1.0,
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+    if job["status"] == "done":
+        view["artifacts"] = {k: f"/api/jobs/{job['id']}/artifacts/{k}" for k in ARTIFACTS}
+    return view
 
-        docx_buffer = io.BytesIO()
-        report_doc.save(docx_buffer)
-        docx_buffer.seek(0)
-        zipf.writestr("report.docx", docx_buffer.read())
 
-    zip_buffer.seek(0)
-    return StreamingResponse(
-        zip_buffer,
-        media_type="application/zip",
-        headers={"Content-Disposition": 'attachment; filename="refassist_report.zip"'}
+@app.post("/api/jobs", status_code=202)
+async def create_job(
+    references: Optional[str] = Form(None),
+    files: Optional[List[UploadFile]] = File(None)
+):
+    refs_text: str = (references or "").strip()
+    if (not refs_text) and files:
+        refs_text = (await read_all(files)).strip()
+
+    if not refs_text:
+        raise HTTPException(status_code=400, detail="No references provided")
+
+    refs = split_references(refs_text)
+    if not refs:
+        raise HTTPException(status_code=400, detail="No references detected in input")
+
+    clusters = await cluster_batch(refs)
+    job = await asyncio.to_thread(job_store.create, refs, clusters)
+    job_runner.notify()
+    return _job_view(job)
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, include_results: bool = False):
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    view = _job_view(job)
+    if include_results:
+        view["results"] = await asyncio.to_thread(job_store.results, job_id)
+    return view
+
+
+@app.get("/api/jobs/{job_id}/artifacts/{kind}")
+async def get_job_artifact(job_id: str, kind: str):
+    if kind not in ARTIFACTS:
+        raise HTTPException(status_code=404, detail=f"Unknown artifact '{kind}'. Allowed: {', '.join(ARTIFACTS)}")
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']} ({job['done']}/{job['total']})")
+
+    entries = await asyncio.to_thread(job_store.results, job_id)
+    data = await cpu_pool.run(build_artifact, kind, entries)
+    filename, media_type = ARTIFACTS[kind]
+    return Response(
+        content=data,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
 
 
@@ -408,7 +534,7 @@ async def upload_references_legacy(
     refs_text: Optional[str] = (references or "").strip()
     if (not refs_text) and file:
         files = [file]
-        refs_text = (await _read_all(files)).strip()
+        refs_text = (await read_all(files)).strip()
 
     if not refs_text:
         raise HTTPException(status_code=400, detail="No references provided")
@@ -417,21 +543,10 @@ async def upload_references_legacy(
     if not refs:
         raise HTTPException(status_code=400, detail="No references detected in input")
 
-    formatted_refs, report_doc = await process_references(refs)
-
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-        txt_content = "\n".join(f"[{i+1}] {ref}" for i, ref in enumerate(formatted_refs))
-        zipf.writestr("formatted_references.txt", txt_content)
-
-        docx_buffer = io.BytesIO()
-        report_doc.save(docx_buffer)
-        docx_buffer.seek(0)
-        zipf.writestr("report.docx", docx_buffer.read())
-
-    zip_buffer.seek(0)
-    return StreamingResponse(
-        zip_buffer,
+    entries = await process_all(refs, priority="interactive")
+    data = await cpu_pool.run(build_zip, entries)
+    return Response(
+        content=data,
         media_type="application/zip",
         headers={"Content-Disposition": 'attachment; filename="results.zip"'}
     )
@@ -0,0 +1,76 @@
+import io
+import json
+import zipfile
+from typing import List
+from docx import Document as DocxDocument
+
+# Result artifacts built from per-reference entries (see api.batch.process_entry).
+# All builders are synchronous; async callers should run them via asyncio.to_thread.
+
+ARTIFACTS = {
+    # kind: (filename, media type)
+    "txt": ("formatted_references.txt", "text/plain; charset=utf-8"),
+    "docx": ("report.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    "csl": ("references.csl.json", "application/vnd.citationstyles.csl+json"),
+    "bibtex": ("references.bib", "application/x-bibtex"),
+    "zip": ("refassist_report.zip", "application/zip"),
+}
+
+
+def _sorted(entries: List[dict]) -> List[dict]:
+    return sorted(entries, key=lambda e: e["idx"])
+
+
+def formatted_line(entry: dict) -> str:
+    """The entry's formatted reference, or its original labelled as such when it has none
+    (the "formatted" output was not requested)."""
+    return entry.get("formatted") or f"{entry['original']} [NOT FORMATTED]"
+
+
+def build_txt(entries: List[dict]) -> str:
+    return "\n".join(f"[{i+1}] {formatted_line(e)}" for i, e in enumerate(_sorted(entries)))
+
+
+def build_docx(entries: List[dict]) -> bytes:
+    report_doc = DocxDocument()
+    report_doc.add_heading("Reference Processing Report", 0)
+    for entry in _sorted(entries):
+        report_doc.add_heading(f"Reference {entry['idx']}", level=2)
+        report_doc.add_paragraph(f"Original: {entry['original']}")
+        if entry.get("status") == "success" and entry.get("formatted"):
+            report_doc.add_paragraph(f"Processed: {entry['formatted']}")
+        report_doc.add_paragraph(entry.get("report") or "")
+    buf = io.BytesIO()
+    report_doc.save(buf)
+    return buf.getvalue()
+
+
+def build_csl(entries: List[dict]) -> str:
+    items = []
+    for e in _sorted(entries):
+        if e.get("csl_json"):
+            items.append({"id": f"ref{e['idx']}", **e["csl_json"]})
+    return json.dumps(items, ensure_ascii=False, indent=2)
+
+
+def build_bibtex(entries: List[dict]) -> str:
+    return "\n\n".join(e["bibtex"] for e in _sorted(entries) if e.get("bibtex")) + "\n"
+
+
+def build_zip(entries: List[dict]) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zipf:
+        zipf.writestr(ARTIFACTS["txt"][0], build_txt(entries))
+        zipf.writestr(ARTIFACTS["docx"][0], build_docx(entries))
+        zipf.writestr(ARTIFACTS["csl"][0], build_csl(entries))
+        zipf.writestr(ARTIFACTS["bibtex"][0], build_bibtex(entries))
+    return buf.getvalue()
+
+
+def build_artifact(kind: str, entries: List[dict]) -> bytes:
+    builders = {
+        "txt": build_txt, "docx": build_docx, "csl": build_csl,
+        "bibtex": build_bibtex, "zip": build_zip,
+    }
+    data = builders[kind](entries)
+    return data.encode("utf-8") if isinstance(data, str) else data
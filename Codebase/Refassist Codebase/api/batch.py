@@ -0,0 +1,164 @@
+import os
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterable, AsyncIterator, Deque, Dict, List, Optional
+from refassist.graphs import run_one
+from refassist.config import PipelineConfig
+from refassist.tools.dedupe import cluster_references, RefCluster
+from .workers import cpu_pool
+
+logger = logging.getLogger("refassist")
+
+# Max pipelines in flight for a streaming request; finished ones are emitted and dropped
+STREAM_WINDOW = int(os.getenv("REFASSIST_STREAM_WINDOW", "8"))
+# Near-duplicate references in one batch are processed once (0 disables the pre-pass)
+DEDUP_THRESHOLD = float(os.getenv("REFASSIST_DEDUP_THRESHOLD", "0.93"))
+
+
+async def process_entry(idx: int, ref: str, refresh: bool = False, outputs: Optional[str] = None,
+                        profile: Optional[str] = None, priority: str = "bulk") -> dict:
+    """Run one reference and keep only what clients/artifacts need (not the full pipeline state).
+    `priority` is the LLM scheduler class: background jobs run as bulk, behind the
+    interactive class endpoints use while a client waits on the response."""
+    try:
+        out = await run_one(ref.strip(), PipelineConfig(), refresh=refresh, outputs=outputs, profile=profile,
+                            priority=priority)
+        return {
+            # None when "formatted" was not among the requested outputs (see artifacts.formatted_line)
+            "idx": idx, "original": ref, "formatted": out.get("formatted"),
+            "report": out.get("report", "No changes"), "status": "success",
+            "type": out.get("type"),
+            "csl_json": out.get("csl_json"),
+            "bibtex": out.get("bibtex"),
+        }
+    except Exception as e:
+        logger.exception("Error processing reference %s", idx)
+        err_fmt = ref + " [ERROR]"
+        return {
+            "idx": idx, "original": ref, "formatted": err_fmt,
+            "report": f"Error: {str(e)}", "status": "error"
+        }
+
+
+def batch_clusters(refs: List[str]) -> List[RefCluster]:
+    if DEDUP_THRESHOLD > 0:
+        return cluster_references(refs, threshold=DEDUP_THRESHOLD)
+    return [RefCluster(rep=i, members=[i]) for i in range(len(refs))]
+
+
+async def cluster_batch(refs: List[str]) -> List[RefCluster]:
+    """batch_clusters, run in the CPU worker pool."""
+    if DEDUP_THRESHOLD > 0:
+        return await cpu_pool.run(cluster_references, refs, DEDUP_THRESHOLD)
+    return batch_clusters(refs)
+
+
+def merged_entry(rep_entry: dict, idx: int, original: str, reason: str) -> dict:
+    """Fan a representative's verified result out to a near-duplicate it stood in for."""
+    entry = dict(rep_entry)
+    entry.pop("duplicates", None)
+    entry.update({
+        "idx": idx,
+        "original": original,
+        "merged_into": rep_entry["idx"],
+        "report": (
+            f"Merged: near-duplicate of reference {rep_entry['idx']} ({reason}); "
+            f"its verified result was reused.\n" + (rep_entry.get("report") or "")
+        ),
+    })
+    return entry
+
+
+def with_duplicates(rep_entry: dict, duplicates: List[int]) -> dict:
+    if not duplicates:
+        return rep_entry
+    entry = dict(rep_entry)
+    entry["duplicates"] = duplicates
+    entry["report"] = (
+        f"Also covers near-duplicate reference(s): {', '.join(map(str, duplicates))}.\n"
+        + (rep_entry.get("report") or "")
+    )
+    return entry
+
+
+async def iter_entries_from(batches: AsyncIterable[List[str]], refresh: bool = False,
+                            window: Optional[int] = None, outputs: Optional[str] = None,
+                            profile: Optional[str] = None, priority: str = "bulk") -> AsyncIterator[dict]:
+    """
+    Yield per-reference entries in completion order while reference batches are still
+    arriving (e.g. one batch per uploaded file, as each finishes extracting).
+    References are numbered across batches in arrival order. Near-duplicates are
+    clustered within each batch; only one representative per cluster runs the pipeline
+    and its result is fanned back out to the other members.
+    At most `window` (default STREAM_WINDOW) pipelines run at once, so memory
+    stays bounded regardless of how many references were uploaded.
+    """
+    window = max(1, window or STREAM_WINDOW)
+    refs: List[str] = []
+    todo: Deque[RefCluster] = deque()
+    pending: Dict[asyncio.Task, RefCluster] = {}
+    source = batches.__aiter__()
+    incoming: Optional[asyncio.Future] = asyncio.ensure_future(source.__anext__())
+
+    def fill():
+        while todo and len(pending) < window:
+            cl = todo.popleft()
+            task = asyncio.create_task(process_entry(cl.rep + 1, refs[cl.rep], refresh=refresh, outputs=outputs,
+                                                     profile=profile, priority=priority))
+            pending[task] = cl
+
+    try:
+        while pending or incoming is not None:
+            waiting = set(pending) if incoming is None else {incoming, *pending}
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            if incoming in done:
+                try:
+                    batch = incoming.result()
+                except StopAsyncIteration:
+                    incoming = None
+                else:
+                    incoming = asyncio.ensure_future(source.__anext__())
+                    base = len(refs)
+                    refs.extend(batch)
+                    for cl in await cluster_batch(batch):
+                        todo.append(RefCluster(
+                            rep=cl.rep + base, members=[i + base for i in cl.members],
+                            reasons={i + base: r for i, r in cl.reasons.items()},
+                        ))
+            for task in done:
+                cl = pending.pop(task, None)
+                if cl is None:
+                    continue
+                rep_entry = task.result()
+                yield with_duplicates(rep_entry, [i + 1 for i in cl.members if i != cl.rep])
+                for i in cl.members:
+                    if i != cl.rep:
+                        yield merged_entry(rep_entry, i + 1, refs[i], cl.reasons.get(i, "near-duplicate"))
+            fill()
+    finally:
+        # Client went away: don't keep burning LLM/source calls (or reading files)
+        for task in pending:
+            task.cancel()
+        if incoming is not None:
+            incoming.cancel()
+
+
+async def _single(refs: List[str]) -> AsyncIterator[List[str]]:
+    yield refs
+
+
+def iter_entries(refs: List[str], refresh: bool = False, window: Optional[int] = None,
+                 outputs: Optional[str] = None, profile: Optional[str] = None,
+                 priority: str = "bulk") -> AsyncIterator[dict]:
+    """iter_entries_from for one batch that is already split."""
+    return iter_entries_from(_single(refs), refresh=refresh, window=window, outputs=outputs, profile=profile,
+                             priority=priority)
+
+
+async def process_all(refs: List[str], refresh: bool = False, outputs: Optional[str] = None,
+                      profile: Optional[str] = None, priority: str = "bulk") -> List[dict]:
+    """All entries for a batch, ordered by reference number (no concurrency window)."""
+    entries = [e async for e in iter_entries(refs, refresh=refresh, window=len(refs), outputs=outputs,
+                                             profile=profile, priority=priority)]
+    return sorted(entries, key=lambda e: e["idx"])
@@ -0,0 +1,144 @@
+"""
+Text extraction from spooled uploads (see api.uploads). The sync functions run in the
+CPU worker pool (see api.workers), so they take a file path and return plain str.
+
+PDFs are read bibliography-first (REFASSIST_PDF_MODE=references): pages are extracted
+backwards from the end, one page per worker at a time, until a "References"/"Bibliography"
+heading is found, and further back only while more such headings turn up (papers with a
+supplementary bibliography have several). Every section under those headings is returned.
+When no heading turns up within REFASSIST_PDF_SCAN_PAGES pages (or anything goes wrong)
+the whole document is read.
+"""
+import os
+import re
+import asyncio
+import logging
+from typing import Dict
+from docx import Document as DocxDocument
+from refassist.metrics import incr
+from .workers import cpu_pool
+
+logger = logging.getLogger("refassist")
+
+# Optional PDF support (install: pip install pdfminer.six)
+try:
+    from pdfminer.high_level import extract_text as pdf_extract_text
+    from pdfminer.pdfpage import PDFPage
+    PDF_AVAILABLE = True
+except Exception:
+    PDF_AVAILABLE = False
+
+PDF_MODE = os.getenv("REFASSIST_PDF_MODE", "references")      # references | full
+PDF_SCAN_PAGES = int(os.getenv("REFASSIST_PDF_SCAN_PAGES", "15"))
+
+_REF_HEADING_RE = re.compile(
+    r"^[ \t]*(?:[IVX\d]+\.?[ \t]*)?"
+    r"(?:references|bibliography|works cited|literature cited|reference list|"
+    r"literatur(?:verzeichnis)?|références|referencias|bibliografia|参考文献)"
+    r"[ \t]*:?[ \t]*$",
+    re.I | re.M,
+)
+# Back matter that may follow the bibliography
+_AFTER_REFS_RE = re.compile(r"^[ \t]*(?:appendix|appendices|supplementary material)\b.*$", re.I | re.M)
+
+
+def text_file(path: str) -> str:
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        return raw.decode("utf-8", "ignore")
+    except Exception:
+        return raw.decode("latin-1", "ignore")
+
+
+def docx_text(path: str) -> str:
+    doc = DocxDocument(path)
+    return "\n".join(p.text for p in doc.paragraphs if p.text and p.text.strip())
+
+
+def pdf_text(path: str) -> str:
+    return pdf_extract_text(path) or ""
+
+
+def pdf_page_count(path: str) -> int:
+    with open(path, "rb") as f:
+        return sum(1 for _ in PDFPage.get_pages(f))
+
+
+def pdf_pages_text(path: str, first: int, last: int) -> str:
+    """Text of pages first..last-1 (0-based); each page ends with a form feed, as in pdf_text."""
+    return pdf_extract_text(path, page_numbers=range(first, last)) or ""
+
+
+def _has_heading(pages: Dict[int, str], first: int, last: int) -> bool:
+    return any(_REF_HEADING_RE.search(pages[i]) for i in range(first, last))
+
+
+def _find_sections(pages: Dict[int, str], first: int, total: int) -> str:
+    """
+    Every section under a bibliography heading on pages first..total-1, each running
+    to the next heading (or back matter), joined in page order; "" when there is none.
+    """
+    text = "\n".join(pages[i] for i in range(first, total))
+    heads = list(_REF_HEADING_RE.finditer(text))
+    sections = []
+    for m, nxt in zip(heads, heads[1:] + [None]):
+        body = text[m.end():nxt.start() if nxt else len(text)]
+        tail = _AFTER_REFS_RE.search(body)
+        body = (body[:tail.start()] if tail else body).replace("\x0c", "\n").strip()
+        if body:
+            sections.append(body)
+    return "\n\n".join(sections)
+
+
+async def _pages(path: str, first: int, last: int, parts: int) -> Dict[int, str]:
+    """Pages first..last-1 extracted in up to `parts` parallel worker calls."""
+    step = max(1, -(-(last - first) // parts))
+    spans = [(lo, min(lo + step, last)) for lo in range(first, last, step)]
+    texts = await asyncio.gather(*(cpu_pool.run(pdf_pages_text, path, lo, hi) for lo, hi in spans))
+    pages: Dict[int, str] = {}
+    for (lo, hi), text in zip(spans, texts):
+        # Every page ends with a form feed
+        pages.update(zip(range(lo, hi), (p + "\x0c" for p in text.split("\x0c"))))
+    return pages
+
+
+async def _read_pdf_pages(path: str) -> str:
+    total = await cpu_pool.run(pdf_page_count, path)
+    parts = max(2, cpu_pool.workers)
+    lowest = max(0, total - PDF_SCAN_PAGES)
+
+    # The bibliography is nearly always on the last few pages: read backwards, a page per
+    # worker first and doubling while nothing turns up, until a heading shows up; then keep
+    # going one page per worker only while chunks still hold headings (a main bibliography
+    # ahead of a supplementary one)
+    pages: Dict[int, str] = {}
+    lo, found, step = total, False, parts
+    while lo > lowest:
+        hi, lo = lo, max(lowest, lo - step)
+        pages.update(await _pages(path, lo, hi, parts))
+        hit = _has_heading(pages, lo, hi)
+        if found and not hit:
+            break
+        found = found or hit
+        step = parts if found else step * 2
+    section = _find_sections(pages, lo, total) if found else ""
+    if not section and lo > 0:
+        # Then the rest of the document at once, so a miss costs about one full read
+        pages.update(await _pages(path, 0, lo, parts))
+    incr("pdf.pages_extracted", len(pages))
+    if section:
+        incr("pdf.references_section")
+        return section
+    incr("pdf.full_document")
+    return "".join(pages[i] for i in range(total))
+
+
+async def read_pdf(path: str) -> str:
+    """References section of a PDF, or its full text when that cannot be located."""
+    if PDF_MODE == "references":
+        try:
+            return await _read_pdf_pages(path)
+        except Exception:
+            logger.warning("Page-wise PDF extraction failed; reading the whole document", exc_info=True)
+    return await cpu_pool.run(pdf_text, path)
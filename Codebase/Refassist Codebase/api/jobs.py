@@ -0,0 +1,331 @@
+"""
+Background job subsystem for large uploads.
+
+Jobs and their references live in a SQLite database, which doubles as the work
+queue, so queued/finished work survives a server restart. References are
+processed by a pool of asyncio workers, either inside the API process
+(REFASSIST_JOB_WORKERS > 0) or in separate processes started with:
+
+    python -m api.jobs
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import logging
+import sqlite3
+from contextlib import closing
+from typing import List, Optional
+from refassist.tools.dedupe import RefCluster
+from .batch import process_entry, batch_clusters, merged_entry, with_duplicates
+
+logger = logging.getLogger("refassist")
+
+JOBS_DB = os.getenv("REFASSIST_JOBS_DB", os.path.join(os.getcwd(), "jobs", "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("REFASSIST_JOB_WORKERS", "4"))
+JOB_POLL_S = float(os.getenv("REFASSIST_JOB_POLL_S", "1.0"))
+# A reference claimed longer ago than this is assumed lost (crashed worker) and re-queued
+JOB_LEASE_S = float(os.getenv("REFASSIST_JOB_LEASE_S", "900"))
+# Attempts to store a finished reference (e.g. "database is locked") before handing it back
+JOB_COMPLETE_RETRIES = int(os.getenv("REFASSIST_JOB_COMPLETE_RETRIES", "5"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,
+    total       INTEGER NOT NULL,
+    done        INTEGER NOT NULL DEFAULT 0,
+    errors      INTEGER NOT NULL DEFAULT 0,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id      TEXT NOT NULL,
+    idx         INTEGER NOT NULL,
+    reference   TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    worker      TEXT,
+    claimed_at  REAL,
+    result      TEXT,
+    merged_into INTEGER,
+    merge_reason TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS job_items_status ON job_items (status);
+"""
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except Exception:
+        return True
+    return True
+
+
+class JobStore:
+    """Synchronous SQLite access; async callers go through asyncio.to_thread."""
+
+    def __init__(self, path: str = JOBS_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as con:
+            con.executescript(_SCHEMA)
+            # Databases created before near-duplicate merging lack these columns
+            cols = {r["name"] for r in con.execute("PRAGMA table_info(job_items)")}
+            for col, decl in (("merged_into", "INTEGER"), ("merge_reason", "TEXT")):
+                if col not in cols:
+                    con.execute(f"ALTER TABLE job_items ADD COLUMN {col} {decl}")
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def create(self, refs: List[str], clusters: Optional[List[RefCluster]] = None) -> dict:
+        """
+        Queue one row per reference. Near-duplicates are stored as 'merged' rows
+        pointing at their cluster representative and are filled in when it completes.
+        Pass `clusters` when they were already computed (the API does so in its CPU pool).
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        rows = []
+        for cl in (batch_clusters(refs) if clusters is None else clusters):
+            for i in cl.members:
+                if i == cl.rep:
+                    rows.append((job_id, i + 1, refs[i], "queued", None, None))
+                else:
+                    rows.append((job_id, i + 1, refs[i], "merged", cl.rep + 1, cl.reasons.get(i, "near-duplicate")))
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            con.execute(
+                "INSERT INTO jobs (id, status, total, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, len(refs), now, now),
+            )
+            con.executemany(
+                "INSERT INTO job_items (job_id, idx, reference, status, merged_into, merge_reason) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        finally:
+            con.close()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with closing(self._connect()) as con:
+            row = con.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def results(self, job_id: str) -> List[dict]:
+        with closing(self._connect()) as con:
+            rows = con.execute(
+                "SELECT result FROM job_items WHERE job_id = ? AND result IS NOT NULL ORDER BY idx",
+                (job_id,),
+            ).fetchall()
+        return [json.loads(r["result"]) for r in rows]
+
+    def claim(self, worker: str) -> Optional[dict]:
+        """Atomically move the oldest queued reference to 'running' for this worker."""
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            row = con.execute(
+                "SELECT i.job_id, i.idx, i.reference FROM job_items i JOIN jobs j ON j.id = i.job_id "
+                "WHERE i.status = 'queued' ORDER BY j.created_at, i.idx LIMIT 1"
+            ).fetchone()
+            if row is None:
+                con.execute("COMMIT")
+                return None
+            now = time.time()
+            con.execute(
+                "UPDATE job_items SET status = 'running', worker = ?, claimed_at = ? WHERE job_id = ? AND idx = ?",
+                (worker, now, row["job_id"], row["idx"]),
+            )
+            con.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ? AND status = 'queued'",
+                (now, row["job_id"]),
+            )
+            con.execute("COMMIT")
+            return dict(row)
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        finally:
+            con.close()
+
+    def complete(self, job_id: str, idx: int, entry: dict) -> None:
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            merged = con.execute(
+                "SELECT idx, reference, merge_reason FROM job_items "
+                "WHERE job_id = ? AND merged_into = ? AND status = 'merged'",
+                (job_id, idx),
+            ).fetchall()
+            updates = [(with_duplicates(entry, [r["idx"] for r in merged]), idx, "running")] + [
+                (merged_entry(entry, r["idx"], r["reference"], r["merge_reason"] or "near-duplicate"), r["idx"], "merged")
+                for r in merged
+            ]
+            finished = errors = 0
+            for item, item_idx, expected in updates:
+                status = "done" if item.get("status") == "success" else "error"
+                cur = con.execute(
+                    "UPDATE job_items SET status = ?, result = ? WHERE job_id = ? AND idx = ? AND status = ?",
+                    (status, json.dumps(item, ensure_ascii=False), job_id, item_idx, expected),
+                )
+                if not cur.rowcount:
+                    if expected == "running":
+                        break  # lost the claim (re-queued meanwhile); the new owner reports
+                    continue
+                finished += 1
+                errors += status == "error"
+            if finished:
+                con.execute(
+                    "UPDATE jobs SET done = done + ?, errors = errors + ?, updated_at = ?, "
+                    "status = CASE WHEN done + ? >= total THEN 'done' ELSE 'running' END WHERE id = ?",
+                    (finished, errors, time.time(), finished, job_id),
+                )
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        finally:
+            con.close()
+
+    def requeue_stale(self) -> int:
+        """Re-queue references whose worker crashed or whose lease expired (e.g. after a restart)."""
+        host = socket.gethostname()
+        now = time.time()
+        with closing(self._connect()) as con:
+            rows = con.execute(
+                "SELECT job_id, idx, worker, claimed_at FROM job_items WHERE status = 'running'"
+            ).fetchall()
+            stale = []
+            for r in rows:
+                w_host, _, w_pid = (r["worker"] or "").rpartition(":")
+                dead = w_host == host and w_pid.isdigit() and not _pid_alive(int(w_pid))
+                if dead or (now - (r["claimed_at"] or 0)) > JOB_LEASE_S:
+                    stale.append((r["job_id"], r["idx"]))
+            con.executemany(
+                "UPDATE job_items SET status = 'queued', worker = NULL, claimed_at = NULL "
+                "WHERE job_id = ? AND idx = ? AND status = 'running'",
+                stale,
+            )
+        return len(stale)
+
+    def requeue(self, job_id: str, idx: int, worker: str) -> None:
+        """Hand back one reference this worker claimed but could not store."""
+        with closing(self._connect()) as con:
+            con.execute(
+                "UPDATE job_items SET status = 'queued', worker = NULL, claimed_at = NULL "
+                "WHERE job_id = ? AND idx = ? AND worker = ? AND status = 'running'",
+                (job_id, idx, worker),
+            )
+
+    def release(self, worker: str) -> None:
+        """Hand back references claimed by a worker that is shutting down."""
+        with closing(self._connect()) as con:
+            con.execute(
+                "UPDATE job_items SET status = 'queued', worker = NULL, claimed_at = NULL "
+                "WHERE worker = ? AND status = 'running'",
+                (worker,),
+            )
+
+
+class JobRunner:
+    """Pool of asyncio workers pulling references from the SQLite queue."""
+
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS):
+        self.store = store
+        self.workers = workers
+        self.worker_id = _worker_id()
+        self._wake = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    async def start(self) -> None:
+        # Same host and pid as a previous run (e.g. a container restart): those claims are ours and dead
+        await asyncio.to_thread(self.store.release, self.worker_id)
+        requeued = await asyncio.to_thread(self.store.requeue_stale)
+        if requeued:
+            logger.info("Re-queued %s interrupted job references", requeued)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.to_thread(self.store.release, self.worker_id)
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                item = await asyncio.to_thread(self.store.claim, self.worker_id)
+            except Exception:
+                logger.exception("Job queue claim failed")
+                item = None
+            if item is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=JOB_POLL_S)
+                except asyncio.TimeoutError:
+                    # Periodically recover references left by crashed external workers
+                    try:
+                        await asyncio.to_thread(self.store.requeue_stale)
+                    except Exception:
+                        logger.exception("Job queue stale-claim recovery failed")
+                continue
+            entry = await process_entry(item["idx"], item["reference"])
+            await self._complete(item, entry)
+
+    async def _complete(self, item: dict, entry: dict) -> None:
+        """Store a result, retrying with backoff; if that keeps failing, re-queue the reference
+        instead of leaving it 'running' until its lease expires."""
+        for attempt in range(max(1, JOB_COMPLETE_RETRIES)):
+            try:
+                await asyncio.to_thread(self.store.complete, item["job_id"], item["idx"], entry)
+                return
+            except Exception:
+                logger.exception("Storing job %s reference %s failed (attempt %s)",
+                                 item["job_id"], item["idx"], attempt + 1)
+                await asyncio.sleep(JOB_POLL_S * 2 ** attempt)
+        try:
+            await asyncio.to_thread(self.store.requeue, item["job_id"], item["idx"], self.worker_id)
+            logger.error("Re-queued job %s reference %s after failing to store its result",
+                         item["job_id"], item["idx"])
+        except Exception:
+            logger.exception("Re-queueing job %s reference %s failed; it is recovered when its lease expires",
+                             item["job_id"], item["idx"])
+
+
+async def _run_forever(workers: int) -> None:
+    runner = JobRunner(JobStore(), workers=max(1, workers))
+    await runner.start()
+    logger.info("Job worker %s started with %s workers on %s", runner.worker_id, runner.workers, JOBS_DB)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_run_forever(JOB_WORKERS))
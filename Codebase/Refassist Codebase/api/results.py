@@ -0,0 +1,32 @@
+import os
+import uuid
+from typing import List, Optional
+from cachetools import TTLCache
+
+# Processed batches kept so /api/download-report can reuse /api/process results
+RESULT_TTL_S = int(os.getenv("REFASSIST_RESULT_TTL_S", "3600"))
+RESULT_MAX = int(os.getenv("REFASSIST_RESULT_MAX", "256"))
+
+
+class ResultStore:
+    """TTL- and size-bounded in-memory store of per-reference entries, keyed by an opaque handle."""
+
+    def __init__(self, maxsize: int = RESULT_MAX, ttl: int = RESULT_TTL_S):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def put(self, entries: List[dict]) -> str:
+        result_id = uuid.uuid4().hex
+        self._cache[result_id] = list(entries)
+        return result_id
+
+    def open(self) -> str:
+        """Handle for a batch whose entries are added one by one (see append)."""
+        return self.put([])
+
+    def append(self, result_id: str, entry: dict) -> None:
+        entries = self._cache.get(result_id)
+        if entries is not None:
+            entries.append(entry)
+
+    def get(self, result_id: str) -> Optional[List[dict]]:
+        return self._cache.get(result_id)
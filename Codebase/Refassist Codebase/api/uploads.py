@@ -0,0 +1,170 @@
+"""
+Upload ingestion. Files are spooled to temp files in chunks (never held whole in memory),
+checked against per-file and per-request size caps, and extracted concurrently in the CPU
+worker pool. iter_extracted yields each file's text as soon as it is done, so callers can
+start on its references while larger files are still being read.
+
+Supported:
+  - .txt/.bib/.bbl/.tex : UTF-8 text (LaTeX bibliographies are split per entry by the caller)
+  - .docx               : python-docx paragraphs
+  - .pdf                : pdfminer.six (if available); the references section only, see api.extract
+  - .doc                : not supported (suggest converting to .docx)
+"""
+import os
+import asyncio
+import logging
+import tempfile
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional, Tuple
+from fastapi import HTTPException, UploadFile
+from .extract import PDF_AVAILABLE, docx_text, read_pdf, text_file
+from .workers import cpu_pool
+
+logger = logging.getLogger("refassist")
+
+MAX_FILE_MB = float(os.getenv("REFASSIST_MAX_FILE_MB", "25"))
+MAX_UPLOAD_MB = float(os.getenv("REFASSIST_MAX_UPLOAD_MB", "100"))
+# Files of one request extracted at the same time
+UPLOAD_CONCURRENCY = int(os.getenv("REFASSIST_UPLOAD_CONCURRENCY", "4"))
+
+_CHUNK = 1 << 20
+_TEXT_EXTS = (".txt", ".bib", ".bbl", ".tex")
+
+
+@dataclass
+class Spooled:
+    name: str
+    ext: str
+    path: str
+    size: int
+
+
+def _ext(name: str) -> str:
+    return "." + name.split(".")[-1] if "." in name else ""
+
+
+def _check_type(name: str, ext: str) -> None:
+    if ext in _TEXT_EXTS or ext == ".docx":
+        return
+    if ext == ".pdf":
+        if not PDF_AVAILABLE:
+            raise HTTPException(
+                status_code=400,
+                detail="PDF support is not available on the server. Install pdfminer.six."
+            )
+        return
+    if ext == ".doc":
+        # Old .doc is binary and not reliably parsed in pure Python.
+        # Ask users to convert to .docx (Word/Google Docs) before uploading.
+        raise HTTPException(
+            status_code=400,
+            detail=f"'{name}' is .doc (legacy). Please convert to .docx and re-upload."
+        )
+    raise HTTPException(
+        status_code=400,
+        detail=f"Unsupported file type for '{name}'. Allowed: .pdf, .docx, .tex, .bib, .bbl, .txt"
+    )
+
+
+def _too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=413, detail=detail)
+
+
+def cleanup(spooled: List[Spooled]) -> None:
+    for sp in spooled:
+        try:
+            os.unlink(sp.path)
+        except OSError:
+            pass
+
+
+async def spool(files: List[UploadFile]) -> List[Spooled]:
+    """Validate types and sizes, and copy every upload to a temp file the workers can open."""
+    max_file, max_total = int(MAX_FILE_MB * 2**20), int(MAX_UPLOAD_MB * 2**20)
+    names = []
+    for up in files:
+        name = (up.filename or "").lower()
+        _check_type(name, _ext(name))
+        if up.size is not None and up.size > max_file:
+            raise _too_large(f"'{name}' is larger than {MAX_FILE_MB:g} MB")
+        names.append(name)
+    if sum(up.size or 0 for up in files) > max_total:
+        raise _too_large(f"Upload is larger than {MAX_UPLOAD_MB:g} MB in total")
+
+    spooled: List[Spooled] = []
+    total = 0
+    try:
+        for up, name in zip(files, names):
+            ext = _ext(name)
+            fd, path = tempfile.mkstemp(prefix="refassist-", suffix=ext)
+            sp = Spooled(name, ext, path, 0)
+            spooled.append(sp)
+            with os.fdopen(fd, "wb") as out:
+                while chunk := await up.read(_CHUNK):
+                    sp.size += len(chunk)
+                    total += len(chunk)
+                    if sp.size > max_file:
+                        raise _too_large(f"'{name}' is larger than {MAX_FILE_MB:g} MB")
+                    if total > max_total:
+                        raise _too_large(f"Upload is larger than {MAX_UPLOAD_MB:g} MB in total")
+                    await asyncio.to_thread(out.write, chunk)
+            await up.close()
+    except BaseException:
+        cleanup(spooled)
+        raise
+    return spooled
+
+
+async def extract(sp: Spooled) -> str:
+    try:
+        if sp.ext in _TEXT_EXTS:
+            return await asyncio.to_thread(text_file, sp.path)
+        if sp.ext == ".docx":
+            return await cpu_pool.run(docx_text, sp.path)
+        return await read_pdf(sp.path)
+    except HTTPException:
+        raise
+    except Exception as e:
+        kind = sp.ext.lstrip(".").upper()
+        logger.exception("Failed to read %s: %s", kind, sp.name)
+        raise HTTPException(status_code=400, detail=f"Failed to read {kind} {sp.name}: {e}")
+
+
+async def iter_extracted(spooled: List[Spooled], return_errors: bool = False
+                         ) -> AsyncIterator[Tuple[Spooled, str, Optional[HTTPException]]]:
+    """
+    (file, text, error) in completion order, at most UPLOAD_CONCURRENCY files at a time.
+    A file that cannot be read raises its HTTPException, or with return_errors is
+    yielded as (file, "", error). Each temp file is removed once read; the rest are
+    removed if the caller stops early.
+    """
+    sem = asyncio.Semaphore(max(1, UPLOAD_CONCURRENCY))
+
+    async def one(sp: Spooled) -> Tuple[Spooled, str, Optional[HTTPException]]:
+        async with sem:
+            try:
+                return sp, await extract(sp), None
+            except HTTPException as e:
+                if not return_errors:
+                    raise
+                return sp, "", e
+            finally:
+                cleanup([sp])
+
+    tasks = [asyncio.create_task(one(sp)) for sp in spooled]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            yield await fut
+    finally:
+        for t in tasks:
+            t.cancel()
+        cleanup(spooled)
+
+
+async def read_all(files: List[UploadFile]) -> str:
+    """The text of all files, in upload order (extracted concurrently)."""
+    spooled = await spool(files)
+    texts = {sp.path: text async for sp, text, _ in iter_extracted(spooled)}
+    # Join with blank lines to help the splitter
+    chunks = [texts[sp.path] for sp in spooled]
+    return "\n\n".join(c.strip() for c in chunks if c and c.strip())
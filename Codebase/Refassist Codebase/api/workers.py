@@ -0,0 +1,102 @@
+"""
+Process pool for CPU-bound request work: PDF/DOCX text extraction, DOCX/ZIP artifacts
+and batch near-duplicate clustering. These hold the GIL for a long time, so in a thread
+they still stall the event loop; in worker processes they don't.
+
+Workers are started (and their heavy imports loaded) when the app starts. Handlers
+await cpu_pool.run(fn, *args); fn and its arguments must be picklable (module-level
+functions, plain data). REFASSIST_CPU_WORKERS=0 runs the same calls in a thread.
+"""
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, TypeVar
+from refassist.metrics import incr, observe
+
+logger = logging.getLogger("refassist")
+
+T = TypeVar("T")
+
+CPU_WORKERS = int(os.getenv("REFASSIST_CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+def _warm_worker() -> None:
+    # Import the heavy libraries once per worker, not on its first task
+    import docx  # noqa: F401
+    try:
+        import pdfminer.high_level  # noqa: F401
+    except Exception:
+        pass
+    import refassist.tools.dedupe  # noqa: F401
+
+
+def _noop() -> None:
+    return None
+
+
+class CpuPool:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inflight = 0          # submitted and not finished (running + queued)
+
+    def _get(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop and threads is not safe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+            )
+        return self._executor
+
+    def start(self) -> None:
+        """Start every worker now so the first uploads don't pay for process startup."""
+        if self.workers > 0:
+            ex = self._get()
+            for _ in range(self.workers):
+                ex.submit(_noop)
+
+    def shutdown(self, executor: Optional[ProcessPoolExecutor] = None) -> None:
+        """Stop the pool (or only `executor`, if it is still the current one)."""
+        if self._executor is not None and executor in (None, self._executor):
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def queued(self) -> int:
+        return max(0, self._inflight - self.workers)
+
+    def stats(self) -> Dict[str, int]:
+        return {"workers": self.workers, "inflight": self._inflight, "queued": self.queued}
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        name = getattr(fn, "__name__", "task")
+        t0 = time.perf_counter()
+        if self.workers <= 0:
+            try:
+                return await asyncio.to_thread(fn, *args)
+            finally:
+                observe(f"cpu.{name}.ms", (time.perf_counter() - t0) * 1000)
+        loop = asyncio.get_running_loop()
+        executor = self._get()
+        self._inflight += 1
+        observe("cpu.queue.depth", self.queued)
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory on a huge PDF); start a fresh pool next time
+            incr("cpu.pool.broken")
+            logger.error("CPU worker pool broke while running %s; restarting it", name)
+            self.shutdown(executor)
+            raise
+        finally:
+            self._inflight -= 1
+            observe(f"cpu.{name}.ms", (time.perf_counter() - t0) * 1000)
+
+
+cpu_pool = CpuPool(CPU_WORKERS)
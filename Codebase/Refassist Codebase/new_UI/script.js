@@ -7,6 +7,9 @@ const reportEl = $("#report");
 const summaryEl = $("#summary");
 const countEl = $("#count");
 
+// Handle to server-side results of the last check (reused by "Download full report")
+let lastResultId = null;
+
 // Update reference count display
 function updateCount() {
   const lines = input.value.split(/\r?\n/).map(s => s.trim()).filter(Boolean);
@@ -14,23 +17,18 @@ function updateCount() {
   countEl.className = 'stat muted';
 }
 
-// Show loading bar with progress animation
+// Show loading bar (progress is driven by streamed results)
 function showLoadingBar() {
   const loadingContainer = document.getElementById('loading-container');
   const loadingProgress = document.querySelector('.loading-progress');
 
   loadingContainer.style.display = 'block';
   loadingProgress.style.width = '0%';
+}
 
-  // Animate progress bar
-  let progress = 0;
-  const interval = setInterval(() => {
-    progress += 2.5;
-    loadingProgress.style.width = progress + '%';
-    if (progress >= 100) {
-      clearInterval(interval);
-    }
-  }, 100);
+// Set loading bar progress (0-100)
+function setLoadingProgress(percent) {
+  document.querySelector('.loading-progress').style.width = Math.min(100, percent) + '%';
 }
 
 // Hide loading bar
@@ -46,7 +44,40 @@ function showPreviewSection(previewText) {
   reportPreview.textContent = modifiedPreview;
 }
 
-// Run validation checks with backend API
+// Build the preview text from the entries received so far (same layout as /api/process)
+function buildPreview(entries) {
+  const lines = ['Reference Processing Report', '='.repeat(30), ''];
+  for (const entry of entries.slice(0, 10)) {
+    lines.push(`Reference ${entry.idx}:`);
+    lines.push(`Original: ${entry.original}`);
+    if (entry.status === 'success' && entry.formatted) lines.push(`Formatted: ${entry.formatted}`);
+    lines.push(`Notes: ${entry.report}`);
+    lines.push('');
+  }
+  return lines.join('\n');
+}
+
+// Read an NDJSON response body, calling onEvent for every parsed line
+async function readNdjson(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let nl;
+    while ((nl = buffer.indexOf('\n')) >= 0) {
+      const line = buffer.slice(0, nl).trim();
+      buffer = buffer.slice(nl + 1);
+      if (line) onEvent(JSON.parse(line));
+    }
+  }
+  if (buffer.trim()) onEvent(JSON.parse(buffer));
+}
+
+// Run validation checks with backend API (results render as each reference finishes)
 async function runChecks() {
   const lines = input.value.split(/\r?\n/).filter(line => line.trim());
   const reportPreview = document.getElementById('report-preview');
@@ -61,16 +92,28 @@ async function runChecks() {
   }
 
   showLoadingBar();
+  lastResultId = null;
   downloadBtn.disabled = true;
   reportPreview.textContent = 'Generating report...';
   reportEl.textContent = '';
   summaryEl.textContent = 'Processing...';
+  summaryEl.className = 'stat';
+
+  // Entries arrive in completion order; keep them sorted by reference number
+  const entries = [];
+  let total = 0;
+
+  const render = () => {
+    reportEl.textContent = entries.map(e => `[${e.idx}] ${e.formatted || `${e.original} [NOT FORMATTED]`}`).join('\n');
+    showPreviewSection(buildPreview(entries));
+  };
 
   try {
     const formData = new FormData();
     formData.append('references', input.value);
+    formData.append('keep_results', 'true');  // result_id for the report download
 
-    const response = await fetch('/api/process', {
+    const response = await fetch('/api/process/stream', {
       method: 'POST',
       body: formData
     });
@@ -79,18 +122,32 @@ async function runChecks() {
       throw new Error(`HTTP error! status: ${response.status}`);
     }
 
-    const result = await response.json();
+    let summary = null;
+    await readNdjson(response, (evt) => {
+      if (evt.event === 'start') {
+        total = evt.total;
+        summaryEl.textContent = `Processing 0/${total}...`;
+      } else if (evt.event === 'reference') {
+        const pos = entries.findIndex(e => e.idx > evt.idx);
+        entries.splice(pos < 0 ? entries.length : pos, 0, evt);
+        summaryEl.textContent = `Processing ${entries.length}/${total}...`;
+        setLoadingProgress(total ? (entries.length / total) * 100 : 100);
+        render();
+      } else if (evt.event === 'summary') {
+        summary = evt;
+      }
+    });
 
-    if (result.success) {
-      reportEl.textContent = result.formatted_output || 'No references to display.';
-      summaryEl.textContent = 'Analysis complete';
-      summaryEl.className = 'stat ' + (result.summary.errors > 0 ? 'bad' : 'good');
-      showPreviewSection(result.preview);
-      downloadBtn.disabled = false;
-    } else {
-      throw new Error(result.error || 'Processing failed');
+    if (!summary) {
+      throw new Error('Stream ended before all references were processed');
     }
 
+    lastResultId = summary.result_id || null;
+    if (!entries.length) reportEl.textContent = 'No references to display.';
+    summaryEl.textContent = 'Analysis complete';
+    summaryEl.className = 'stat ' + (summary.errors > 0 ? 'bad' : 'good');
+    downloadBtn.disabled = false;
+
   } catch (error) {
     console.error('Error processing references:', error);
     reportEl.textContent = `Error: ${error.message}. Please try again.`;
@@ -103,12 +160,17 @@ async function runChecks() {
 }
 
 // Event listeners
-input.addEventListener('input', updateCount);
+input.addEventListener('input', () => {
+  // Edited input no longer matches the stored results
+  lastResultId = null;
+  updateCount();
+});
 
 document.getElementById('check').addEventListener('click', runChecks);
 
 document.getElementById('clear').addEventListener('click', () => {
   input.value = '';
+  lastResultId = null;
   reportEl.textContent = '';
   summaryEl.textContent = 'Cleared';
   updateCount();
@@ -145,6 +207,7 @@ document.getElementById('download-report').addEventListener('click', async () =>
   try {
     const formData = new FormData();
     formData.append('references', input.value);
+    if (lastResultId) formData.append('result_id', lastResultId);
 
     const response = await fetch('/api/download-report', {
       method: 'POST',
@@ -214,8 +277,8 @@ themeToggle.addEventListener('click', () => {
 
 // File upload functionality
 const uploadedFiles = [];
-// Server supports: .docx, .pdf, .tex, .bbl, .txt (legacy .doc is rejected server-side)
-const allowedExtensions = ['.docx', '.pdf', '.tex', '.bbl', '.txt'];
+// Server supports: .docx, .pdf, .tex, .bib, .bbl, .txt (legacy .doc is rejected server-side)
+const allowedExtensions = ['.docx', '.pdf', '.tex', '.bib', '.bbl', '.txt'];
 
 function initializeTabs() {
   const tabBtns = document.querySelectorAll('.tab-btn');
@@ -240,7 +303,7 @@ function validateFile(file) {
 function getFileIcon(filename) {
   const extension = '.' + filename.split('.').pop().toLowerCase();
   const icons = {
-    '.pdf': '📄', '.docx': '📝', '.tex': '📋', '.bbl': '📋', '.txt': '📄'
+    '.pdf': '📄', '.docx': '📝', '.tex': '📋', '.bib': '📋', '.bbl': '📋', '.txt': '📄'
   };
   return icons[extension] || '📄';
 }
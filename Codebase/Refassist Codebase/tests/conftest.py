@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The API is imported as the top-level `api` package and the pipeline from Refassist/src
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "Refassist", "src")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,23 @@
+import pytest
+from refassist.tools.bibtex import latex_to_text, parse_structured
+
+
+@pytest.mark.parametrize("value, text", [
+    (r"A {\'e}tude of \LaTeX{} \& co", "A étude of LaTeX & co"),
+    (r"The \TeX book and \BibTeX\ styles", "The TeX book and BibTeX styles"),
+    (r"Typesetting with \LaTeXe", "Typesetting with LaTeX2e"),
+    (r"{\L}{\'o}d{\'z} \emph{University}", "Łódź University"),
+    (r"Pages 10--20, 50\% off", "Pages 10–20, 50% off"),
+])
+def test_latex_to_text(value, text):
+    assert latex_to_text(value) == text
+
+
+def test_parse_structured_keeps_logo_commands_in_titles():
+    rtype, fields = parse_structured(
+        "@article{k, title = {Writing papers in \\LaTeX}, author = {Knuth, Donald E.}, "
+        "journal = {TUGboat}, year = 1986}"
+    )
+    assert rtype == "journal article"
+    assert fields["title"] == "Writing papers in LaTeX"
+    assert fields["year"] == "1986"
@@ -0,0 +1,48 @@
+from refassist.tools.dedupe import cluster_references
+
+BASE = 'K. He, X. Zhang, and J. Sun, "Deep residual learning for image recognition in the wild," IEEE Trans. Pattern Anal. Mach. Intell.'
+
+
+def _groups(refs):
+    return sorted(c.members for c in cluster_references(refs))
+
+
+def test_same_reference_formatted_differently_is_merged():
+    refs = [f"[1] {BASE}, vol. 54, no. 3, pp. 100-110, 2016.",
+            f"[7] {BASE}, vol. 54, no. 3, pp. 100–110, 2016"]
+    assert _groups(refs) == [[0, 1]]
+
+
+def test_later_volume_of_same_title_is_not_merged():
+    refs = [f"{BASE}, vol. 54, no. 3, pp. 100-110, 2016.",
+            f"{BASE}, vol. 55, no. 4, pp. 200-210, 2017."]
+    assert _groups(refs) == [[0], [1]]
+
+
+def test_part_ii_is_not_merged():
+    refs = [f"{BASE}: Part I, vol. 54, no. 3, pp. 100-110, 2016.",
+            f"{BASE}: Part II, vol. 54, no. 3, pp. 100-110, 2016."]
+    assert _groups(refs) == [[0], [1]]
+
+
+def test_different_dois_are_never_merged():
+    refs = [f"{BASE}, vol. 54, no. 3, pp. 100-110, 2016, doi: 10.1109/TPAMI.2016.1.",
+            f"{BASE}, vol. 54, no. 3, pp. 100-110, 2016, doi: 10.1109/TPAMI.2016.2."]
+    assert _groups(refs) == [[0], [1]]
+
+
+def test_same_doi_is_merged():
+    refs = ["A. Author, Short title, 10.1109/X.2016.1",
+            "A. Author et al., A much longer rendering of the title, 2016, doi:10.1109/X.2016.1."]
+    clusters = cluster_references(refs)
+    assert [c.members for c in clusters] == [[0, 1]]
+    assert clusters[0].rep == 1
+    assert clusters[0].reasons[0].startswith("same DOI")
+
+
+def test_matches_do_not_chain():
+    # a~b share a DOI and b~c read alike, but a and c are not duplicates of each other
+    refs = ["J. Doe, A survey of graph neural networks, 2020, doi: 10.1109/X.2020.1.",
+            f"{BASE}, vol. 54, pp. 100-110, 2016, doi: 10.1109/X.2020.1.",
+            f"{BASE}, vol. 54, pp. 100-110, 2016."]
+    assert _groups(refs) == [[0, 1], [2]]
@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from api import extract
+
+pytestmark = pytest.mark.skipif(not extract.PDF_AVAILABLE, reason="pdfminer.six is not installed")
+
+
+def _pdf(pages):
+    """A minimal PDF with one Helvetica text line per entry of each page."""
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        ops = "".join(f"BT /F1 11 Tf 72 {740 - 24 * i} Td ({line}) Tj ET\n" for i, line in enumerate(lines))
+        objs.append(f"<< /Length {len(ops)} >>\nstream\n{ops}endstream")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                    f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objs)} 0 R >>")
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out, offsets = b"%PDF-1.4\n", []
+    for n, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += f"{n} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+def test_read_pdf_returns_every_bibliography_section(tmp_path, monkeypatch):
+    monkeypatch.setattr(extract.cpu_pool, "workers", 0)
+    path = tmp_path / "paper.pdf"
+    path.write_bytes(_pdf([
+        ["1 Introduction", "Body text of the paper."],
+        ["References", "[1] A. Author, Main paper reference, 2020."],
+        ["Appendix A", "Proofs that are not references."],
+        ["Bibliography", "[2] B. Author, Supplement reference, 2021."],
+    ]))
+
+    text = asyncio.run(extract.read_pdf(str(path)))
+
+    assert "Main paper reference" in text
+    assert "Supplement reference" in text
+    assert "Body text" not in text
+    assert "Proofs" not in text
+
+
+def _spy_pages(monkeypatch):
+    read = []
+    real = extract.pdf_pages_text
+
+    def pages_text(path, first, last):
+        read.extend(range(first, last))
+        return real(path, first, last)
+
+    monkeypatch.setattr(extract.cpu_pool, "workers", 0)
+    monkeypatch.setattr(extract, "pdf_pages_text", pages_text)
+    return read
+
+
+def test_read_pdf_reads_only_the_tail_when_the_heading_is_there(tmp_path, monkeypatch):
+    read = _spy_pages(monkeypatch)
+    path = tmp_path / "long.pdf"
+    body = [[f"Section {i}", "Body text of the paper."] for i in range(20)]
+    path.write_bytes(_pdf(body + [["References", "[1] A. Author, Only reference, 2020."]]))
+
+    text = asyncio.run(extract.read_pdf(str(path)))
+
+    assert text == "[1] A. Author, Only reference, 2020."
+    # The tail chunk plus one more chunk to rule out an earlier bibliography
+    assert sorted(read) == [17, 18, 19, 20]
+
+
+def test_read_pdf_without_heading_returns_the_whole_document(tmp_path, monkeypatch):
+    read = _spy_pages(monkeypatch)
+    path = tmp_path / "plain.pdf"
+    path.write_bytes(_pdf([[f"Page {i} text."] for i in range(20)]))
+
+    text = asyncio.run(extract.read_pdf(str(path)))
+
+    assert "Page 0 text." in text and "Page 19 text." in text
+    assert sorted(read) == list(range(20))
@@ -0,0 +1,113 @@
+import socket
+import sqlite3
+import threading
+import pytest
+from api import jobs
+from api.jobs import JobStore
+from refassist.tools.dedupe import RefCluster
+
+HOST = socket.gethostname()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def _entry(idx, status="success"):
+    return {"idx": idx, "status": status, "report": f"ref {idx}"}
+
+
+def _items(store, job_id):
+    with sqlite3.connect(store.path) as con:
+        con.row_factory = sqlite3.Row
+        rows = con.execute("SELECT * FROM job_items WHERE job_id = ? ORDER BY idx", (job_id,)).fetchall()
+    return {r["idx"]: dict(r) for r in rows}
+
+
+def test_concurrent_claims_hand_out_each_reference_once(store):
+    job = store.create([f"ref {i}" for i in range(20)], clusters=[RefCluster(i, [i]) for i in range(20)])
+    claimed, lock = [], threading.Lock()
+
+    def drain(worker):
+        while (item := store.claim(worker)) is not None:
+            with lock:
+                claimed.append(item["idx"])
+
+    threads = [threading.Thread(target=drain, args=(f"w{n}",)) for n in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(claimed) == list(range(1, 21))
+    assert all(r["status"] == "running" for r in _items(store, job["id"]).values())
+
+
+def test_complete_fans_result_out_to_merged_rows(store):
+    job = store.create(["a", "a'", "b"], clusters=[RefCluster(0, [0, 1], {1: "same DOI"}), RefCluster(2, [2])])
+    assert store.claim("w")["idx"] == 1  # the merged row is never handed out
+    store.complete(job["id"], 1, _entry(1))
+
+    rows = {r["idx"]: r for r in store.results(job["id"])}
+    assert rows[1]["duplicates"] == [2]
+    assert rows[2]["merged_into"] == 1 and rows[2]["original"] == "a'"
+    assert "same DOI" in rows[2]["report"]
+    assert store.get(job["id"])["done"] == 2
+    assert store.get(job["id"])["status"] == "running"
+
+    assert store.claim("w")["idx"] == 3
+    store.complete(job["id"], 3, _entry(3, status="error"))
+    final = store.get(job["id"])
+    assert (final["done"], final["errors"], final["status"]) == (3, 1, "done")
+
+
+def test_complete_after_requeue_loses_the_claim(store):
+    job = store.create(["a", "a'"], clusters=[RefCluster(0, [0, 1], {1: "same DOI"})])
+    store.claim("old")
+    store.requeue(job["id"], 1, "old")
+    store.complete(job["id"], 1, _entry(1))
+
+    # Neither the representative nor its merged row was written
+    assert store.results(job["id"]) == []
+    assert store.get(job["id"])["done"] == 0
+    assert _items(store, job["id"])[2]["status"] == "merged"
+    assert store.claim("new")["idx"] == 1
+
+
+def test_requeue_only_releases_own_claim(store):
+    job = store.create(["a"], clusters=[RefCluster(0, [0])])
+    store.claim("owner")
+    store.requeue(job["id"], 1, "someone-else")
+    assert _items(store, job["id"])[1]["status"] == "running"
+
+
+def test_requeue_stale_recovers_dead_pids_and_expired_leases(store, monkeypatch):
+    job = store.create(["a", "b", "c", "d"], clusters=[RefCluster(i, [i]) for i in range(4)])
+    for worker in (f"{HOST}:111", f"{HOST}:222", "other-host:111", "other-host:333"):
+        store.claim(worker)
+    with sqlite3.connect(store.path) as con:
+        con.execute("UPDATE job_items SET claimed_at = 0 WHERE job_id = ? AND idx = 4", (job["id"],))
+    monkeypatch.setattr(jobs, "_pid_alive", lambda pid: pid != 111)
+
+    assert store.requeue_stale() == 2
+    status = {i: r["status"] for i, r in _items(store, job["id"]).items()}
+    # Dead local pid and expired lease are re-queued; a live local pid and a
+    # remote worker (pid not checkable) inside its lease keep their claim
+    assert status == {1: "queued", 2: "running", 3: "running", 4: "queued"}
+    assert _items(store, job["id"])[1]["worker"] is None
+
+
+def test_reference_is_counted_done_exactly_once(store):
+    job = store.create(["a", "a'", "b"], clusters=[RefCluster(0, [0, 1], {1: "same DOI"}), RefCluster(2, [2])])
+    store.claim("old")
+    store.requeue(job["id"], 1, "old")
+    store.claim("new")
+    # The stale owner and the new owner both report, and the new one retries
+    store.complete(job["id"], 1, _entry(1))
+    store.complete(job["id"], 1, _entry(1))
+    store.complete(job["id"], 1, _entry(1, status="error"))
+
+    counts = store.get(job["id"])
+    assert (counts["done"], counts["errors"], counts["status"]) == (2, 0, "running")
+    assert [r["idx"] for r in store.results(job["id"])] == [1, 2]
@@ -0,0 +1,58 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from refassist.config import PipelineConfig
+from refassist.llms import adapter
+
+
+class _OllamaStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, so a pooled connection outlives the loop
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        body = json.dumps({"response": json.dumps({"ok": True}), "prompt_eval_count": 1}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ollama_url(monkeypatch):
+    monkeypatch.delenv("OLLAMA_BASE_URL", raising=False)
+    monkeypatch.delenv("OLLAMA_HOST", raising=False)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OllamaStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_llm_calls_work_across_event_loops(ollama_url):
+    cfg = PipelineConfig(llm_provider="ollama", ollama_base=ollama_url, llm_routes="", llm_hedge="")
+
+    async def call():
+        llm = adapter.LLMAdapter(cfg)
+        return await llm.json("ping", node="validate"), llm.failures
+
+    # Each asyncio.run has its own loop; a client pooled by the first must not leak into the second
+    for _ in range(2):
+        out, failures = asyncio.run(call())
+        assert out == {"ok": True}
+        assert failures == []
+
+
+def test_clients_are_pooled_within_one_loop(ollama_url):
+    cfg = PipelineConfig(llm_provider="ollama", ollama_base=ollama_url)
+
+    async def clients():
+        return adapter._client_for("ollama", cfg), adapter._client_for("ollama", cfg)
+
+    a1, a2 = asyncio.run(clients())
+    b1, _ = asyncio.run(clients())
+    assert a1 is a2
+    assert b1 is not a1
@@ -0,0 +1,17 @@
+import asyncio
+from refassist.nodes.llm_correct import llm_correct
+
+REF = 'A. Vaswani, "Attention is all you need," NeurIPS, vol. 30, pp. 5998-6008, 2017.'
+EXTRACTED = {"title": "Attention is all you need", "authors": ["A. Vaswani"], "journal_name": "NeurIPS", "journal_abbrev": "NeurIPS", "issue": "1",
+             "volume": "30", "pages": "5998-6008", "year": "2017", "doi": "10.5555/3295222"}
+
+
+def test_skip_reports_tokens_saved_in_update_without_mutating_state():
+    state = {
+        "reference": REF, "type": "journal article", "extracted": dict(EXTRACTED),
+        "best": dict(EXTRACTED), "verification": {k: True for k in EXTRACTED}, "llm_tokens_saved": 10,
+    }
+    update = asyncio.run(llm_correct(state, {}))
+    assert state["llm_tokens_saved"] == 10
+    assert update["llm_tokens_saved"] > 10
+    assert update["extracted"] == EXTRACTED
@@ -0,0 +1,185 @@
+import asyncio
+import pytest
+from refassist.graphs import pipeline
+from refassist.config import PipelineConfig
+from refassist.metrics import value
+
+REF = 'K. He, X. Zhang, and J. Sun, "Deep residual learning," in Proc. CVPR, 2016, pp. 770-778.'
+CFG = PipelineConfig(result_cache_size=16, result_cache_ttl_s=3600, deadline_s=0)
+
+
+def _out(n, **extra):
+    out = {"formatted": f"formatted {n}", "csl_json": {"n": n}, "bibtex": f"@misc{{n{n}}}",
+           "report": f"report {n}", "verification": {"presence": "found"}}
+    out.update(extra)
+    return out
+
+
+class FakeInvoke:
+    """Stands in for the compiled graph: counts runs and returns queued outputs."""
+
+    def __init__(self, *outs, gate=None):
+        self.outs = list(outs)
+        self.calls = []
+        self.gate = gate
+
+    async def __call__(self, reference, cfg, recursion_limit, outputs=pipeline.ALL_OUTPUTS, deadline=None):
+        self.calls.append(outputs)
+        out = self.outs.pop(0)
+        if self.gate is not None and len(self.calls) == 1:
+            await self.gate.wait()
+        return out
+
+
+@pytest.fixture(autouse=True)
+def _isolated(monkeypatch):
+    monkeypatch.setattr(pipeline, "_RESULT_CACHES", {})
+    monkeypatch.setattr(pipeline, "_INFLIGHT", {})
+
+
+def _run(fake, monkeypatch, *calls):
+    monkeypatch.setattr(pipeline, "_invoke", fake)
+
+    async def main():
+        return [await pipeline.run_one(REF, CFG, **kw) for kw in calls]
+    return asyncio.run(main())
+
+
+def test_miss_then_hit(monkeypatch):
+    fake = FakeInvoke(_out(1))
+    hits = value("result_cache.hit")
+    first, second = _run(fake, monkeypatch, {}, {})
+    assert len(fake.calls) == 1
+    assert "cached" not in first and second["cached"] is True
+    assert second["formatted"] == "formatted 1"
+    assert value("result_cache.hit") == hits + 1
+
+
+def test_refresh_reruns_and_replaces_entry(monkeypatch):
+    fake = FakeInvoke(_out(1), _out(2))
+    _, refreshed, after = _run(fake, monkeypatch, {}, {"refresh": True}, {})
+    assert len(fake.calls) == 2
+    assert "cached" not in refreshed and refreshed["formatted"] == "formatted 2"
+    assert after["cached"] is True and after["formatted"] == "formatted 2"
+
+
+def test_covers_compares_output_selections():
+    entry = {"outputs": ["csl_json", "formatted"]}
+    assert pipeline._covers(entry, frozenset({"csl_json"}))
+    assert pipeline._covers(entry, frozenset({"csl_json", "formatted"}))
+    assert not pipeline._covers(entry, frozenset({"csl_json", "bibtex"}))
+    assert not pipeline._covers(None, frozenset({"csl_json"}))
+
+
+def test_narrower_entry_does_not_serve_broader_request(monkeypatch):
+    fake = FakeInvoke(_out(1), _out(2))
+    narrow, broad, narrow_again = _run(fake, monkeypatch, {"outputs": "csl_json"}, {}, {"outputs": "csl_json"})
+    assert fake.calls == [frozenset({"csl_json"}), pipeline.ALL_OUTPUTS]
+    assert "cached" not in broad
+    # The broader run replaced the narrow entry and now serves narrow requests
+    assert narrow_again["cached"] is True and narrow_again["csl_json"] == {"n": 2}
+
+
+def test_narrower_run_keeps_broader_entry(monkeypatch):
+    gate = asyncio.Event()
+    fake = FakeInvoke(_out(1), gate=gate)
+    monkeypatch.setattr(pipeline, "_invoke", fake)
+    cache = pipeline._get_result_cache(CFG)
+    key = pipeline._result_key(REF, CFG)
+    broad = dict(_out(0), outputs=sorted(pipeline.ALL_OUTPUTS))
+
+    async def main():
+        narrow = asyncio.create_task(pipeline.run_one(REF, CFG, outputs="csl_json"))
+        await asyncio.sleep(0)
+        # A broader result lands while the narrow run is still computing
+        cache[key] = broad
+        gate.set()
+        await narrow
+
+    asyncio.run(main())
+    assert cache[key] is broad
+
+
+@pytest.mark.parametrize("bad", [
+    {"skipped": ["lookup:crossref"]},
+    {"errors": ["crossref: HTTP 503"]},
+    {"verification": {}},
+    {"formatted": "  "},
+])
+def test_degraded_runs_are_not_cached(monkeypatch, bad):
+    fake = FakeInvoke(_out(1, **bad), _out(2))
+    first, second = _run(fake, monkeypatch, {}, {})
+    assert len(fake.calls) == 2
+    assert "cached" not in second and second["formatted"] == "formatted 2"
+
+
+def test_non_reference_verdict_is_cached(monkeypatch):
+    fake = FakeInvoke(_out(1, verification={"is_reference": False}))
+    _, second = _run(fake, monkeypatch, {}, {})
+    assert len(fake.calls) == 1 and second["cached"] is True
+
+
+def test_identical_inflight_reference_shares_one_run(monkeypatch):
+    gate = asyncio.Event()
+    fake = FakeInvoke(_out(1), gate=gate)
+    monkeypatch.setattr(pipeline, "_invoke", fake)
+
+    async def main():
+        first = asyncio.create_task(pipeline.run_one(REF, CFG))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(pipeline.run_one(REF, CFG))
+        await asyncio.sleep(0.01)
+        gate.set()
+        return await first, await second
+
+    first, second = asyncio.run(main())
+    assert len(fake.calls) == 1
+    assert "cached" not in first and second["cached"] is True
+
+
+def test_inflight_waiter_gives_up_at_its_deadline(monkeypatch):
+    gate = asyncio.Event()
+    fake = FakeInvoke(_out(1), _out(2), gate=gate)
+    monkeypatch.setattr(pipeline, "_invoke", fake)
+    timeouts = value("result_cache.shared_timeout")
+
+    async def main():
+        first = asyncio.create_task(pipeline.run_one(REF, CFG))
+        await asyncio.sleep(0)
+        second = await asyncio.wait_for(pipeline.run_one(REF, CFG, deadline_s=0.05), 1)
+        gate.set()
+        return await first, second
+
+    first, second = asyncio.run(main())
+    assert len(fake.calls) == 2
+    assert second["formatted"] == "formatted 2" and "cached" not in second
+    assert first["formatted"] == "formatted 1"
+    assert value("result_cache.shared_timeout") == timeouts + 1
+    assert pipeline._INFLIGHT == {}
+
+
+def test_failed_run_releases_waiters(monkeypatch):
+    gate = asyncio.Event()
+
+    class Boom(FakeInvoke):
+        async def __call__(self, *args, **kwargs):
+            out = await super().__call__(*args, **kwargs)
+            if isinstance(out, Exception):
+                raise out
+            return out
+
+    fake = Boom(RuntimeError("graph failed"), _out(2), gate=gate)
+    monkeypatch.setattr(pipeline, "_invoke", fake)
+
+    async def main():
+        first = asyncio.create_task(pipeline.run_one(REF, CFG))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(pipeline.run_one(REF, CFG))
+        await asyncio.sleep(0.01)
+        gate.set()
+        with pytest.raises(RuntimeError):
+            await first
+        return await second
+
+    second = asyncio.run(main())
+    assert len(fake.calls) == 2 and second["formatted"] == "formatted 2"
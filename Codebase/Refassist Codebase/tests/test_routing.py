@@ -0,0 +1,62 @@
+from refassist.config import PipelineConfig
+from refassist.nodes.routing import expected_gain, field_fix_rate, parse_field_priors, should_exit
+
+REF = 'A. Vaswani, "Attention is all you need," NeurIPS, vol. 30, pp. 5998-6008, Jan. 2017, doi: 10.5555/3295222.'
+EXTRACTED = {
+    "title": "Attention is all you need", "authors": ["A. Vaswani"], "journal_name": "NeurIPS",
+    "volume": "30", "pages": "5998-6008", "year": "2017", "month": "Jan", "doi": "10.5555/3295222",
+}
+
+
+def _state(failing, extracted=None, best=None, **cfg):
+    ver = {f: True for f in ("title", "authors", "journal_name", "year", "month", "volume", "pages", "doi")}
+    ver.update({f: False for f in failing})
+    return {
+        "_cfg": PipelineConfig(**cfg), "reference": REF, "type": "journal article",
+        "extracted": dict(EXTRACTED if extracted is None else extracted),
+        "best": best if best is not None else dict(EXTRACTED),
+        "verification": ver, "hops": 1, "_made_changes_last_cycle": True,
+    }
+
+
+def test_unverifiable_present_value_exits():
+    # Only month fails, the source has no month and the parse already has one: nothing to gain
+    best = {k: v for k, v in EXTRACTED.items() if k != "month"}
+    state = _state(["month"], best=best)
+    assert expected_gain(state) == 0.0
+    assert should_exit(state)
+
+
+def test_value_offered_by_best_keeps_the_hop():
+    state = _state(["volume"], best={**EXTRACTED, "volume": "31"})
+    assert expected_gain(state) > state["_cfg"].loop_hop_cost
+    assert not should_exit(state)
+
+
+def test_missing_hinted_field_keeps_the_hop_without_best():
+    extracted = {k: v for k, v in EXTRACTED.items() if k != "doi"}
+    state = _state(["doi"], extracted=extracted, best={})
+    assert not should_exit(state)
+
+
+def test_no_best_and_nothing_to_fill_exits():
+    state = _state(["title"], best={})
+    assert expected_gain(state) == 0.0
+    assert should_exit(state)
+
+
+def test_missing_field_without_hint_is_not_counted():
+    ref = 'A. Vaswani, "Attention is all you need," NeurIPS, 2017.'
+    extracted = {k: v for k, v in EXTRACTED.items() if k != "volume"}
+    state = {**_state(["volume"], extracted=extracted, best={}), "reference": ref}
+    assert expected_gain(state) == 0.0
+
+
+def test_priors_are_configured_not_learned():
+    cfg = PipelineConfig(loop_field_priors="doi=0.9,bogus=1,title=x")
+    assert field_fix_rate("doi", cfg) == 0.9
+    assert field_fix_rate("title", cfg) == 0.5
+    assert "bogus" not in parse_field_priors(cfg.loop_field_priors)
+    # A prior below the hop cost makes an otherwise fixable flag not worth a hop
+    state = _state(["volume"], best={**EXTRACTED, "volume": "31"}, loop_field_priors="volume=0.1")
+    assert should_exit(state)
@@ -0,0 +1,86 @@
+import asyncio
+from refassist.llms import scheduler as sched
+from refassist.llms.scheduler import LLMScheduler
+
+
+def _recorder(order, name, hold=0.0):
+    async def call():
+        order.append(name)
+        await asyncio.sleep(hold)
+        return name
+    return call
+
+
+def test_interactive_precedes_bulk_backlog_under_rpm_budget(monkeypatch):
+    monkeypatch.setattr(sched, "_WINDOW_S", 0.2)
+    order = []
+
+    async def main():
+        s = LLMScheduler(max_inflight=8, rpm=1)
+        await s.run("p", _recorder(order, "first"))
+        # The budget is spent: a bulk backlog queues, then one interactive call arrives
+        bulk = [asyncio.create_task(s.run("p", _recorder(order, f"bulk{i}"), "bulk")) for i in range(3)]
+        await asyncio.sleep(0.01)
+        interactive = asyncio.create_task(s.run("p", _recorder(order, "interactive"), "interactive"))
+        await asyncio.gather(interactive, *bulk)
+
+    asyncio.run(main())
+    assert order == ["first", "interactive", "bulk0", "bulk1", "bulk2"]
+
+
+def test_budget_wait_does_not_hold_a_slot_for_other_providers(monkeypatch):
+    monkeypatch.setattr(sched, "_WINDOW_S", 0.5)
+    order = []
+
+    async def main():
+        s = LLMScheduler(max_inflight=1, rpm=1)
+        await s.run("p1", _recorder(order, "a"))
+        waiting = asyncio.create_task(s.run("p1", _recorder(order, "b")))
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(s.run("p2", _recorder(order, "c")), 0.2)
+        await waiting
+        assert s._inflight == 0
+
+    asyncio.run(main())
+    assert order == ["a", "c", "b"]
+
+
+def test_slots_go_to_interactive_first():
+    order = []
+
+    async def main():
+        s = LLMScheduler(max_inflight=1)
+        busy = asyncio.create_task(s.run("p", _recorder(order, "busy", hold=0.05)))
+        await asyncio.sleep(0.01)
+        bulk = asyncio.create_task(s.run("p", _recorder(order, "bulk"), "bulk"))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(s.run("p", _recorder(order, "interactive")))
+        await asyncio.gather(busy, bulk, interactive)
+
+    asyncio.run(main())
+    assert order == ["busy", "interactive", "bulk"]
+
+
+def test_raising_the_cap_admits_queued_calls():
+    order = []
+
+    async def main():
+        s = LLMScheduler(max_inflight=1)
+        release = asyncio.Event()
+
+        async def hold():
+            await release.wait()
+
+        held = asyncio.create_task(s.run("p", hold))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(s.run("p", _recorder(order, "queued")))
+        await asyncio.sleep(0.01)
+        assert order == []
+        s.configure(2)
+        await asyncio.sleep(0.01)
+        assert order == ["queued"]
+        release.set()
+        await asyncio.gather(held, queued)
+        assert s._inflight == 0
+
+    asyncio.run(main())